@@ -0,0 +1,71 @@
+"""
+Native Codec Benchmark
+Messages per second for the old per-message writes against MessageWriter.
+Correctness (round trips, limits, chunking, fuzzing) is covered by
+tests/test_native_codec.py
+
+Usage: python bench_native_codec.py [--seconds 1]
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+
+from native_codec import MessageWriter
+
+SAMPLE_MESSAGES = [
+    {"action": "pause_video", "reason": "eyes_away"},
+    {"action": "away_start", "t": 12345.678},
+    {"action": "camera_status", "state": "degraded", "reconnect_attempts": 3},
+    {"action": "stats", "fps": 29.7, "motion_gate_hit_rate": 0.82, "note": "Señor 👁️ 注意"},
+]
+
+
+def legacy_send(stream, message):
+    # What the hosts used to do (str length, native byte order, two writes)
+    message_json = json.dumps(message)
+    stream.write(struct.pack('I', len(message_json)))
+    stream.write(message_json.encode('utf-8'))
+    stream.flush()
+
+
+def rate(send, seconds):
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for message in SAMPLE_MESSAGES:
+            send(message)
+        count += len(SAMPLE_MESSAGES)
+    return count / (time.perf_counter() - start)
+
+
+def benchmark(seconds):
+    # A buffered OS file like sys.stdout.buffer, so every flush is a real write()
+    stream = open(os.devnull, 'wb')
+    writer = MessageWriter(stream)
+    frame = {"action": "debug_frame", "frame": "A" * 40000, "focused": True, "away_duration": 0}
+
+    print(f"\n{'':24}{'legacy':>12}{'codec':>12}   msgs/s")
+    old = rate(lambda m: legacy_send(stream, m), seconds)
+    new = rate(writer.send, seconds)
+    print(f"{'small messages':24}{old:12,.0f}{new:12,.0f}")
+
+    old = rate(lambda m: legacy_send(stream, frame), seconds)
+    new = rate(lambda m: writer.send(frame), seconds)
+    print(f"{'40 KB debug frames':24}{old:12,.0f}{new:12,.0f}")
+    stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the native messaging codec")
+    parser.add_argument('--seconds', type=float, default=1.0, help="duration of each benchmark")
+    args = parser.parse_args()
+
+    benchmark(args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Synthetic Accuracy and Speed Benchmark
+Measures pupil localization error, face/eye detection rates and gaze mapping
+error against synthetic ground truth, with per-call latency. Save a baseline
+and compare later runs against it to catch regressions across releases:
+
+    python bench_synthetic.py --save baseline.json
+    python bench_synthetic.py --compare baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from eye_detection import detect_faces_and_eyes, load_cascades, locate_pupil
+from eye_openness import eye_openness
+from gaze_mapping import compute_linear_mapping, estimate_gaze_position, is_looking_at_screen
+from synthetic import eye_crop, face_scene
+
+# A result regresses when it is this much worse than the baseline
+ERROR_TOLERANCE = 0.10    # +10% (and at least 0.2 px)
+LATENCY_TOLERANCE = 0.25  # +25% (and at least 5 us)
+
+
+def timed(fn, *args, repeat=1, rounds=3):
+    """(result, microseconds per call) - best of a few rounds, to keep scheduler noise out"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn(*args)
+        best = min(best, (time.perf_counter() - start) * 1e6 / repeat)
+    return result, best
+
+
+def bench_pupil():
+    """Pupil error per crop condition"""
+    conditions = {
+        "clean": {},
+        "noise 8": {"noise": 8},
+        "noise 16": {"noise": 16},
+        "small pupil": {"pupil_radius": 0.06},
+        "large pupil": {"pupil_radius": 0.16},
+        "low contrast": {"contrast": 0.8},
+        "very low contrast": {"contrast": 0.5},
+        "2 glints": {"glints": 2},
+    }
+    positions = list(itertools.product(np.linspace(0.3, 0.7, 5), np.linspace(0.4, 0.6, 3)))
+    results = {}
+    for name, params in conditions.items():
+        errors, fallbacks, times = [], 0, []
+        for seed, pupil in enumerate(positions):
+            crop, (tx, ty) = eye_crop(pupil=pupil, seed=seed, **params)
+            (found, confidence), us = timed(locate_pupil, crop, repeat=20)
+            errors.append(np.hypot(found[0] - tx, found[1] - ty))
+            fallbacks += confidence < 1.0
+            times.append(us)
+        results[f"pupil/{name}"] = {
+            "error_px": float(np.mean(errors)),
+            "p95_error_px": float(np.percentile(errors, 95)),
+            "fallback_rate": fallbacks / len(positions),
+            "us_per_call": float(np.median(times)),
+        }
+    return results
+
+
+def bench_openness():
+    """Open/closed classification of eye crops against a wide-open baseline"""
+    positions = list(itertools.product(np.linspace(0.35, 0.65, 4), (0.5,)))
+    results = {}
+    for noise in (0, 8):
+        correct, total, times = 0, 0, []
+        for seed, pupil in enumerate(positions):
+            baseline = eye_openness(eye_crop(pupil=pupil, noise=noise, seed=seed)[0])
+            # Closed means at least 80% shut (as in PERCLOS); below half the
+            # baseline is BlinkTracker's default closed_ratio
+            for openness in (1.0, 0.8, 0.5, 0.2, 0.1, 0.0):
+                crop, _ = eye_crop(pupil=pupil, noise=noise, openness=openness, seed=seed)
+                value, us = timed(eye_openness, crop, repeat=20)
+                times.append(us)
+                correct += (value is not None and value < 0.5 * baseline) == (openness <= 0.2)
+                total += 1
+        results[f"openness/noise {noise}"] = {
+            "accuracy_rate": correct / total,
+            "us_per_call": float(np.median(times)),
+        }
+    return results
+
+
+def bench_detection(face_cascade, eye_cascade):
+    """Face/eye detection rate and pupil error on full frames"""
+    conditions = {
+        "640x480": {},
+        "640x480 noise 8": {"noise": 8},
+        "320x240": {"width": 320, "height": 240},
+        "1280x720": {"width": 1280, "height": 720},
+        "640x480 dim": {"background": 40},
+    }
+    gazes = [(0, 0), (-0.8, 0), (0.8, 0), (0, 0.8), (0.5, -0.8)]
+    results = {}
+    for name, params in conditions.items():
+        faces_found = eyes_found = 0
+        errors, times = [], []
+        for seed, gaze in enumerate(gazes):
+            frame, truth = face_scene(gaze=gaze, seed=seed, **params)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            detections, us = timed(detect_faces_and_eyes, gray, face_cascade, eye_cascade, True)
+            times.append(us)
+            if not detections:
+                continue
+            faces_found += 1
+            (fx, fy, fw, fh), eyes, pupils = detections[0]
+            eyes_found += min(len(eyes), 2) / 2
+            # Match each detected pupil to the nearest true one
+            for (ex, ey, ew, eh), pupil in zip(eyes, pupils):
+                px, py = fx + ex + pupil[0], fy + ey + pupil[1]
+                errors.append(min(np.hypot(px - tx, py - ty) for tx, ty in truth["pupils"]))
+        results[f"detect/{name}"] = {
+            "face_rate": faces_found / len(gazes),
+            "eye_rate": eyes_found / len(gazes),
+            "error_px": float(np.mean(errors)) if errors else None,
+            "us_per_call": float(np.median(times)),
+        }
+    return results
+
+
+def bench_gaze():
+    """Affine calibration fit from noisy samples, then gaze error on held-out pupils"""
+    rng = np.random.default_rng(7)
+    width, height = 1920, 1080
+    true_mapping = np.array([[2400.0, 150.0, -240.0], [-90.0, 1900.0, -420.0]])
+    results = {}
+    for noise in (0.0, 0.005, 0.02):
+        calib_pupils = [tuple(p) for p in rng.uniform(0.3, 0.7, (9, 2))]
+        calib_screen = [tuple(true_mapping @ [p[0] + rng.normal(0, noise), p[1] + rng.normal(0, noise), 1.0])
+                        for p in calib_pupils]
+        mapping, fit_us = timed(compute_linear_mapping, calib_pupils, calib_screen, repeat=50)
+
+        errors, agree, times = [], 0, []
+        tests = rng.uniform(0.2, 0.8, (200, 2))
+        for p in tests:
+            truth = true_mapping @ [p[0], p[1], 1.0]
+            gaze, us = timed(estimate_gaze_position, tuple(p), [], [], width, height, mapping, repeat=10)
+            times.append(us)
+            errors.append(np.hypot(gaze[0] - truth[0], gaze[1] - truth[1]))
+            agree += is_looking_at_screen(gaze, width, height) == is_looking_at_screen(tuple(truth), width, height)
+        results[f"gaze/pupil noise {noise}"] = {
+            "error_px": float(np.mean(errors)),
+            "onscreen_agreement": agree / len(tests),
+            "fit_us": fit_us,
+            "us_per_call": float(np.median(times)),
+        }
+    return results
+
+
+def compare(results, baseline):
+    """Regressions against a saved baseline: [(name, metric, old, new)]"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, new in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if old is None or new is None:
+                continue
+            if metric.endswith(('_rate', 'agreement')):
+                worse = new < old - 0.05
+            elif 'error' in metric:
+                worse = new > old * (1 + ERROR_TOLERANCE) and new - old > 0.2
+            else:  # Latency
+                worse = new > old * (1 + LATENCY_TOLERANCE) and new - old > 5
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and speed on synthetic eye data")
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON to compare against (exit 1 on regressions)")
+    args = parser.parse_args()
+
+    face_cascade, eye_cascade = load_cascades()
+    results = {}
+    results.update(bench_pupil())
+    results.update(bench_openness())
+    results.update(bench_detection(face_cascade, eye_cascade))
+    results.update(bench_gaze())
+
+    for name, metrics in results.items():
+        values = "  ".join(f"{k} {v:.3f}" if isinstance(v, float) else f"{k} {v}" for k, v in metrics.items())
+        print(f"{name:34} {values}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.compare}:")
+            for name, metric, old, new in regressions:
+                print(f"  {name} {metric}: {old:.3f} -> {new:.3f}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Camera Supervisor
+Keeps the capture device alive for the native host: reconnects in the background
+with exponential backoff and watches for USB hot-plug on Linux
+"""
+
+import glob
+import sys
+import threading
+import time
+
+# Connection states reported to the extension
+STATE_OK = "ok"
+STATE_DEGRADED = "degraded"
+
+
+def list_video_devices():
+    """Return the set of /dev/video* nodes (None when enumeration isn't supported)"""
+    if not sys.platform.startswith('linux'):
+        return None
+    return set(glob.glob('/dev/video*'))
+
+
+class CameraSupervisor:
+    def __init__(self, open_camera, log, initial_backoff=0.5, max_backoff=30.0,
+                 hotplug_poll=1.0):
+        """
+        open_camera: callable that makes one attempt to open the device and
+                     returns a ready VideoCapture, or None on failure
+        log:         logging callable (stderr - stdout belongs to Chrome)
+        """
+        self.open_camera = open_camera
+        self.log = log
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.hotplug_poll = hotplug_poll
+
+        self.cap = None
+        self.state = STATE_DEGRADED
+        self.reconnect_attempts = 0
+        self.reconnects = 0
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def open(self, attempts=3):
+        """Open the camera synchronously; falls back to background reconnects on failure"""
+        for attempt in range(attempts):
+            self.log(f"Opening camera (attempt {attempt + 1}/{attempts})...")
+            cap = self._try_open()
+            if cap is not None:
+                self._attach(cap)
+                self.log("✓ Camera initialized successfully")
+                return True
+            time.sleep(1)
+
+        self.log("✗ Failed to initialize camera - supervising in background")
+        self._begin_reconnect()
+        return False
+
+    def read(self, image=None):
+        """Read a frame; returns (False, None) immediately while degraded"""
+        with self._lock:
+            cap = self.cap if self.state == STATE_OK else None
+            if cap is None:
+                return False, None
+            try:
+                ret, frame = cap.read(image) if image is not None else cap.read()
+            except Exception as e:
+                self.log(f"Camera read error: {e}")
+                ret, frame = False, None
+
+        if not ret or frame is None:
+            self.log("Cannot read frame - camera degraded, reconnecting in background")
+            self._begin_reconnect()
+            return False, None
+        return True, frame
+
+    def release(self):
+        """Stop the supervisor thread and release the device"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        with self._lock:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+        self.log("Camera released")
+
+    def _try_open(self):
+        try:
+            return self.open_camera()
+        except Exception as e:
+            self.log(f"Camera init error: {e}")
+            return None
+
+    def _attach(self, cap, reconnected=False):
+        with self._lock:
+            old = self.cap
+            self.cap = cap
+            self.state = STATE_OK
+            self.reconnect_attempts = 0
+            if reconnected:
+                # Called from the reconnect thread, which is about to exit: a failure
+                # from here on must start a new one, not wait for this one
+                self._thread = None
+                self.reconnects += 1
+        if old is not None and old is not cap:
+            old.release()
+
+    def _begin_reconnect(self):
+        with self._lock:
+            self.state = STATE_DEGRADED
+            # Drop the dead handle now so the backend can free the device
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._reconnect_loop,
+                                            name="camera-supervisor", daemon=True)
+            self._thread.start()
+
+    def _reconnect_loop(self):
+        backoff = self.initial_backoff
+        known_devices = list_video_devices()
+
+        while not self._stopped.is_set():
+            devices = list_video_devices()
+
+            if devices is not None:
+                if not devices:
+                    # Nothing plugged in - poll for the device to come back
+                    known_devices = devices
+                    self._wake.wait(self.hotplug_poll)
+                    self._wake.clear()
+                    continue
+                if devices - known_devices:
+                    self.log(f"Hot-plug: new video device(s) {sorted(devices - known_devices)}")
+                    backoff = self.initial_backoff
+                known_devices = devices
+
+            self.reconnect_attempts += 1
+            self.log(f"Reconnecting camera (attempt {self.reconnect_attempts})...")
+            cap = self._try_open()
+            if cap is not None:
+                self._attach(cap, reconnected=True)
+                self.log("✓ Camera reconnected")
+                return
+
+            self.log(f"Reconnect failed - retrying in {backoff:.1f}s")
+            deadline = time.time() + backoff
+            while not self._stopped.is_set() and time.time() < deadline:
+                # Wake early if a new device node shows up
+                self._wake.wait(min(self.hotplug_poll, max(0.0, deadline - time.time())))
+                self._wake.clear()
+                devices = list_video_devices()
+                if devices is not None and devices - known_devices:
+                    break
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,181 @@
+"""
+Capture Format Negotiation
+Picks the lowest-latency format a camera actually delivers (FOURCC, resolution,
+FPS, buffer size) and remembers the result per device so later starts skip probing
+"""
+
+import json
+import os
+import time
+
+import cv2
+
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.capture_profiles.json')
+
+# Frames timed per candidate format when measuring delivered FPS
+PROBE_FRAMES = 5
+
+
+def fourcc_to_str(value):
+    """Decode a CAP_PROP_FOURCC value into its four-character code"""
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+
+def is_fourcc(value):
+    """True for a four-character code cv2.VideoWriter_fourcc accepts"""
+    return isinstance(value, str) and len(value) == 4
+
+
+def to_gray(frame, dst=None):
+    """Grayscale view of a captured frame, reusing the Y plane of raw YUYV frames"""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 2:
+        # Raw YUYV (CONVERT_RGB off): channel 0 is luma - no conversion needed
+        return frame[:, :, 0]
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+def device_key(index, cap):
+    """Stable key for a device: index plus capture backend"""
+    try:
+        backend = cap.getBackendName()
+    except Exception:
+        backend = "unknown"
+    return f"{index}:{backend}"
+
+
+def load_profiles(path=PROFILE_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profiles(profiles, path=PROFILE_FILE):
+    try:
+        with open(path, 'w') as f:
+            json.dump(profiles, f, indent=2, sort_keys=True)
+    except OSError:
+        pass  # Profiles are only a startup shortcut
+
+
+class CaptureConfig:
+    def __init__(self, width=640, height=480, fps=30, buffer_size=1, grayscale=False, fourccs=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_size = buffer_size  # 1 = always hand out the newest frame
+        self.grayscale = grayscale
+
+        if fourccs is None:
+            # MJPG keeps full FPS over USB 2; grayscale consumers prefer YUYV so
+            # the Y plane can be used without decoding
+            fourccs = ['YUYV', 'MJPG'] if grayscale else ['MJPG', 'YUYV']
+        self.fourccs = list(fourccs)
+
+    def as_dict(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "buffer_size": self.buffer_size,
+            "grayscale": self.grayscale,
+            "fourccs": self.fourccs,
+        }
+
+
+def _apply(cap, fourcc, config):
+    """Request a format and return which properties the device honored.
+
+    fourcc None (the device's default format) leaves the format alone.
+    """
+    # FOURCC must be set before the size on V4L2 or it is silently ignored
+    if is_fourcc(fourcc):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.height)
+    cap.set(cv2.CAP_PROP_FPS, config.fps)
+    buffer_ok = cap.set(cv2.CAP_PROP_BUFFERSIZE, config.buffer_size)
+
+    actual_fps = cap.get(cv2.CAP_PROP_FPS)
+    return {
+        "fourcc": is_fourcc(fourcc) and fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)) == fourcc,
+        "resolution": (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) == config.width and
+                       int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == config.height),
+        "fps": actual_fps > 0 and abs(actual_fps - config.fps) < 1,
+        "buffer_size": bool(buffer_ok) and int(cap.get(cv2.CAP_PROP_BUFFERSIZE)) == config.buffer_size,
+    }
+
+
+def _measure_fps(cap):
+    """Delivered frame rate over a few reads (0 if frames don't arrive)"""
+    ret, frame = cap.read()  # First read after a format change can stall
+    if not ret:
+        return 0.0
+    start = time.time()
+    for _ in range(PROBE_FRAMES):
+        ret, frame = cap.read()
+        if not ret:
+            return 0.0
+    elapsed = time.time() - start
+    return PROBE_FRAMES / elapsed if elapsed > 0 else float(PROBE_FRAMES)
+
+
+def _enable_raw_luma(cap, config):
+    """Turn off RGB conversion so YUYV frames keep their Y plane; True if it stuck"""
+    if not cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+        return False
+    ret, frame = cap.read()
+    if ret and frame is not None and frame.ndim == 3 and frame.shape[:2] == (config.height, config.width) \
+            and frame.shape[2] == 2:
+        return True
+    # Backend hands out something other than packed YUYV - keep BGR
+    cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+    return False
+
+
+def negotiate(cap, config, key, log, profiles_path=PROFILE_FILE):
+    """Configure an open capture for lowest latency and return the negotiated profile"""
+    profiles = load_profiles(profiles_path)
+    stored = profiles.get(key)
+
+    if stored is not None and stored.get("requested") == config.as_dict():
+        _apply(cap, stored["fourcc"], config)
+        if stored.get("raw_luma"):
+            stored["raw_luma"] = _enable_raw_luma(cap, config)
+        log(f"Capture profile for {key}: {stored['fourcc'] or 'default'} @ {stored['fps']:.0f} FPS (cached)")
+        return stored
+
+    best = None
+    for fourcc in config.fourccs:
+        honored = _apply(cap, fourcc, config)
+        if not honored["fourcc"]:
+            log(f"  {fourcc}: not supported by device")
+            continue
+        fps = _measure_fps(cap)
+        log(f"  {fourcc}: {fps:.1f} FPS delivered, honored={honored}")
+        if fps > 0 and (best is None or fps > best["fps"] * 1.1):
+            best = {"fourcc": fourcc, "fps": fps, "honored": honored}
+
+    if best is None:
+        # Device ignores FOURCC requests - keep its default format, and only
+        # remember it when it reads back as a real four-character code
+        fourcc = fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC))
+        if not is_fourcc(fourcc):
+            fourcc = None
+        honored = _apply(cap, fourcc, config)
+        best = {"fourcc": fourcc, "fps": cap.get(cv2.CAP_PROP_FPS), "honored": honored}
+    else:
+        _apply(cap, best["fourcc"], config)
+
+    best["raw_luma"] = config.grayscale and best["fourcc"] == 'YUYV' and _enable_raw_luma(cap, config)
+    best["requested"] = config.as_dict()
+
+    profiles[key] = best
+    save_profiles(profiles, profiles_path)
+    log(f"Capture profile for {key}: {best['fourcc'] or 'default'} @ {best['fps']:.0f} FPS"
+        f"{' (raw Y plane)' if best['raw_luma'] else ''}")
+    return best
@@ -0,0 +1,201 @@
+"""
+Multiprocess Detection Pool
+Optional worker-pool mode for high-resolution or multi-camera setups: gray frames
+are handed to N detector processes through shared memory and results come back
+in capture order. A frame whose worker died or that takes longer than
+task_timeout is skipped, and dead workers are restarted
+"""
+
+import heapq
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from eye_detection import EYE_PARAMS, FACE_PARAMS, detect_faces_and_eyes, load_cascades
+from lighting import LightingNormalizer
+
+
+def _detector_worker(shm_name, shape, tasks, results, with_pupils, lighting_mode, busy, index, detect):
+    """Worker process: detect faces, eyes and pupils for frames in shared memory.
+
+    busy[index] holds the sequence number being worked on (-1 when idle), so the
+    pool knows which frame is lost if this process dies.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        slots = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        face_cascade, eye_cascade = load_cascades()
+        lighting = {}  # Per tag (camera) - each has its own brightness
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, seq, timestamp, (h, w), tag, face_scale, task_pupils, face_params, eye_params = task
+            busy[index] = seq
+            try:
+                gray = slots[slot, :h * w].reshape(h, w)
+                normalizer = None
+                if lighting_mode is not None:
+                    normalizer = lighting.get(tag)
+                    if normalizer is None:
+                        normalizer = lighting[tag] = LightingNormalizer(lighting_mode)
+                detections = detect(gray, face_cascade, eye_cascade,
+                                    with_pupils=with_pupils and task_pupils,
+                                    lighting=normalizer, face_scale=face_scale,
+                                    face_params=face_params, eye_params=eye_params)
+                results.put((seq, timestamp, tag, slot, detections, None))
+            except Exception as e:
+                results.put((seq, timestamp, tag, slot, [], str(e)))
+            busy[index] = -1
+    finally:
+        del slots
+        shm.close()
+
+
+class DetectionPool:
+    def __init__(self, workers, frame_shape, with_pupils=False, slots=None, lighting_mode=None,
+                 task_timeout=2.0, detect=detect_faces_and_eyes):
+        """
+        workers:     number of detector processes
+        frame_shape: largest (height, width) gray frame that will be submitted -
+                     smaller frames (e.g. from a second camera) share the same slots
+        slots:       shared frame buffers in flight (defaults to 2 per worker)
+        lighting_mode: face/eye region normalization in the workers (see lighting.py)
+        task_timeout: seconds after which a frame still without a result is skipped,
+                      so a hung or crashed worker can't hold back every later frame
+        detect:      detection function with detect_faces_and_eyes' signature - must be
+                     importable by name, the workers are spawned
+        """
+        self.workers = workers
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots or workers * 2
+        self.with_pupils = with_pupils
+        self.lighting_mode = lighting_mode
+        self.task_timeout = task_timeout
+        self.detect = detect
+
+        shape = (self.slots, self.frame_shape[0] * self.frame_shape[1])
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self.frames = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+
+        # Spawned, not forked: a forked child inherits the host's stdin lock held by
+        # the command reader thread and deadlocks closing stdin on startup
+        self.ctx = mp.get_context('spawn')
+        ctx = self.ctx
+        # Bounded by the slot count - a frame is only queued once it owns a slot
+        self.tasks = ctx.Queue(maxsize=self.slots)
+        self.results = ctx.Queue(maxsize=self.slots)
+        self.free_slots = list(range(self.slots))
+
+        self.next_seq = 0     # Sequence number for the next submitted frame
+        self.emit_seq = 0     # Next sequence number to hand back (keeps capture order)
+        self.reorder = []     # Heap of finished results waiting for earlier frames
+        self.in_flight = {}   # seq -> (slot, deadline) for frames without a result yet
+        self.dropped = 0
+        self.lost = 0         # Frames skipped after a worker died or timed out
+        self.restarts = 0
+
+        self.busy = ctx.RawArray('q', workers)  # Per worker: seq being detected, -1 = idle
+        self.processes = [self._start_worker(i) for i in range(workers)]
+
+    def _start_worker(self, index):
+        self.busy[index] = -1
+        p = self.ctx.Process(target=_detector_worker, name=f"detector-{index}",
+                             args=(self.shm.name, self.frames.shape, self.tasks, self.results,
+                                   self.with_pupils, self.lighting_mode, self.busy, index, self.detect),
+                             daemon=True)
+        p.start()
+        return p
+
+    def fits(self, gray):
+        """True if a frame fits in the pool's slots"""
+        return gray.shape[0] * gray.shape[1] <= self.frames.shape[1]
+
+    def submit(self, gray, timestamp, tag=None, face_scale=1.0, pupils=True,
+               face_params=FACE_PARAMS, eye_params=EYE_PARAMS):
+        """Queue a gray frame for detection; returns False (frame dropped) if all slots are busy.
+
+        tag is handed back with the result (e.g. the camera the frame came from).
+        face_scale and pupils can lower the work per frame (see throttle_policy.py) -
+        pupils only switches them off for a pool started with_pupils.
+        face_params/eye_params: cascade (scaleFactor, minNeighbors), see runtime_config.py
+        """
+        self._drain()
+        if not self.free_slots:
+            self.dropped += 1
+            return False
+
+        h, w = gray.shape
+        slot = self.free_slots.pop()
+        np.copyto(self.frames[slot, :h * w].reshape(h, w), gray)
+        self.tasks.put((slot, self.next_seq, timestamp, (h, w), tag, face_scale, pupils, face_params, eye_params))
+        self.in_flight[self.next_seq] = (slot, time.monotonic() + self.task_timeout)
+        self.next_seq += 1
+        return True
+
+    def collect(self, timeout=0.0):
+        """Return finished results as [(timestamp, tag, detections)] in capture order"""
+        self._drain(timeout)
+        self._check_workers()
+        now = time.monotonic()
+        ready = []
+        while True:
+            if self.reorder and self.reorder[0][0] == self.emit_seq:
+                seq, timestamp, tag, detections = heapq.heappop(self.reorder)
+                ready.append((timestamp, tag, detections))
+            elif self.emit_seq in self.in_flight and now >= self.in_flight[self.emit_seq][1]:
+                # Lost with its worker or stuck - give up on it so later frames come out
+                slot, deadline = self.in_flight.pop(self.emit_seq)
+                self.free_slots.append(slot)
+                self.lost += 1
+            else:
+                return ready
+            self.emit_seq += 1
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        for _ in self.processes:
+            try:
+                self.tasks.put(None, timeout=1)
+            except queue.Full:
+                break
+        for p in self.processes:
+            p.join(timeout=2)
+            if p.is_alive():
+                p.terminate()
+        self.processes = []
+        del self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+    def _check_workers(self):
+        """Restart dead workers; the frame a dead worker held is skipped straight away"""
+        for i, p in enumerate(self.processes):
+            if p.is_alive():
+                continue
+            seq = self.busy[i]
+            if seq in self.in_flight:
+                self.in_flight[seq] = (self.in_flight[seq][0], 0.0)
+            p.join(timeout=0)
+            self.processes[i] = self._start_worker(i)
+            self.restarts += 1
+
+    def _drain(self, timeout=0.0):
+        """Move finished results into the reorder heap and free their slots"""
+        block = timeout > 0
+        while True:
+            try:
+                seq, timestamp, tag, slot, detections, error = self.results.get(block=block,
+                                                                                timeout=timeout or None)
+            except queue.Empty:
+                return
+            block = False  # Only wait for the first result
+            if self.in_flight.pop(seq, None) is None:
+                continue  # Already skipped - its slot was freed then
+            self.free_slots.append(slot)
+            # A failed frame still takes its place in the order so later frames aren't held back
+            heapq.heappush(self.reorder, (seq, timestamp, tag, detections if error is None else None))
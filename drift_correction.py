@@ -0,0 +1,58 @@
+"""
+Online Drift Correction
+Keeps the calibration mapping accurate over a long session: every confident
+known-target moment (a click, or a look at a known point) nudges the affine
+pupil -> screen mapping with recursive least squares in O(1) per update
+"""
+
+import numpy as np
+
+
+class RLSMapping:
+    def __init__(self, mapping, forgetting=0.995, initial_uncertainty=0.5, max_residual=None,
+                 max_uncertainty=10.0):
+        """
+        mapping:             2x3 affine mapping from the full calibration
+        forgetting:          weight kept by past observations per update (1.0 = never forget)
+        initial_uncertainty: how far the initial mapping may move - small values trust
+                             the calibration, large values follow new targets quickly
+        max_residual:        screen-pixel error above which an update is rejected as a
+                             bad target (e.g. clicking without looking)
+        max_uncertainty:     cap on the covariance trace so it can't wind up while
+                             no updates arrive
+        """
+        self.theta = np.array(mapping, dtype=float).T.copy()  # 3x2
+        self.P = np.eye(3) * initial_uncertainty
+        self.forgetting = forgetting
+        self.max_residual = max_residual
+        self.max_uncertainty = max_uncertainty
+
+        self.updates = 0
+        self.rejected = 0
+
+    @property
+    def matrix(self):
+        """Current 2x3 mapping, same layout as compute_linear_mapping"""
+        return self.theta.T
+
+    def update(self, pupil, target):
+        """Fold in one (pupil, known screen target) pair; returns False if rejected"""
+        phi = np.array([pupil[0], pupil[1], 1.0])
+        error = np.asarray(target, dtype=float) - phi @ self.theta
+
+        if self.max_residual is not None and np.hypot(error[0], error[1]) > self.max_residual:
+            self.rejected += 1
+            return False
+
+        P_phi = self.P @ phi
+        gain = P_phi / (self.forgetting + phi @ P_phi)
+        self.theta += np.outer(gain, error)
+
+        P = self.P - np.outer(gain, P_phi)
+        # Only forget while the covariance is bounded, to avoid wind-up
+        if np.trace(P) / self.forgetting <= self.max_uncertainty:
+            P /= self.forgetting
+        self.P = (P + P.T) / 2  # Keep it symmetric against rounding drift
+
+        self.updates += 1
+        return True
@@ -3,6 +3,17 @@ console.log('🎯 Eye Focus Background Service Worker loaded');
 
 let nativePort = null;
 let eyeTrackingEnabled = false;
+let lastHostStats = null; // Latest pipeline metrics from the native host
+
+// YouTube tabs with the content script loaded: tabId -> { playing, visible, debugView, videoId }.
+// Kept up to date by VIDEO_STATE messages and tab events, so sending a pause or a
+// debug frame doesn't need a chrome.tabs.query every time
+const youtubeTabs = new Map();
+
+let hostContext; // Video id the host's focus timeline was last told about (undefined = not sent yet)
+
+const pendingChunks = new Map(); // Partly received oversized host messages, by chunk id
+const MAX_PENDING_CHUNKED = 4;    // Oldest partial message is dropped beyond this
 
 // Connect to native messaging host (Python eye monitor)
 function connectToNativeApp() {
@@ -11,20 +22,11 @@ function connectToNativeApp() {
     nativePort = chrome.runtime.connectNative('com.eyefocus.monitor');
     
     nativePort.onMessage.addListener((message) => {
-      console.log('📨 Message from eye tracker:', message.action);
-      
-      if (message.action === 'pause_video' && message.reason === 'eyes_away') {
-        console.log('🎯 Pause command received - forwarding to YouTube tabs');
-        pauseYouTubeVideos();
-      }
-      else if (message.action === 'debug_frame') {
-        // Forward debug frame to YouTube tabs for display
-        sendDebugFrame(message.frame, message.focused, message.away_duration);
-      }
-      else if (message.action === 'camera_error') {
-        console.error('❌ Camera error:', message.error);
-        sendCameraError(message.error);
+      if (message.action === 'chunk') {
+        message = joinChunk(message);
+        if (!message) return; // Waiting for the rest
       }
+      handleHostMessage(message);
     });
     
     nativePort.onDisconnect.addListener(() => {
@@ -36,6 +38,7 @@ function connectToNativeApp() {
       }
       
       nativePort = null;
+      pendingChunks.clear(); // Chunk ids start over with the next host
       
       if (eyeTrackingEnabled) {
         console.log('⏰ Will retry connection in 5 seconds...');
@@ -43,29 +46,173 @@ function connectToNativeApp() {
       }
     });
     
+    hostContext = undefined; // A new host starts without a context
+    updateHostContext();
     console.log('✅ Connected to eye tracking monitor');
   } catch (error) {
     console.error('❌ Failed to connect to native app:', error);
   }
 }
 
-// Pause all YouTube videos
-async function pauseYouTubeVideos() {
+// Messages from the native host
+function handleHostMessage(message) {
+  console.log('📨 Message from eye tracker:', message.action);
+  
+  if (message.action === 'pause_video' && message.reason === 'eyes_away') {
+    console.log('🎯 Pause command received - forwarding to YouTube tabs');
+    pauseYouTubeVideos();
+  }
+  else if (message.action === 'debug_frame') {
+    // Forward debug frame to YouTube tabs for display
+    sendDebugFrame(message.frame, message.focused, message.away_duration);
+  }
+  else if (message.action === 'camera_error') {
+    console.error('❌ Camera error:', message.error);
+    sendCameraError(message.error);
+  }
+  else if (message.action === 'stats') {
+    lastHostStats = message;
+    const throttled = message.throttle && message.throttle !== 'full' ? ` (throttled: ${message.throttle})` : '';
+    console.log(`📊 Host stats: ${message.fps} FPS, motion gate hit rate ${Math.round(message.motion_gate_hit_rate * 100)}%${throttled}`);
+  }
+  else if (message.action === 'camera_status') {
+    // Host stays connected while the camera reconnects - no restart needed
+    console.log(`📷 Camera ${message.state} (reconnect attempts: ${message.reconnect_attempts})`);
+    sendCameraStatus(message.state);
+  }
+  else if (message.action === 'drowsy') {
+    console.log(`😴 Drowsy: ${message.drowsy} (PERCLOS ${Math.round(message.perclos * 100)}%, ${message.blink_rate} blinks/min)`);
+  }
+  else if (message.action === 'recording_saved') {
+    console.log(`🎞️ Host saved the last seconds of camera frames (${message.reason}): ${message.path}`);
+  }
+  else if (message.action === 'profile_saved') {
+    console.log(`⏱️ Host profile saved: ${message.path}`);
+  }
+  else if (message.action === 'config') {
+    console.log('⚙️ Host config changed:', message.changed);
+  }
+  else if (message.action === 'config_error') {
+    console.warn('⚙️ Host rejected config:', message.errors);
+  }
+  else if (message.action === 'away_start' || message.action === 'away_end') {
+    // Every away interval, glances included - lets recaps cover just the missed span
+    sendAwayEvent(message.action === 'away_start' ? 'start' : 'end', message.t, message.d);
+  }
+}
+
+// Send a command to the native host (it reads them on stdin)
+function sendHostCommand(command, args = {}) {
+  if (!nativePort) {
+    console.log(`⚠️ Can't send ${command} - native host not connected`);
+    return false;
+  }
+  nativePort.postMessage({ command, ...args });
+  return true;
+}
+
+// The video being watched: playing in the tab on screen, else playing anywhere
+function activeVideoId() {
+  const onScreen = registeredTabs(state => state.playing && state.visible);
+  const tabId = onScreen.length ? onScreen[0] : registeredTabs(state => state.playing)[0];
+  return tabId === undefined ? null : youtubeTabs.get(tabId).videoId || null;
+}
+
+// Tell the host which video its focus timeline rows belong to, when that changes.
+// Nothing to tell while disconnected - connecting sends the current one
+function updateHostContext() {
+  if (!nativePort) return;
+  const context = activeVideoId();
+  if (context !== hostContext && sendHostCommand('set_context', { context })) {
+    hostContext = context;
+  }
+}
+
+// Host messages over 1 MB arrive as chunks of the JSON text: { id, seq, total, data }
+function joinChunk(chunk) {
+  let parts = pendingChunks.get(chunk.id);
+  if (!parts) {
+    if (pendingChunks.size >= MAX_PENDING_CHUNKED) {
+      // A message whose chunks never all arrived - don't hold on to it forever
+      const oldest = pendingChunks.keys().next().value;
+      console.log(`⚠️ Dropping incomplete chunked host message ${oldest}`);
+      pendingChunks.delete(oldest);
+    }
+    parts = { received: 0, data: new Array(chunk.total) };
+    pendingChunks.set(chunk.id, parts);
+  }
+  if (parts.data[chunk.seq] === undefined) {
+    parts.data[chunk.seq] = chunk.data;
+    parts.received++;
+  }
+  if (parts.received < chunk.total) {
+    return null;
+  }
+  pendingChunks.delete(chunk.id);
+  return JSON.parse(parts.data.join(''));
+}
+
+// Registered tab ids matching a filter on their state
+function registeredTabs(filter = () => true) {
+  const ids = [];
+  for (const [tabId, state] of youtubeTabs) {
+    if (filter(state)) ids.push(tabId);
+  }
+  return ids;
+}
+
+// The worker can be restarted at any time - ask open YouTube tabs to report in again
+async function rebuildTabRegistry() {
   try {
-    console.log('🔍 Finding YouTube tabs...');
     const tabs = await chrome.tabs.query({ url: '*://*.youtube.com/*' });
+    for (const tab of tabs) {
+      chrome.tabs.sendMessage(tab.id, { type: 'REPORT_VIDEO_STATE' }).catch(() => {});
+    }
+  } catch (error) {
+    console.error('❌ Error rebuilding tab registry:', error);
+  }
+}
+
+chrome.tabs.onRemoved.addListener((tabId) => {
+  youtubeTabs.delete(tabId);
+  updateHostContext();
+});
+
+chrome.tabs.onUpdated.addListener((tabId, changeInfo) => {
+  // Navigated away from YouTube - the content script is gone
+  if (changeInfo.url && !/^https?:\/\/([^/]*\.)?youtube\.com\//.test(changeInfo.url)) {
+    youtubeTabs.delete(tabId);
+    updateHostContext();
+  }
+});
+
+rebuildTabRegistry();
+
+// Pause YouTube videos that are playing
+async function pauseYouTubeVideos() {
+  try {
+    // Only tabs that are actually playing need a pause
+    let tabIds = registeredTabs(state => state.playing);
+    if (youtubeTabs.size === 0) {
+      // Registry is empty after a service worker restart until the tabs report
+      // again - don't drop the pause, send it to every YouTube tab
+      const tabs = await chrome.tabs.query({ url: '*://*.youtube.com/*' });
+      tabIds = tabs.map(tab => tab.id);
+      rebuildTabRegistry();
+    }
     
-    console.log(`📺 Found ${tabs.length} YouTube tabs`);
+    console.log(`📺 ${tabIds.length} playing YouTube tabs`);
     
-    for (const tab of tabs) {
-      console.log(`📤 Sending pause command to tab ${tab.id}`);
-      chrome.tabs.sendMessage(tab.id, {
+    for (const tabId of tabIds) {
+      console.log(`📤 Sending pause command to tab ${tabId}`);
+      chrome.tabs.sendMessage(tabId, {
         type: 'EYE_TRACKING_PAUSE',
         reason: 'User looked away from screen'
       }).then(() => {
-        console.log(`✅ Pause sent to tab ${tab.id}`);
+        console.log(`✅ Pause sent to tab ${tabId}`);
       }).catch((error) => {
-        console.log(`⚠️ Could not send to tab ${tab.id}:`, error.message);
+        console.log(`⚠️ Could not send to tab ${tabId}:`, error.message);
+        youtubeTabs.delete(tabId);
       });
     }
   } catch (error) {
@@ -76,10 +223,9 @@ async function pauseYouTubeVideos() {
 // Send debug frame to YouTube tabs
 async function sendDebugFrame(frameData, focused, awayDuration) {
   try {
-    const tabs = await chrome.tabs.query({ url: '*://*.youtube.com/*' });
-    
-    for (const tab of tabs) {
-      chrome.tabs.sendMessage(tab.id, {
+    // Frames only go to the tab on screen that shows the debug view
+    for (const tabId of registeredTabs(state => state.visible && state.debugView)) {
+      chrome.tabs.sendMessage(tabId, {
         type: 'DEBUG_FRAME',
         frame: frameData,
         focused: focused,
@@ -96,10 +242,8 @@ async function sendDebugFrame(frameData, focused, awayDuration) {
 // Send camera error to YouTube tabs
 async function sendCameraError(error) {
   try {
-    const tabs = await chrome.tabs.query({ url: '*://*.youtube.com/*' });
-    
-    for (const tab of tabs) {
-      chrome.tabs.sendMessage(tab.id, {
+    for (const tabId of registeredTabs()) {
+      chrome.tabs.sendMessage(tabId, {
         type: 'CAMERA_ERROR',
         error: error
       }).catch(() => {});
@@ -109,11 +253,53 @@ async function sendCameraError(error) {
   }
 }
 
+// Send camera connection state ("ok" / "degraded") to YouTube tabs
+async function sendCameraStatus(state) {
+  try {
+    for (const tabId of registeredTabs()) {
+      chrome.tabs.sendMessage(tabId, {
+        type: 'CAMERA_STATUS',
+        state: state
+      }).catch(() => {});
+    }
+  } catch (error) {
+    // Silently fail
+  }
+}
+
+// Send away-interval events (host monotonic seconds) to YouTube tabs
+async function sendAwayEvent(phase, t, duration) {
+  try {
+    for (const tabId of registeredTabs()) {
+      chrome.tabs.sendMessage(tabId, {
+        type: 'AWAY_EVENT',
+        phase: phase,
+        t: t,
+        duration: duration
+      }).catch(() => {});
+    }
+  } catch (error) {
+    // Silently fail
+  }
+}
+
 // Listen for messages from popup/content scripts
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   console.log('📨 Message received:', message.type);
   
-  if (message.type === 'START_EYE_TRACKING') {
+  if (message.type === 'VIDEO_STATE') {
+    if (sender.tab) {
+      youtubeTabs.set(sender.tab.id, {
+        playing: message.playing,
+        visible: message.visible,
+        debugView: message.debugView,
+        videoId: message.videoId
+      });
+      updateHostContext();
+    }
+    sendResponse({ success: true });
+  }
+  else if (message.type === 'START_EYE_TRACKING') {
     console.log('▶️ Starting eye tracking...');
     eyeTrackingEnabled = true;
     connectToNativeApp();
@@ -128,10 +314,18 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     }
     sendResponse({ success: true });
   }
+  else if (message.type === 'HOST_COMMAND') {
+    // e.g. chrome.runtime.sendMessage({ type: 'HOST_COMMAND', command: 'dump_recording' })
+    // or { type: 'HOST_COMMAND', command: 'start_profile', args: { seconds: 10, format: 'pstats' } }
+    // or { type: 'HOST_COMMAND', command: 'set_config', args: { values: { away_threshold: 8 } } }
+    // (set_context is sent automatically from the tab registry)
+    sendResponse({ success: sendHostCommand(message.command, message.args) });
+  }
   else if (message.type === 'GET_EYE_TRACKING_STATUS') {
     sendResponse({ 
       enabled: eyeTrackingEnabled,
-      connected: nativePort !== null 
+      connected: nativePort !== null,
+      stats: lastHostStats
     });
   }
   
@@ -0,0 +1,124 @@
+// Recap Response Cache - content-addressed AI responses in chrome.storage.local
+// Entries are keyed by a SHA-256 of (video id, time window, prompt type, ...), the
+// least recently used ones are evicted, and identical requests that are already
+// in flight share a single fetch. The LRU index is one storage key, so every
+// read-modify-write of it runs one at a time (see withIndex)
+
+class RecapCache {
+  constructor(maxEntries = 200) {
+    this.maxEntries = maxEntries;
+    this.inFlight = new Map(); // key -> Promise of the response
+    this.indexQueue = Promise.resolve(); // Index updates of this tab, when Web Locks are missing
+    this.hits = 0;
+    this.misses = 0;
+  }
+
+  static async hashKey(parts) {
+    const data = new TextEncoder().encode(JSON.stringify(parts));
+    const digest = await crypto.subtle.digest('SHA-256', data);
+    return Array.from(new Uint8Array(digest))
+      .map(b => b.toString(16).padStart(2, '0'))
+      .join('');
+  }
+
+  // Cached response for `parts`, or the result of produce() (stored for next time).
+  // Errors from produce() are not cached.
+  async get(parts, produce) {
+    const key = 'recap:' + await RecapCache.hashKey(parts);
+
+    if (this.inFlight.has(key)) {
+      console.log('⏳ Same recap already requested - waiting for it');
+      return this.inFlight.get(key);
+    }
+
+    const request = this.lookupOrProduce(key, produce);
+    this.inFlight.set(key, request);
+    try {
+      return await request;
+    } finally {
+      this.inFlight.delete(key);
+    }
+  }
+
+  async lookupOrProduce(key, produce) {
+    try {
+      const stored = await chrome.storage.local.get(key);
+      if (stored[key] !== undefined) {
+        this.hits++;
+        console.log(`⚡ Recap cache hit (${this.hits} hits, ${this.misses} misses)`);
+        this.touch(key);
+        return stored[key].value;
+      }
+    } catch (error) {
+      console.log('⚠️ Recap cache unavailable:', error.message);
+    }
+
+    this.misses++;
+    const value = await produce();
+    await this.store(key, value);
+    return value;
+  }
+
+  // Run update(index) on the stored LRU index, one update at a time. Two recaps
+  // finishing together would otherwise each write back their own copy of the
+  // index, and the entry missing from the last write would never be evicted.
+  // Web Locks are per origin, so this also serializes the other YouTube tabs
+  withIndex(update) {
+    const run = async () => {
+      const { recapCacheIndex = {} } = await chrome.storage.local.get('recapCacheIndex');
+      return update(recapCacheIndex);
+    };
+    if (typeof navigator !== 'undefined' && navigator.locks) {
+      return navigator.locks.request('eye-focus-recap-cache-index', run);
+    }
+    const next = this.indexQueue.then(run);
+    this.indexQueue = next.catch(() => {});
+    return next;
+  }
+
+  // Mark an entry as recently used
+  async touch(key) {
+    try {
+      await this.withIndex(async (recapCacheIndex) => {
+        if (recapCacheIndex[key] === undefined) return; // Evicted since it was read
+        recapCacheIndex[key] = Date.now();
+        await chrome.storage.local.set({ recapCacheIndex });
+      });
+    } catch (error) {
+      // Ordering only - a missed update just makes eviction slightly less accurate
+    }
+  }
+
+  async store(key, value) {
+    try {
+      await this.withIndex(async (recapCacheIndex) => {
+        recapCacheIndex[key] = Date.now();
+
+        // Evict the least recently used entries over the limit
+        const keys = Object.keys(recapCacheIndex);
+        const evicted = [];
+        if (keys.length > this.maxEntries) {
+          keys.sort((a, b) => recapCacheIndex[a] - recapCacheIndex[b]);
+          for (const old of keys.slice(0, keys.length - this.maxEntries)) {
+            delete recapCacheIndex[old];
+            evicted.push(old);
+          }
+        }
+
+        // Entry and index in one write, so neither exists without the other
+        await chrome.storage.local.set({ [key]: { value, storedAt: Date.now() }, recapCacheIndex });
+        if (evicted.length > 0) {
+          await chrome.storage.local.remove(evicted);
+        }
+      });
+    } catch (error) {
+      console.log('⚠️ Could not cache recap:', error.message);
+    }
+  }
+
+  async clear() {
+    await this.withIndex(async (recapCacheIndex) => {
+      await chrome.storage.local.remove([...Object.keys(recapCacheIndex), 'recapCacheIndex']);
+    });
+  }
+}
@@ -8,9 +8,14 @@ class YouTubeRecapBot {
     this.recapOverlay = null;
     this.debugOverlay = null;
     this.pausedByEyeTracking = false; // Flag to track eye tracking pauses
+    this.awayStart = null; // Video time when the user looked away (while playing)
+    this.missedSpan = null; // { start, end } video seconds played while the user was away
     this.importantTopics = []; // Store important topics with timestamps
     this.topicCheckInterval = null; // Interval for checking upcoming topics
     this.shownTopicAlerts = new Set(); // Track which alerts we've already shown
+    this.recapCache = new RecapCache(); // AI responses per (video, window, prompt type)
+    this.debugViewClosed = false; // User closed the eye tracking debug view
+    this.reportedState = null; // Last VIDEO_STATE sent to the background registry
     this.settings = {
       pauseDelay: 1,
       showOnPause: true,
@@ -44,11 +49,29 @@ class YouTubeRecapBot {
         this.showCameraError(message.error);
         sendResponse({ success: true });
       }
+      else if (message.type === 'CAMERA_STATUS') {
+        this.updateCameraStatus(message.state);
+        sendResponse({ success: true });
+      }
+      else if (message.type === 'AWAY_EVENT') {
+        this.handleAwayEvent(message.phase, message.duration);
+        sendResponse({ success: true });
+      }
+      else if (message.type === 'REPORT_VIDEO_STATE') {
+        // Background worker restarted and lost its tab registry
+        this.reportedState = null;
+        this.reportVideoState();
+        sendResponse({ success: true });
+      }
       return true; // Keep channel open
     });
     
     console.log('✅ Eye tracking listener registered');
     
+    // Background only sends debug frames to the tab on screen
+    document.addEventListener('visibilitychange', () => this.reportVideoState());
+    this.reportVideoState();
+    
     // Wait for page to be ready
     if (document.readyState === 'loading') {
       document.addEventListener('DOMContentLoaded', () => this.setupYouTubeDetection());
@@ -65,6 +88,7 @@ class YouTubeRecapBot {
         huggingfaceKey: '',
         geminiKey: '',
         apiKey: '',
+        groqApiBase: 'https://api.groq.com/openai/v1', // Point at recap_stub_server.py for testing
         pauseDelay: 1,
         showOnPause: true,
         topicAlertsEnabled: true,
@@ -107,14 +131,18 @@ class YouTubeRecapBot {
     // Remove old listeners if any
     this.currentVideo.removeEventListener('pause', this.boundHandlePause);
     this.currentVideo.removeEventListener('play', this.boundHandlePlay);
+    this.currentVideo.removeEventListener('ended', this.boundReportVideoState);
     
     // Create bound versions
     this.boundHandlePause = () => this.handlePause();
     this.boundHandlePlay = () => this.handlePlay();
+    this.boundReportVideoState = () => this.reportVideoState();
     
     // Attach new listeners
     this.currentVideo.addEventListener('pause', this.boundHandlePause);
     this.currentVideo.addEventListener('play', this.boundHandlePlay);
+    this.currentVideo.addEventListener('ended', this.boundReportVideoState);
+    this.reportVideoState();
     
     console.log('🎧 Event listeners attached to video');
     
@@ -128,6 +156,7 @@ class YouTubeRecapBot {
 
   handlePause() {
     console.log('⏸️ Video paused!');
+    this.reportVideoState();
     
     // Don't show recap if paused by eye tracking
     if (this.pausedByEyeTracking) {
@@ -155,9 +184,11 @@ class YouTubeRecapBot {
 
   handlePlay() {
     console.log('▶️ Video playing - hiding overlay');
+    this.reportVideoState();
     
     // Reset eye tracking flag when video plays
     this.pausedByEyeTracking = false;
+    this.missedSpan = null;
     
     if (this.pauseTimeout) {
       clearTimeout(this.pauseTimeout);
@@ -165,6 +196,33 @@ class YouTubeRecapBot {
     this.hideRecapOverlay();
   }
 
+  // Tell the background tab registry whether this tab is playing and on screen,
+  // so pauses and debug frames only go where they matter
+  reportVideoState() {
+    const video = this.currentVideo || document.querySelector('video');
+    const state = {
+      playing: !!video && !video.paused && !video.ended,
+      visible: document.visibilityState === 'visible',
+      debugView: !this.debugViewClosed,
+      videoId: this.videoId()
+    };
+    
+    const previous = this.reportedState;
+    if (previous && previous.playing === state.playing && previous.visible === state.visible
+        && previous.debugView === state.debugView && previous.videoId === state.videoId) {
+      return;
+    }
+    this.reportedState = state;
+    
+    try {
+      chrome.runtime.sendMessage({ type: 'VIDEO_STATE', ...state }).catch(() => {
+        this.reportedState = null; // Worker not reachable - try again on the next change
+      });
+    } catch (error) {
+      // Extension was reloaded - this content script is orphaned
+    }
+  }
+
   handleEyeTrackingPause(reason) {
     console.log('👁️ Eye tracking pause handler called');
     
@@ -182,6 +240,12 @@ class YouTubeRecapBot {
       // Set flag BEFORE pausing (so handlePause knows it was us)
       this.pausedByEyeTracking = true;
       
+      // The user missed everything since they looked away
+      if (this.awayStart !== null) {
+        this.missedSpan = { start: this.awayStart, end: video.currentTime };
+        console.log(`🙈 Missed ${this.formatTime(this.missedSpan.start)} - ${this.formatTime(this.missedSpan.end)}`);
+      }
+      
       video.pause();
       console.log('✅ Video paused by eye tracking');
       
@@ -196,6 +260,42 @@ class YouTubeRecapBot {
     }
   }
 
+  handleAwayEvent(phase, duration) {
+    const video = this.currentVideo || document.querySelector('video');
+    if (!video) return;
+    
+    if (phase === 'start') {
+      // Nothing is missed while the video isn't playing
+      this.awayStart = video.paused ? null : video.currentTime;
+    } else {
+      if (this.awayStart !== null && !this.pausedByEyeTracking) {
+        console.log(`👀 Glance away for ${duration}s (${this.formatTime(this.awayStart)} - ${this.formatTime(video.currentTime)})`);
+      }
+      this.awayStart = null;
+    }
+  }
+
+  // Part of the video a recap should cover: the span missed while away after an
+  // eye-tracking pause, otherwise the last 20 seconds
+  recapWindow(currentTime) {
+    if (this.pausedByEyeTracking && this.missedSpan) {
+      // At least 5 seconds, so a quick pause still has something to summarize
+      const start = Math.max(0, Math.min(Math.floor(this.missedSpan.start), currentTime - 5));
+      return {
+        start: start,
+        end: currentTime,
+        heading: `Missed while away (${this.formatTime(start)} - ${this.formatTime(currentTime)})`,
+        label: `the ${currentTime - start} seconds the viewer missed`
+      };
+    }
+    return {
+      start: Math.max(0, currentTime - 20),
+      end: currentTime,
+      heading: 'Last 20 seconds',
+      label: 'the last 20 seconds'
+    };
+  }
+
   async showRecapOverlay() {
     if (this.recapOverlay) {
       console.log('⚠️ Overlay already visible');
@@ -321,7 +421,7 @@ Format:
 • Third key point`;
     }
 
-    const response = await fetch('https://api.groq.com/openai/v1/chat/completions', {
+    const response = await fetch(`${this.settings.groqApiBase || 'https://api.groq.com/openai/v1'}/chat/completions`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -522,7 +622,8 @@ Format as:
       description: '',
       url: window.location.href,
       tags: [],
-      captions: null
+      captions: null,
+      recapWindow: this.recapWindow(0)
     };
 
     try {
@@ -545,6 +646,7 @@ Format as:
       if (this.currentVideo) {
         context.currentTime = Math.floor(this.currentVideo.currentTime);
         context.duration = Math.floor(this.currentVideo.duration);
+        context.recapWindow = this.recapWindow(context.currentTime);
         console.log(`⏱️ Time: ${context.currentTime}s / ${context.duration}s`);
       }
 
@@ -552,13 +654,13 @@ Format as:
       if (descElement) context.description = descElement.textContent.trim().substring(0, 1000);
 
       console.log('🎯 Attempting to get captions...');
-      const captionData = await this.getCaptionsAroundTime(context.currentTime);
+      const captionData = await this.getCaptionsAroundTime(context.currentTime, context.recapWindow.start);
       if (captionData) {
         console.log('✅ Got captions from TextTracks!');
         context.captions = captionData;
       } else {
         console.log('⚠️ TextTracks failed, trying YouTube transcript...');
-        const transcriptData = await this.getYouTubeTranscript(context.currentTime);
+        const transcriptData = await this.getYouTubeTranscript(context.currentTime, context.recapWindow.start);
         if (transcriptData) {
           console.log('✅ Got transcript from YouTube API!');
           context.captions = transcriptData;
@@ -615,7 +717,7 @@ Format as:
     }
   }
 
-  async getCaptionsAroundTime(currentTime) {
+  async getCaptionsAroundTime(currentTime, windowStart = Math.max(0, currentTime - 20)) {
     try {
       console.log('🔍 Checking for TextTracks...');
       if (!this.currentVideo || !this.currentVideo.textTracks) {
@@ -670,7 +772,7 @@ Format as:
 
       const allCaptions = [];
       const last20SecondsCaptions = [];
-      const startTime = Math.max(0, currentTime - 20);
+      const startTime = windowStart;
 
       for (let i = 0; i < activeTrack.cues.length; i++) {
         const cue = activeTrack.cues[i];
@@ -708,7 +810,7 @@ Format as:
     }
   }
 
-  async getYouTubeTranscript(currentTime) {
+  async getYouTubeTranscript(currentTime, windowStart = Math.max(0, currentTime - 20)) {
     try {
       console.log('📜 Reading YouTube transcript...');
       
@@ -754,7 +856,7 @@ Format as:
       
       const allCaptions = [];
       const last20SecondsCaptions = [];
-      const startTime = Math.max(0, currentTime - 20);
+      const startTime = windowStart;
       
       transcriptSegments.forEach((segment) => {
         const timeElement = segment.querySelector('.segment-timestamp');
@@ -814,7 +916,7 @@ Format as:
     }
   }
 
-  parseTranscriptFromXML(xmlText, currentTime) {
+  parseTranscriptFromXML(xmlText, currentTime, windowStart = Math.max(0, currentTime - 20)) {
     try {
       console.log('🔄 Parsing transcript XML...');
       const parser = new DOMParser();
@@ -825,7 +927,7 @@ Format as:
 
       const allCaptions = [];
       const last20SecondsCaptions = [];
-      const startTime = Math.max(0, currentTime - 20);
+      const startTime = windowStart;
 
       console.log(`⏱️ Looking for captions between ${startTime}s and ${currentTime}s`);
 
@@ -910,28 +1012,42 @@ Format as:
   async generateAIResponse(context, type = 'summary') {
     const provider = this.settings.aiProvider || 'demo';
 
-    if (provider === 'demo') {
+    if (!['groq', 'huggingface', 'gemini', 'openai'].includes(provider)) {
       return this.generateDemoResponse(context);
     }
 
     try {
-      if (provider === 'groq') {
-        return await this.generateGroqResponse(context);
-      } else if (provider === 'huggingface') {
-        return await this.generateHuggingFaceResponse(context);
-      } else if (provider === 'gemini') {
-        return await this.generateGeminiResponse(context);
-      } else if (provider === 'openai') {
-        return await this.generateOpenAIResponse(context);
-      } else {
-        return this.generateDemoResponse(context);
-      }
+      // Repeat pauses over the same part of the video reuse the earlier recap
+      const span = context.recapWindow;
+      return await this.recapCache.get(
+        { video: this.videoId(), type: type, provider: provider, start: span.start, end: span.end },
+        () => this.requestProviderResponse(provider, context)
+      );
     } catch (error) {
       console.error(`Error with ${provider}:`, error);
       return this.generateDemoResponse(context);
     }
   }
 
+  async requestProviderResponse(provider, context) {
+    if (provider === 'groq') {
+      return await this.generateGroqResponse(context);
+    } else if (provider === 'huggingface') {
+      return await this.generateHuggingFaceResponse(context);
+    } else if (provider === 'gemini') {
+      return await this.generateGeminiResponse(context);
+    }
+    return await this.generateOpenAIResponse(context);
+  }
+
+  // YouTube video id of the current page (watch or shorts URL)
+  videoId() {
+    const params = new URLSearchParams(window.location.search);
+    if (params.get('v')) return params.get('v');
+    const shorts = window.location.pathname.match(/\/shorts\/([^/?]+)/);
+    return shorts ? shorts[1] : window.location.pathname;
+  }
+
   async generateGroqResponse(context) {
     const apiKey = this.settings.groqKey;
     if (!apiKey) throw new Error('Groq API key not configured');
@@ -941,7 +1057,7 @@ Format as:
       `Full video context: ${context.captions.fullTranscript.substring(0, 2000)}` : 
       '';
     const recentContent = hasTranscript ? 
-      `Last 20 seconds: ${context.captions.last20Seconds}` : 
+      `${context.recapWindow.heading}: ${context.captions.last20Seconds}` : 
       `Video at ${context.currentTime}s of ${context.duration}s`;
 
     const prompt = `You are summarizing a YouTube video titled "${context.title}" by ${context.channel}.
@@ -950,12 +1066,12 @@ ${transcriptContext}
 
 ${recentContent}
 
-Provide exactly 3 bullet points summarizing what happened in the last 20 seconds. Be specific and reference actual content from the transcript. Use this format:
+Provide exactly 3 bullet points summarizing what happened in ${context.recapWindow.label}. Be specific and reference actual content from the transcript. Use this format:
 • First key point
 • Second key point  
 • Third key point`;
 
-    const response = await fetch('https://api.groq.com/openai/v1/chat/completions', {
+    const response = await fetch(`${this.settings.groqApiBase || 'https://api.groq.com/openai/v1'}/chat/completions`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -998,7 +1114,7 @@ Provide exactly 3 bullet points summarizing what happened in the last 20 seconds
       `Recent: ${context.captions.last20Seconds}` : 
       `Time: ${context.currentTime}s`;
 
-    const prompt = `Summarize in 3 bullets what happened in the last 20 seconds of "${context.title}": ${transcriptContext} ${recentContent}`;
+    const prompt = `Summarize in 3 bullets what happened in ${context.recapWindow.label} of "${context.title}": ${transcriptContext} ${recentContent}`;
 
     const response = await fetch('https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2', {
       method: 'POST',
@@ -1033,10 +1149,10 @@ Provide exactly 3 bullet points summarizing what happened in the last 20 seconds
       `Full context: ${context.captions.fullTranscript.substring(0, 2000)}` : 
       '';
     const recentContent = hasTranscript ? 
-      `Last 20 seconds: ${context.captions.last20Seconds}` : 
+      `${context.recapWindow.heading}: ${context.captions.last20Seconds}` : 
       `Video at ${context.currentTime}s`;
 
-    const prompt = `Create exactly 3 bullet points summarizing the last 20 seconds of this YouTube video:
+    const prompt = `Create exactly 3 bullet points summarizing ${context.recapWindow.label} of this YouTube video:
 Title: ${context.title}
 Channel: ${context.channel}
 ${transcriptContext}
@@ -1082,10 +1198,10 @@ Format as:
       `Full context: ${context.captions.fullTranscript.substring(0, 2000)}` : 
       '';
     const recentContent = hasTranscript ? 
-      `Last 20 seconds: ${context.captions.last20Seconds}` : 
+      `${context.recapWindow.heading}: ${context.captions.last20Seconds}` : 
       `Video at ${context.currentTime}s`;
 
-    const prompt = `Summarize in exactly 3 bullet points what happened in the last 20 seconds of "${context.title}" by ${context.channel}. ${transcriptContext} ${recentContent}`;
+    const prompt = `Summarize in exactly 3 bullet points what happened in ${context.recapWindow.label} of "${context.title}" by ${context.channel}. ${transcriptContext} ${recentContent}`;
 
     const response = await fetch('https://api.openai.com/v1/chat/completions', {
       method: 'POST',
@@ -1239,34 +1355,12 @@ Rules:
 - Topics should be spaced apart (not all at the beginning)
 - Be specific about what the topic is about`;
 
-      console.log('🤖 Sending request to Groq AI...');
-
       if (provider === 'groq') {
-        const apiKey = this.settings.groqKey;
-        const response = await fetch('https://api.groq.com/openai/v1/chat/completions', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${apiKey}`
-          },
-          body: JSON.stringify({
-            model: 'llama-3.1-8b-instant',
-            messages: [
-              { role: 'system', content: 'You are a helpful assistant that analyzes video content. Always return valid JSON.' },
-              { role: 'user', content: prompt }
-            ],
-            temperature: 0.3,
-            max_tokens: 300
-          })
-        });
-        
-        if (!response.ok) {
-          console.error('❌ API request failed:', response.status);
-          throw new Error('API request failed');
-        }
-        
-        const data = await response.json();
-        const responseText = data.choices[0].message.content;
+        // Topics depend only on the video - analyze each one once
+        const responseText = await this.recapCache.get(
+          { video: this.videoId(), type: 'topics', provider: provider },
+          () => this.requestTopicAnalysis(prompt)
+        );
         console.log('📝 AI Response:', responseText);
         
         // Try to extract JSON from response
@@ -1286,6 +1380,35 @@ Rules:
     }
   }
 
+  async requestTopicAnalysis(prompt) {
+    console.log('🤖 Sending request to Groq AI...');
+    const apiKey = this.settings.groqKey;
+    const response = await fetch(`${this.settings.groqApiBase || 'https://api.groq.com/openai/v1'}/chat/completions`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${apiKey}`
+      },
+      body: JSON.stringify({
+        model: 'llama-3.1-8b-instant',
+        messages: [
+          { role: 'system', content: 'You are a helpful assistant that analyzes video content. Always return valid JSON.' },
+          { role: 'user', content: prompt }
+        ],
+        temperature: 0.3,
+        max_tokens: 300
+      })
+    });
+    
+    if (!response.ok) {
+      console.error('❌ API request failed:', response.status);
+      throw new Error('API request failed');
+    }
+    
+    const data = await response.json();
+    return data.choices[0].message.content;
+  }
+
   startTopicMonitoring() {
     console.log('👀 Starting topic monitoring...');
     
@@ -1554,21 +1677,16 @@ Rules:
         transcript: hasTranscript ? this.currentContext.captions.fullTranscript : null
       };
 
-      switch (this.settings.provider) {
-        case 'groq':
-          response = await this.generateGroqChatResponse(contextInfo);
-          break;
-        case 'huggingface':
-          response = await this.generateHuggingFaceChatResponse(contextInfo);
-          break;
-        case 'gemini':
-          response = await this.generateGeminiChatResponse(contextInfo);
-          break;
-        case 'openai':
-          response = await this.generateOpenAIChatResponse(contextInfo);
-          break;
-        default:
-          response = await this.generateDemoChatResponse(contextInfo);
+      const provider = this.settings.provider;
+      if (['groq', 'huggingface', 'gemini', 'openai'].includes(provider)) {
+        // Same question at the same point in the video - answer from the cache
+        response = await this.recapCache.get(
+          { video: this.videoId(), type: 'chat', provider: provider, time: contextInfo.currentTime,
+            question: question.trim().toLowerCase() },
+          () => this.requestChatResponse(provider, contextInfo)
+        );
+      } else {
+        response = await this.generateDemoChatResponse(contextInfo);
       }
 
       loadingDiv.remove();
@@ -1580,6 +1698,19 @@ Rules:
     }
   }
 
+  async requestChatResponse(provider, contextInfo) {
+    switch (provider) {
+      case 'groq':
+        return await this.generateGroqChatResponse(contextInfo);
+      case 'huggingface':
+        return await this.generateHuggingFaceChatResponse(contextInfo);
+      case 'gemini':
+        return await this.generateGeminiChatResponse(contextInfo);
+      default:
+        return await this.generateOpenAIChatResponse(contextInfo);
+    }
+  }
+
   async generateGroqChatResponse(context) {
     const apiKey = this.settings.apiKey;
     if (!apiKey) throw new Error('Groq API key not configured');
@@ -1590,7 +1721,7 @@ Rules:
 
     const prompt = `You are a helpful assistant answering questions about the YouTube video "${context.title}" by ${context.channel}. The user is currently at ${this.formatTime(context.currentTime)}.${transcriptContext}\n\nUser question: ${context.question}\n\nProvide a helpful, concise answer based on the video content.`;
 
-    const response = await fetch('https://api.groq.com/openai/v1/chat/completions', {
+    const response = await fetch(`${this.settings.groqApiBase || 'https://api.groq.com/openai/v1'}/chat/completions`, {
       method: 'POST',
       headers: {
         'Authorization': `Bearer ${apiKey}`,
@@ -1780,6 +1911,9 @@ Rules:
           if (toRemove) {
             toRemove.remove();
           }
+          // Stop the frames too, not just the view (until the page is reloaded)
+          this.debugViewClosed = true;
+          this.reportVideoState();
         });
       }
       
@@ -1809,6 +1943,20 @@ Rules:
     overlay.style.borderColor = focused ? '#00ff00' : '#ff0000';
   }
 
+  updateCameraStatus(state) {
+    console.log('📷 Camera status:', state);
+    
+    const overlay = document.getElementById('eye-tracking-debug');
+    if (!overlay) return;
+    
+    // Frames stop while the host reconnects - say so instead of freezing on the last one
+    const statusDiv = overlay.querySelector('.eye-tracking-status');
+    if (statusDiv && state === 'degraded') {
+      statusDiv.innerHTML = '<span style="color: #ffaa00; font-weight: bold;">📷 Camera reconnecting...</span>';
+      overlay.style.borderColor = '#ffaa00';
+    }
+  }
+
   showCameraError(errorMessage) {
     console.error('📷 Camera error:', errorMessage);
     
@@ -0,0 +1,61 @@
+"""
+Eye Geometry Cache
+Eye boxes barely move relative to the face, so they are stored normalized to the
+tracked face region and reused until a periodic refresh or a drop in pupil
+confidence sends the eye cascade back in
+"""
+
+
+class EyeGeometryCache:
+    def __init__(self, refresh_interval=1.0, min_confidence=0.5, max_face_shift=0.15):
+        """
+        refresh_interval: seconds before the eye cascade must run again
+        min_confidence:   pupil confidence below which the cached boxes are dropped
+        max_face_shift:   face movement/resize (fraction of its width) that invalidates the cache
+        """
+        self.refresh_interval = refresh_interval
+        self.min_confidence = min_confidence
+        self.max_face_shift = max_face_shift
+
+        self._face = None
+        self._boxes = []       # (x, y, w, h) as fractions of the face region
+        self._updated_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, face, now):
+        """Cached eye boxes in pixels relative to the face region, or None to re-run the cascade"""
+        if self._face is None or now - self._updated_at > self.refresh_interval or self._moved(face):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        fx, fy, fw, fh = face
+        return [(int(x * fw), int(y * fh), max(1, int(w * fw)), max(1, int(h * fh)))
+                for (x, y, w, h) in self._boxes]
+
+    def update(self, face, eyes, now):
+        """Store fresh eye cascade boxes (relative to the face region)"""
+        fx, fy, fw, fh = face
+        if len(eyes) == 0 or fw == 0 or fh == 0:
+            self.invalidate()
+            return
+        self._face = tuple(face)
+        self._boxes = [(ex / fw, ey / fh, ew / fw, eh / fh) for (ex, ey, ew, eh) in eyes]
+        self._updated_at = now
+
+    def report_confidence(self, confidence):
+        """Drop the cache when a pupil fit on a cached box looks unreliable"""
+        if confidence < self.min_confidence:
+            self.invalidate()
+
+    def invalidate(self):
+        self._face = None
+        self._boxes = []
+
+    def _moved(self, face):
+        x, y, w, h = face
+        ox, oy, ow, oh = self._face
+        limit = self.max_face_shift * ow
+        return abs(x - ox) > limit or abs(y - oy) > limit or abs(w - ow) > limit
@@ -0,0 +1,118 @@
+"""
+Shared Eye Detection
+Haar cascade face/eye detection and pupil localization used by the native hosts,
+the calibration tracker and the detection worker pool
+"""
+
+import cv2
+
+FACE_CASCADE_FILE = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+EYE_CASCADE_FILE = cv2.data.haarcascades + 'haarcascade_eye.xml'
+
+# detectMultiScale (scaleFactor, minNeighbors) - runtime_config.py can change them per host
+FACE_PARAMS = (1.3, 5)
+EYE_PARAMS = (1.1, 5)
+
+
+def load_cascades():
+    """Load the face and eye Haar cascades"""
+    face_cascade = cv2.CascadeClassifier(FACE_CASCADE_FILE)
+    eye_cascade = cv2.CascadeClassifier(EYE_CASCADE_FILE)
+    if face_cascade.empty() or eye_cascade.empty():
+        raise IOError("Error loading Haar cascades. Check your OpenCV installation.")
+    return face_cascade, eye_cascade
+
+
+def detect_pupil(eye_frame):
+    """Detect pupil using darkest point method (expects a grayscale eye crop)"""
+    return locate_pupil(eye_frame)[0]
+
+
+def locate_pupil(eye_frame):
+    """Pupil position plus a confidence: 1.0 for a dark-blob fit, 0.3 for the darkest-point fallback"""
+    if eye_frame.size == 0:
+        return None, 0.0
+
+    gray = eye_frame if eye_frame.ndim == 2 else cv2.cvtColor(eye_frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (7, 7), 0)
+
+    # Try threshold method first
+    _, threshold = cv2.threshold(gray, 30, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(threshold, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
+    if contours:
+        valid_contours = [c for c in contours if cv2.contourArea(c) > 20]
+        if valid_contours:
+            largest = max(valid_contours, key=cv2.contourArea)
+            moments = cv2.moments(largest)
+            if moments['m00'] != 0:
+                cx = int(moments['m10'] / moments['m00'])
+                cy = int(moments['m01'] / moments['m00'])
+                return (cx, cy), 1.0
+
+    # Fallback: darkest point
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(gray)
+    return min_loc, 0.3
+
+
+def detect_faces_and_eyes(gray, face_cascade, eye_cascade, with_pupils=False, lighting=None, face_scale=1.0,
+                          face_params=FACE_PARAMS, eye_params=EYE_PARAMS):
+    """Run the face cascade, then the eye cascade inside each face.
+
+    Returns a list of (face, eyes, pupils) with eye boxes relative to the face and
+    pupils relative to each eye box (empty unless with_pupils is set).
+    lighting: optional lighting.LightingNormalizer applied to the face and eye
+    regions only.
+    face_scale: resolution factor for the full-frame face search (the costly
+    pass) - eyes and pupils are still found at full resolution inside each face.
+    face_params/eye_params: (scaleFactor, minNeighbors) of the two cascades.
+    """
+    faces = find_faces(gray, face_cascade, face_scale, face_params)
+    if lighting is not None:
+        faces = _recover_faces(gray, faces, face_cascade, lighting, face_params)
+    detections = []
+
+    for (x, y, w, h) in faces:
+        roi_gray = gray[y:y+h, x:x+w]
+        if lighting is not None:
+            roi_gray = lighting.face(roi_gray)
+        eyes = eye_cascade.detectMultiScale(roi_gray, *eye_params)
+        pupils = []
+        if with_pupils:
+            for (ex, ey, ew, eh) in eyes:
+                eye_gray = roi_gray[ey:ey+eh, ex:ex+ew]
+                if lighting is not None:
+                    eye_gray = lighting.eye(eye_gray)
+                pupils.append(detect_pupil(eye_gray))
+        detections.append(((int(x), int(y), int(w), int(h)),
+                           [tuple(int(v) for v in e) for e in eyes], pupils))
+
+    return detections
+
+
+def find_faces(gray, face_cascade, scale=1.0, params=FACE_PARAMS):
+    """Face boxes in full-frame coordinates, searched on a downscaled copy when scale < 1"""
+    if scale >= 1.0:
+        return face_cascade.detectMultiScale(gray, *params)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return [tuple(int(round(v / scale)) for v in face) for face in face_cascade.detectMultiScale(small, *params)]
+
+
+def _recover_faces(gray, faces, face_cascade, lighting, params=FACE_PARAMS):
+    """Search the normalized region of the last face again when the full frame shows none"""
+    if len(faces) > 0:
+        lighting.last_face = tuple(int(v) for v in faces[0])
+        return faces
+
+    region = lighting.search_region(gray.shape)
+    if region is None:
+        return faces
+    rx, ry, rw, rh = region
+    found = face_cascade.detectMultiScale(lighting.search(gray[ry:ry+rh, rx:rx+rw]), *params)
+    if len(found) == 0:
+        lighting.last_face = None  # Really gone - don't keep searching an empty spot
+        return faces
+    lighting.recovered += 1
+    faces = [(x + rx, y + ry, w, h) for (x, y, w, h) in found]
+    lighting.last_face = faces[0]
+    return faces
@@ -6,16 +6,15 @@ Sends both video frames AND pause commands to Chrome
 
 import cv2
 import sys
-import json
-import struct
 import time
 import base64
 import numpy as np
 import os
 
-# Load Haar Cascade classifiers
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+from capture_config import CaptureConfig, device_key, negotiate
+from frame_sources import open_frame_source
+from native_host import NativeHost
+from overlay import OverlayCompositor
 
 # Lock file to prevent multiple instances
 LOCK_FILE = os.path.join(os.path.dirname(__file__), '.eye_monitor.lock')
@@ -60,159 +59,118 @@ def release_lock():
     except:
         pass
 
-class EyeMonitorDebug:
+class EyeMonitorDebug(NativeHost):
+    # The away timer is drawn on the debug frames instead of logged
+    log_away_progress = False
+
     def __init__(self):
-        self.cap = None
-        self.looking_away_start = None
-        self.away_threshold = 5
-        self.is_focused = True
-        self.last_pause_sent = 0
+        # Banner text is rendered once per distinct status, not every frame
+        self.overlay = OverlayCompositor()
+        self.detections = []
+        self.eyes_count = 0
         self.last_frame_sent = 0
-        self.frame_send_interval = 0.5  # Send frame every 0.5 seconds
-        self.running = True
-        
+        # Debug frames are shown in color, so keep BGR output
+        super().__init__(CaptureConfig(width=640, height=480))
+
         self.log("Eye Monitor Debug starting...")
+
+    def open_camera(self, index=0):
+        """Make one attempt to open a camera across backends, returning the capture or None"""
+        if self.frame_source:
+            return open_frame_source(self.frame_source, self.log)
+        
+        # Try different backends
+        backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+        
+        for backend_idx, backend in enumerate(backends):
+            self.log(f"  Trying backend {backend_idx + 1}/3...")
+            cap = cv2.VideoCapture(index, backend)
+            time.sleep(0.3)
+            
+            if cap.isOpened():
+                ret, frame = cap.read()
+                if ret and frame is not None:
+                    self.log(f"✓ Camera initialized with backend {backend_idx + 1}")
+                    # Format, FPS and buffer size are negotiated (and cached) per device
+                    self.capture_profile = negotiate(cap, self.capture_config, device_key(index, cap), self.log)
+                    return cap
+                else:
+                    self.log(f"  Backend {backend_idx + 1}: Can't read frames")
+            else:
+                self.log(f"  Backend {backend_idx + 1}: Can't open camera")
+            cap.release()
         
-    def log(self, message):
-        sys.stderr.write(f"[EyeMonitor] {message}\n")
-        sys.stderr.flush()
-        
-    def init_camera(self):
-        """Initialize camera with retry logic"""
-        for attempt in range(3):
-            try:
-                self.log(f"Opening camera (attempt {attempt + 1}/3)...")
-                
-                if self.cap is not None:
-                    self.cap.release()
-                    time.sleep(0.5)
-                
-                # Try different backends
-                backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
-                
-                for backend_idx, backend in enumerate(backends):
-                    self.log(f"  Trying backend {backend_idx + 1}/3...")
-                    self.cap = cv2.VideoCapture(0, backend)
-                    time.sleep(0.3)
-                    
-                    if self.cap.isOpened():
-                        # Set properties for better compatibility
-                        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                        
-                        ret, frame = self.cap.read()
-                        if ret and frame is not None:
-                            self.log(f"✓ Camera initialized with backend {backend_idx + 1}")
-                            return True
-                        else:
-                            self.log(f"  Backend {backend_idx + 1}: Can't read frames")
-                            self.cap.release()
-                    else:
-                        self.log(f"  Backend {backend_idx + 1}: Can't open camera")
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                self.log(f"Camera init error: {e}")
-                import traceback
-                self.log(traceback.format_exc())
-                time.sleep(1)
-        
-        self.log("✗ Failed to initialize camera - may be in use by another application")
-        return False
+        return None
     
-    def detect_eyes(self, frame):
-        """Detect if eyes are visible in frame"""
-        try:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-            
-            if len(faces) == 0:
-                return False, 0
-            
-            eyes_count = 0
-            for (x, y, w, h) in faces:
-                roi_gray = gray[y:y+h, x:x+w]
-                eyes = eye_cascade.detectMultiScale(roi_gray, 1.1, 5)
-                eyes_count += len(eyes)
-                
-                if len(eyes) >= 1:
-                    return True, eyes_count
-            
-            return False, eyes_count
-            
-        except Exception as e:
-            self.log(f"Detection error: {e}")
-            return True, 0
+    @staticmethod
+    def count_eyes(detections):
+        """(eyes_detected, eyes_count) for a set of face/eye detections"""
+        eyes_count = sum(len(eyes) for face, eyes, pupils in detections)
+        return eyes_count >= 1, eyes_count
+    
+    def apply_config(self, changed=()):
+        """Shared settings, plus the debug view's frame interval and JPEG quality"""
+        super().apply_config(changed)
+        self.frame_send_interval = self.config.frame_send_interval
+        self.jpeg_quality = self.config.jpeg_quality
     
     def create_debug_frame(self, frame, eyes_detected, eyes_count, away_duration):
-        """Create annotated frame with detection info"""
-        debug_frame = frame.copy()
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect and draw faces
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-        for (x, y, w, h) in faces:
+        """Copy of the frame annotated with the boxes found by detect_eyes"""
+        # Draw into a preallocated debug buffer - the capture buffer is reused by
+        # the next camera read and may still be in use by detection and the recorder
+        debug_frame = self.frame_ctx.buffer('debug', frame.shape, frame.dtype)
+        np.copyto(debug_frame, frame)
+        
+        # Draw faces and eyes (ROI views, no copies)
+        for (x, y, w, h), eyes, pupils in self.detections:
             cv2.rectangle(debug_frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             
-            # Detect and draw eyes
-            roi_gray = gray[y:y+h, x:x+w]
             roi_color = debug_frame[y:y+h, x:x+w]
-            eyes = eye_cascade.detectMultiScale(roi_gray, 1.1, 5)
-            
             for (ex, ey, ew, eh) in eyes:
                 cv2.rectangle(roi_color, (ex, ey), (ex+ew, ey+eh), (255, 0, 0), 2)
         
-        # Add status overlay
-        overlay = debug_frame.copy()
-        cv2.rectangle(overlay, (0, 0), (debug_frame.shape[1], 80), (0, 0, 0), -1)
-        debug_frame = cv2.addWeighted(overlay, 0.6, debug_frame, 0.4, 0)
+        # Darken the status banner in place (same result as blending with black at 0.6)
+        self.frame_ctx.dim(debug_frame, 0.4, 0, 80)
         
         # Status text
         status = "FOCUSED" if eyes_detected else "LOOKING AWAY"
         color = (0, 255, 0) if eyes_detected else (0, 0, 255)
+        faces_text = f"Faces: {len(self.detections)} | Eyes: {eyes_count}"
+        away_text = f"Away: {away_duration:.1f}s / {self.away_threshold:g}s" if away_duration > 0 else None
         
-        cv2.putText(debug_frame, f"Status: {status}", (10, 25), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        cv2.putText(debug_frame, f"Faces: {len(faces)} | Eyes: {eyes_count}", (10, 50), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        def draw_banner(canvas):
+            cv2.putText(canvas, f"Status: {status}", (10, 25), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            cv2.putText(canvas, faces_text, (10, 50), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            if away_text:
+                cv2.putText(canvas, away_text, (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
         
-        if away_duration > 0:
-            cv2.putText(debug_frame, f"Away: {away_duration:.1f}s / {self.away_threshold}s", 
-                        (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        self.overlay.draw(debug_frame, 'banner', (status, faces_text, away_text), draw_banner,
+                          region=(0, 0, debug_frame.shape[1], 80))
         
         return debug_frame
     
-    def send_message(self, message):
-        """Send message to Chrome extension"""
-        try:
-            message_json = json.dumps(message)
-            
-            sys.stdout.buffer.write(struct.pack('I', len(message_json)))
-            sys.stdout.buffer.write(message_json.encode('utf-8'))
-            sys.stdout.buffer.flush()
-            
-            self.log(f"✓ Sent: {message.get('action', 'frame')}")
-            return True
-            
-        except Exception as e:
-            self.log(f"✗ Send error: {e}")
-            return False
+
+    def frame_due(self, now):
+        """True when the next debug frame may go out - less often, or never, when throttled"""
+        every = self.throttle.level.debug_frames
+        return every > 0 and now - self.last_frame_sent >= self.frame_send_interval * every
     
     def send_frame(self, frame, eyes_detected, away_duration):
         """Send annotated frame to Chrome for display"""
         current_time = time.time()
         
         # Don't send frames too frequently
-        if current_time - self.last_frame_sent < self.frame_send_interval:
+        if not self.frame_due(current_time):
             return
         
         try:
             # Resize frame for transmission (smaller = faster)
-            small_frame = cv2.resize(frame, (320, 240))
+            small_frame = self.frame_ctx.resize(frame, (320, 240))
             
             # Encode as JPEG
-            _, buffer = cv2.imencode('.jpg', small_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            _, buffer = cv2.imencode('.jpg', small_frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
             
             # Convert to base64
             frame_base64 = base64.b64encode(buffer).decode('utf-8')
@@ -230,96 +188,34 @@ class EyeMonitorDebug:
         except Exception as e:
             self.log(f"Frame send error: {e}")
     
-    def send_pause_command(self):
-        """Send pause command to Chrome"""
-        current_time = time.time()
-        
-        if current_time - self.last_pause_sent < 2:
-            return
-        
-        message = {
-            "action": "pause_video",
-            "reason": "eyes_away"
-        }
-        
-        if self.send_message(message):
-            self.last_pause_sent = current_time
+    def describe_message(self, message):
+        # Debug frames are big base64 strings - log the action only
+        return message.get('action', 'frame')
     
-    def monitor_loop(self):
-        """Main monitoring loop"""
-        self.log("Starting eye tracking loop...")
-        
-        if not self.init_camera():
-            self.log("✗ Cannot start - camera initialization failed")
-            # Send error message to Chrome
-            self.send_message({
-                "action": "camera_error",
-                "error": "Camera busy or not available. Close other apps using camera (Teams, Zoom, etc.)"
-            })
-            return
-        
-        try:
-            frame_count = 0
-            
-            while self.running:
-                ret, frame = self.cap.read()
-                
-                if not ret:
-                    self.log("Cannot read frame, reinitializing camera...")
-                    if not self.init_camera():
-                        break
-                    continue
-                
-                # Detect eyes
-                eyes_detected, eyes_count = self.detect_eyes(frame)
-                
-                # Calculate away duration
-                away_duration = 0
-                if not eyes_detected:
-                    if self.looking_away_start is None:
-                        self.looking_away_start = time.time()
-                        self.log("👀 User looking away...")
-                    else:
-                        away_duration = time.time() - self.looking_away_start
-                        
-                        # Send pause after threshold
-                        if away_duration >= self.away_threshold and self.is_focused:
-                            self.log(f"🔴 THRESHOLD! Sending pause command")
-                            self.send_pause_command()
-                            self.is_focused = False
-                else:
-                    # User looking at screen
-                    if self.looking_away_start is not None:
-                        duration = time.time() - self.looking_away_start
-                        self.log(f"👁️ User returned (was away {duration:.1f}s)")
-                    
-                    self.looking_away_start = None
-                    self.is_focused = True
-                    away_duration = 0
-                
-                # Create and send debug frame
-                debug_frame = self.create_debug_frame(frame, eyes_detected, eyes_count, away_duration)
-                self.send_frame(debug_frame, eyes_detected, away_duration)
-                
-                frame_count += 1
-                time.sleep(0.1)
-                
-        except KeyboardInterrupt:
-            self.log("Stopped by user")
-        except Exception as e:
-            self.log(f"Error in monitor loop: {e}")
-        finally:
-            if self.cap is not None:
-                self.cap.release()
-                self.log("Camera released")
+    def camera_unavailable(self):
+        # Send error message to Chrome
+        self.send_message({
+            "action": "camera_error",
+            "error": "Camera busy or not available. Close other apps using camera (Teams, Zoom, etc.)"
+        })
+    
+    def detection_result(self, camera_index, detections):
+        if camera_index == self.cameras.active:
+            # Boxes are kept for create_debug_frame so it doesn't re-run the cascades
+            self.detections = detections or []
+            self.eyes_count = self.count_eyes(self.detections)[1]
+    
+    def show_frame(self, eyes_detected, away_duration):
+        # Create and send debug frame (only annotate frames that will be sent)
+        frame = self.cameras.views[self.cameras.active].capture_buffer
+        if frame is not None and self.frame_due(time.time()):
+            debug_frame = self.create_debug_frame(frame, eyes_detected, self.eyes_count, away_duration)
+            self.send_frame(debug_frame, eyes_detected, away_duration)
     
     def run(self):
         """Start the monitor"""
         try:
-            self.monitor_loop()
-        except Exception as e:
-            self.log(f"Fatal error: {e}")
-            sys.exit(1)
+            super().run()
         finally:
             release_lock()
 
@@ -0,0 +1,173 @@
+"""
+Eye Openness and Blinks
+Measures how open each eye is on the eye boxes the cascades already found - or
+on the last ones seen, since the eye cascade often misses closed eyes - and turns
+the per-frame measurements into blink events, a drowsy state and fatigue metrics
+(blink rate and PERCLOS, the share of time the eyes are closed) over a sliding
+window. Everything is updated incrementally: one small crop per eye per frame,
+no extra cascade passes
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+MIN_OPEN = 0.45  # Openness a first measurement needs to seed the open-eye baseline
+MAX_GAP = 2.0    # Longest frame interval (seconds) counted as observed time
+
+
+def eye_openness(eye_gray):
+    """Openness of a grayscale eye crop, None if it has no features to measure.
+
+    Height over width of the dark blob, measured through the darkest point: about
+    1.0 for a round open pupil (a lash line touching it only adds height), down to
+    0.1-0.2 for the thin lash line of a closed lid.
+    """
+    if eye_gray.size == 0:
+        return None
+    blurred = cv2.GaussianBlur(eye_gray, (5, 5), 0)
+    darkest, _, darkest_loc, _ = cv2.minMaxLoc(blurred)
+    median = float(np.median(blurred))
+    if median - darkest < 10:
+        return None  # Flat crop - covered, blown out or not an eye
+
+    _, dark = cv2.threshold(blurred, darkest + 0.5 * (median - darkest), 255, cv2.THRESH_BINARY_INV)
+    _, labels = cv2.connectedComponents(dark)
+    x, y = darkest_loc
+    blob = labels == labels[y, x]
+    height = np.count_nonzero(blob[:, x])
+    width = np.count_nonzero(blob[y, :])
+    return float(min(height / max(width, 1), 1.0))
+
+
+class BlinkTracker:
+    def __init__(self, closed_ratio=0.5, blink_max=0.5, long_closure=1.0, window=60.0,
+                 drowsy_perclos=0.15, baseline_rate=0.05, max_samples=3000):
+        """
+        closed_ratio:   eyes count as closed below this fraction of their open baseline
+        blink_max:      closures up to this long (seconds) are blinks
+        long_closure:   closures at least this long are dozing - drowsy straight away
+        window:         seconds of history for the blink rate and PERCLOS
+        drowsy_perclos: PERCLOS at or above which the user is drowsy
+        baseline_rate:  how fast the open-eye baseline follows open measurements
+        max_samples:    hard cap on the frames kept for the window, whatever the frame rate
+        """
+        self.closed_ratio = closed_ratio
+        self.blink_max = blink_max
+        self.long_closure = long_closure
+        self.window = window
+        self.drowsy_perclos = drowsy_perclos
+        self.baseline_rate = baseline_rate
+        self.max_samples = max_samples
+
+        self.face = None      # Latest face box (x, y, w, h)
+        self.eyes = []        # Eye boxes as fractions of the face box, left to right
+        self.openness = []    # Latest per-eye openness
+        self.baseline = None  # Typical openness of this user's open eyes
+        self.closed = False
+        self.closed_since = None
+        self.drowsy = False
+        self.blinks = 0
+
+        self.last_t = None
+        self.samples = deque()  # (t, dt, closed) observed frames inside the window
+        self.observed_time = 0.0
+        self.closed_time = 0.0
+        self.blink_times = deque()
+
+    def update_boxes(self, detections):
+        """Take the first face's boxes from a detection result (None = detection error)"""
+        if detections is None:
+            return
+        if not detections:
+            self.face = None
+            return
+        (x, y, w, h), eyes, pupils = detections[0]
+        self.face = (x, y, w, h)
+        if len(eyes) > 0:
+            # Closed eyes keep the last boxes - the eye cascade rarely finds them
+            self.eyes = sorted(((ex / w, ey / h, ew / w, eh / h) for ex, ey, ew, eh in eyes[:2]))
+
+    def observe(self, gray, t):
+        """Measure the eyes on a frame; returns True when the drowsy state changed"""
+        values = self._measure(gray)
+        if not values:
+            # Face or eyes out of view - nothing to measure, and a closure can't continue
+            self.openness = []
+            self.closed = False
+            self.closed_since = None
+            self.last_t = None
+            return self._set_drowsy(t)
+
+        self.openness = values
+        level = sum(values) / len(values)
+        if self.baseline is None and level >= MIN_OPEN:
+            self.baseline = level
+        closed = self.baseline is not None and level < self.closed_ratio * self.baseline
+        if self.baseline is not None and not closed:
+            self.baseline += self.baseline_rate * (level - self.baseline)
+
+        # Gaps (camera hiccups, face out of view) don't count as observed time
+        dt = min(t - self.last_t, MAX_GAP) if self.last_t is not None else 0.0
+        self.last_t = t
+        self._add_sample(t, dt, closed)
+
+        if closed and not self.closed:
+            self.closed_since = t
+        elif self.closed and not closed:
+            if t - self.closed_since <= self.blink_max:
+                self.blinks += 1
+                self.blink_times.append(t)
+            self.closed_since = None
+        self.closed = closed
+        return self._set_drowsy(t)
+
+    def closure(self, now):
+        """Seconds the eyes have been closed, 0 while open"""
+        return now - self.closed_since if self.closed_since is not None else 0.0
+
+    @property
+    def perclos(self):
+        """Share of the observed time in the window with the eyes closed"""
+        return self.closed_time / self.observed_time if self.observed_time > 0 else 0.0
+
+    @property
+    def blink_rate(self):
+        """Blinks per minute over the observed time in the window"""
+        return 60.0 * len(self.blink_times) / self.observed_time if self.observed_time > 0 else 0.0
+
+    def _measure(self, gray):
+        if self.face is None or not self.eyes:
+            return []
+        x, y, w, h = self.face
+        values = []
+        for fx, fy, fw, fh in self.eyes:
+            ex, ey = x + int(fx * w), y + int(fy * h)
+            value = eye_openness(gray[ey:ey + int(fh * h), ex:ex + int(fw * w)])
+            if value is not None:
+                values.append(value)
+        return values
+
+    def _add_sample(self, t, dt, closed):
+        self.samples.append((t, dt, closed))
+        self.observed_time += dt
+        if closed:
+            self.closed_time += dt
+        while self.samples and (self.samples[0][0] < t - self.window or len(self.samples) > self.max_samples):
+            _, old_dt, old_closed = self.samples.popleft()
+            self.observed_time -= old_dt
+            if old_closed:
+                self.closed_time -= old_dt
+        while self.blink_times and (self.blink_times[0] < t - self.window or len(self.blink_times) > self.max_samples):
+            self.blink_times.popleft()
+
+    def _set_drowsy(self, now):
+        # PERCLOS needs half a window of history; once drowsy, it has to drop
+        # well below the limit again so values hovering at the limit don't flap
+        limit = 0.8 * self.drowsy_perclos if self.drowsy else self.drowsy_perclos
+        drowsy = self.closure(now) >= self.long_closure or (
+            self.perclos >= limit and self.observed_time >= self.window / 2)
+        changed = drowsy != self.drowsy
+        self.drowsy = drowsy
+        return changed
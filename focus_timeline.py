@@ -0,0 +1,173 @@
+"""
+Focus Timeline
+Append-only SQLite log of focus state transitions (focused / away / no data) with
+range aggregation - focus ratio per minute, per video or per day - computed by
+streaming the transitions in the range, so months of history never load at once
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+
+TIMELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.focus_timeline.db')
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    ts      REAL NOT NULL,     -- unix time of the change
+    focused INTEGER,           -- 1 focused, 0 away, NULL no data (host stopped, camera down)
+    source  TEXT NOT NULL,     -- which program recorded it
+    context TEXT               -- what was being watched (e.g. a video id), if known
+);
+CREATE INDEX IF NOT EXISTS transitions_source_ts ON transitions (source, ts);
+"""
+
+
+def day_start(timestamp):
+    """Local midnight at or before a timestamp"""
+    t = time.localtime(timestamp)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+class FocusTimeline:
+    def __init__(self, path=TIMELINE_FILE, source='monitor'):
+        """
+        path:   SQLite file (created on first use)
+        source: name stored with every transition - queries default to it, so the
+                hosts and the tracker can share one file
+        """
+        self.path = path
+        self.source = source
+        self.lock = threading.Lock()
+        # Written from whichever thread sees the focus change
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+        self.state = ()   # Nothing recorded yet by this instance
+        self.context = None
+
+    def record(self, focused, timestamp=None, context=None):
+        """Append a transition; repeats of the current state are ignored"""
+        state = None if focused is None else bool(focused)
+        with self.lock:
+            return self._append(state, self.context if context is None else context, timestamp)
+
+    def set_context(self, context, timestamp=None):
+        """Switch what is being watched (None = nothing known), keeping the current focus state.
+
+        Safe to call from another thread than record() - the hosts call it from
+        their command reader.
+        """
+        with self.lock:
+            if self.state == ():
+                self.context = context
+                return
+            self._append(self.state, context, timestamp)
+
+    def _append(self, state, context, timestamp):
+        # Caller holds self.lock
+        if state == self.state and context == self.context:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        self.db.execute("INSERT INTO transitions (ts, focused, source, context) VALUES (?, ?, ?, ?)",
+                        (timestamp, None if state is None else int(state), self.source, context))
+        self.db.commit()
+        self.state = state
+        self.context = context
+        return True
+
+    def stop(self, timestamp=None):
+        """Mark the end of data (host exit, camera lost) so the last state isn't extended"""
+        if self.state not in ((), None):
+            self.record(None, timestamp)
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.db.close()
+
+    # --- Queries ---
+
+    def intervals(self, start, end, source=None):
+        """Yield (from, to, focused, context) spans covering [start, end) - focused may be None"""
+        source = source or self.source
+        end = min(end, time.time())
+        if end <= start:
+            return
+
+        # A separate connection per query: rows stream from the cursor (WAL lets it
+        # read alongside the writer) instead of being loaded up front
+        db = sqlite3.connect(self.path)
+        try:
+            row = db.execute("SELECT focused, context FROM transitions WHERE source = ? AND ts < ? "
+                             "ORDER BY ts DESC LIMIT 1", (source, start)).fetchone()
+            state, context = row if row else (None, None)
+
+            t = start
+            for ts, focused, ctx in db.execute("SELECT ts, focused, context FROM transitions WHERE source = ? "
+                                               "AND ts >= ? AND ts < ? ORDER BY ts", (source, start, end)):
+                if ts > t:
+                    yield t, ts, state, context
+                t, state, context = ts, focused, ctx
+            yield t, end, state, context
+        finally:
+            db.close()
+
+    def aggregate(self, start, end, bucket=None, source=None):
+        """[(bucket_start, focused_seconds, away_seconds)] for [start, end) in buckets of `bucket` seconds"""
+        bucket = bucket or (end - start)
+        count = max(1, int(math.ceil((end - start) / bucket)))
+        focused = [0.0] * count
+        away = [0.0] * count
+
+        for a, b, state, context in self.intervals(start, end, source):
+            if state is None:
+                continue
+            totals = focused if state else away
+            # Spread the span over the buckets it crosses
+            while a < b:
+                i = min(count - 1, int((a - start) // bucket))
+                split = min(b, start + (i + 1) * bucket)
+                if split <= a:  # Rounding put a on the previous bucket's edge
+                    split = b if i == count - 1 else min(b, start + (i + 2) * bucket)
+                    i = min(count - 1, i + 1)
+                totals[i] += split - a
+                a = split
+
+        return [(start + i * bucket, focused[i], away[i]) for i in range(count)]
+
+    def focus_ratio(self, start, end, bucket=None, source=None):
+        """[(bucket_start, ratio)] - share of tracked time spent focused, None where nothing was tracked"""
+        return [(t, f / (f + a) if f + a > 0 else None)
+                for t, f, a in self.aggregate(start, end, bucket, source)]
+
+    def by_context(self, start, end, source=None):
+        """{context: (focused_seconds, away_seconds)} - e.g. per video"""
+        totals = {}
+        for a, b, state, context in self.intervals(start, end, source):
+            if state is None:
+                continue
+            focused, away = totals.get(context, (0.0, 0.0))
+            if state:
+                focused += b - a
+            else:
+                away += b - a
+            totals[context] = (focused, away)
+        return totals
+
+    def per_day(self, days=7, source=None):
+        """Focus ratio for each of the last `days` local days, oldest first"""
+        today = day_start(time.time())
+        results = []
+        for i in range(days - 1, -1, -1):
+            start = day_start(today - i * DAY + HOUR)  # +1h keeps DST shifts on the right day
+            ratio = self.focus_ratio(start, start + DAY, source=source)[0][1]
+            results.append((start, ratio))
+        return results
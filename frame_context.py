@@ -0,0 +1,57 @@
+"""
+Frame Processing Context
+Preallocated output buffers for the per-frame hot loops, so conversions, resizes
+and flips write into the same memory every frame instead of allocating new arrays
+"""
+
+import cv2
+import numpy as np
+
+from capture_config import to_gray
+
+
+class FrameContext:
+    def __init__(self):
+        self._buffers = {}
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        """Named scratch buffer, reallocated only when the frame geometry changes"""
+        shape = tuple(shape)
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
+
+    def gray(self, frame, name='gray'):
+        """Grayscale version of a frame (views are returned as-is for 1-channel / Y-plane input)"""
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            return to_gray(frame, dst=self.buffer(name, frame.shape[:2]))
+        return to_gray(frame)
+
+    def resize(self, frame, size, name='small', interpolation=cv2.INTER_AREA):
+        """Resize into a reusable buffer; size is (width, height) like cv2.resize"""
+        dst = self.buffer(name, (size[1], size[0]) + frame.shape[2:], frame.dtype)
+        cv2.resize(frame, size, dst=dst, interpolation=interpolation)
+        return dst
+
+    def flip(self, frame, name='flipped'):
+        """Horizontal mirror into a reusable buffer (display only - detection uses the raw frame)"""
+        dst = self.buffer(name, frame.shape, frame.dtype)
+        cv2.flip(frame, 1, dst=dst)
+        return dst
+
+    @staticmethod
+    def dim(image, alpha, top=0, bottom=None):
+        """Darken rows [top, bottom) in place - replaces copy + black rectangle + addWeighted"""
+        rows = image[top:bottom]
+        # Row slices of a contiguous frame are contiguous, so OpenCV writes straight back
+        cv2.convertScaleAbs(rows, dst=rows, alpha=alpha)
+        return image
+
+
+def mirror_x(x, frame_width, w=None):
+    """Mirror a pixel x coordinate across the frame, or the left edge of a box of width w"""
+    if w is None:
+        return frame_width - 1 - x
+    return frame_width - x - w
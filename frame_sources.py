@@ -0,0 +1,231 @@
+"""
+Frame Sources
+Stand-ins for the webcam so the native hosts can run without a camera: a scripted
+source that plays scenes (face looking at the screen, nobody there) on a timeline,
+or a recorded video file played in a loop. Selected with EYE_FOCUS_FRAME_SOURCE:
+
+    script:face:3,away:8,face:3     scenes with durations in seconds
+    script:face:3,away:8,loop       the same, started over at the end
+    recording.avi                   any file OpenCV can read
+    recordings/pause-....npz        a ring recorder dump, at its recorded pace
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from ring_recorder import load_recording
+from synthetic import SCENES, render_scene
+
+
+def parse_script(text):
+    """"face:3,away:8" -> [('face', 3.0), ('away', 8.0)]"""
+    script = []
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        scene, _, seconds = item.strip().partition(':')
+        if scene not in SCENES:
+            raise ValueError(f"unknown scene '{scene}' (expected one of {', '.join(SCENES)})")
+        script.append((scene, float(seconds or 1)))
+    if not script:
+        raise ValueError("empty frame source script")
+    return script
+
+
+class ScriptedCapture:
+    def __init__(self, script, width=640, height=480, fps=30, loop=False, log=None):
+        """
+        script: [(scene, seconds)] played from the first read; the last scene
+                holds once the script runs out, unless loop is set
+        log:    optional callable - every scene change is logged with its
+                wall-clock time, so a harness can measure reaction latency
+        """
+        self.script = script
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.loop = loop
+        self.log = log
+        self.frames = {scene: render_scene(scene, width, height) for scene, _ in script}
+        self.started = None
+        self.next_frame = 0.0
+        self.scene = None
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def scene_at(self, elapsed):
+        """(scene, seconds into the script it started) at a point of the script"""
+        start = 0.0
+        total = sum(seconds for _, seconds in self.script)
+        if self.loop and elapsed >= total > 0:
+            start = (elapsed // total) * total
+        for scene, seconds in self.script:
+            if elapsed < start + seconds:
+                return scene, start
+            start += seconds
+        return self.script[-1][0], start - self.script[-1][1]
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+
+        # Deliver frames at the camera's rate, like a blocking VideoCapture.read()
+        now = time.time()
+        if self.started is None:
+            self.started = self.next_frame = now
+        if now < self.next_frame:
+            time.sleep(self.next_frame - now)
+            now = self.next_frame
+        self.next_frame = max(self.next_frame + 1.0 / self.fps, now)
+
+        scene, offset = self.scene_at(now - self.started)
+        if scene != self.scene:
+            # Logged with the time the scene began, not when this read noticed it,
+            # so measured latency includes the wait for the next camera read
+            if self.log is not None:
+                self.log(f"frame source: scene {scene} at {self.started + offset:.6f}")
+            self.scene = scene
+
+        frame = self.frames[scene]
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                cv2.CAP_PROP_FPS: self.fps}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+class LoopingFileCapture:
+    def __init__(self, path, log=None):
+        """Recorded video played in a loop at its own frame rate"""
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.next_frame = None
+        self.loops = 0
+        self.log = log
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        now = time.time()
+        if self.next_frame is not None and now < self.next_frame:
+            time.sleep(self.next_frame - now)
+        self.next_frame = max((self.next_frame or now) + 1.0 / self.fps, now)
+
+        ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        if not ret:
+            # End of the recording - start over
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.loops += 1
+            ret, frame = self.cap.read()
+            if ret and self.log is not None:
+                self.log(f"frame source: recording restarted ({self.loops} loops)")
+        return ret, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return False  # Keep the recording's own format
+
+    def release(self):
+        self.cap.release()
+
+
+class RecordingCapture:
+    def __init__(self, path, log=None):
+        """Ring recorder dump played in a loop, frames scaled back to their capture size"""
+        recording = load_recording(path)
+        self.records = recording["records"]
+        self.frames = recording["frames"]
+        if len(self.records) == 0:
+            raise ValueError("empty recording")
+        # Recorded gaps, so playback keeps the original pace (stalls capped at 1s)
+        gaps = np.diff(self.records['t'], append=self.records['t'][-1] + 0.1)
+        self.gaps = np.clip(gaps, 0.01, 1.0)
+        self.position = 0
+        self.next_frame = None
+        self.loops = 0
+        self.log = log
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+        now = time.time()
+        if self.next_frame is not None and now < self.next_frame:
+            time.sleep(self.next_frame - now)
+        self.next_frame = max((self.next_frame or now) + self.gaps[self.position], now)
+
+        record = self.records[self.position]
+        size = (int(record['width']), int(record['height']))
+        gray = cv2.resize(self.frames[self.position], size, interpolation=cv2.INTER_LINEAR)
+        self.position += 1
+        if self.position == len(self.records):
+            self.position = 0
+            self.loops += 1
+            if self.log is not None:
+                self.log(f"frame source: recording restarted ({self.loops} loops)")
+
+        if image is not None and image.shape == size[::-1] + (3,):
+            return True, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=image)
+        return True, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    def get(self, prop):
+        record = self.records[0]
+        return {cv2.CAP_PROP_FRAME_WIDTH: float(record['width']),
+                cv2.CAP_PROP_FRAME_HEIGHT: float(record['height']),
+                cv2.CAP_PROP_FPS: float(1.0 / np.median(self.gaps))}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+def open_frame_source(spec, log=None):
+    """Capture-like object for an EYE_FOCUS_FRAME_SOURCE value, or None if it can't be opened"""
+    if spec.startswith('script:'):
+        text = spec[len('script:'):]
+        head, _, last = text.rpartition(',')
+        loop = last.strip() == 'loop'
+        try:
+            return ScriptedCapture(parse_script(head if loop else text), loop=loop, log=log)
+        except ValueError as e:
+            if log is not None:
+                log(f"Bad frame source script: {e}")
+            return None
+
+    if spec.endswith('.npz'):
+        try:
+            return RecordingCapture(spec, log=log)
+        except (OSError, KeyError, ValueError) as e:
+            if log is not None:
+                log(f"Can't open frame source {spec}: {e}")
+            return None
+
+    source = LoopingFileCapture(spec, log=log)
+    if not source.isOpened():
+        if log is not None:
+            log(f"Can't open frame source {spec}")
+        source.release()
+        return None
+    return source
@@ -0,0 +1,146 @@
+"""
+Gaze Mapping
+Calibration math shared by the tracker and the native hosts: the pupil -> screen
+affine mapping, on-screen checks, and a per-camera calibration store
+"""
+
+import json
+import os
+
+import numpy as np
+
+from frame_context import mirror_x
+
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.calibration.json')
+
+# Screen boundary margin (percentage)
+SCREEN_MARGIN = 0.05  # 5% margin from edges
+
+
+def compute_linear_mapping(calib_pupil_pos, calib_screen_pos):
+    """Compute an affine mapping from pupil normalized coords to screen pixel coords.
+
+    Solves S = P * M where P is [n x 3] of [px, py, 1] and S is [n x 2] of screen coords.
+    Returns M (2x3) or None if it cannot be computed.
+    """
+    if len(calib_pupil_pos) < 3:
+        return None
+
+    P = np.array([[p[0], p[1], 1.0] for p in calib_pupil_pos])  # n x 3
+    S = np.array([[s[0], s[1]] for s in calib_screen_pos])     # n x 2
+
+    try:
+        # Solve least squares: find X (3x2) so that P @ X = S
+        X, *_ = np.linalg.lstsq(P, S, rcond=None)
+        # X is 3x2; return transposed to 2x3 for easy dot with [px,py,1]
+        return X.T
+    except Exception as e:
+        print(f"Failed to compute linear mapping: {e}")
+        return None
+
+
+def estimate_gaze_position(pupil, calib_pupil_pos, calib_screen_pos, frame_width, frame_height, mapping=None):
+    """Estimate screen gaze position.
+
+    If an affine mapping (mapping) is provided it will be used. Otherwise fall back to inverse-distance weighting.
+    """
+    if pupil is None:
+        return None
+
+    # Use mapping if available
+    if mapping is not None:
+        vec = np.array([pupil[0], pupil[1], 1.0])
+        est = mapping.dot(vec)
+        return (float(est[0]), float(est[1]))
+
+    if len(calib_pupil_pos) < 3:
+        return None
+
+    # Fallback: inverse distance weighting
+    weights = []
+    for calib_pupil in calib_pupil_pos:
+        distance = np.sqrt((pupil[0] - calib_pupil[0])**2 + (pupil[1] - calib_pupil[1])**2)
+        if distance < 0.001:  # Very close to a calibration point
+            return calib_screen_pos[calib_pupil_pos.index(calib_pupil)]
+        weights.append(1.0 / (distance + 0.001))
+
+    total_weight = sum(weights)
+    if total_weight == 0:
+        return None
+
+    weights = [w / total_weight for w in weights]
+    est_x = sum(w * pos[0] for w, pos in zip(weights, calib_screen_pos))
+    est_y = sum(w * pos[1] for w, pos in zip(weights, calib_screen_pos))
+    return (est_x, est_y)
+
+
+def is_looking_at_screen(gaze_pos, frame_width, frame_height, margin=SCREEN_MARGIN):
+    """Check if estimated gaze is within screen bounds with margin"""
+    if gaze_pos is None:
+        return False
+    
+    x, y = gaze_pos
+    margin_x = frame_width * margin
+    margin_y = frame_height * margin
+    
+    return (-margin_x <= x <= frame_width + margin_x and 
+            -margin_y <= y <= frame_height + margin_y)
+
+
+def smooth_pupil(current, previous, alpha=0.7):
+    """Apply exponential smoothing to pupil position"""
+    if previous is None:
+        return current
+    return (alpha * previous[0] + (1 - alpha) * current[0],
+            alpha * previous[1] + (1 - alpha) * current[1])
+
+
+def normalized_pupil(eyes, pupils, mirror=True):
+    """Average pupil position normalized to its eye box, as the tracker calibrates it.
+
+    eyes/pupils come from eye_detection.detect_faces_and_eyes; x is mirrored by
+    default to match the tracker's flipped display.
+    """
+    points = []
+    for (ex, ey, ew, eh), pupil in zip(eyes, pupils):
+        if pupil is None:
+            continue
+        px = mirror_x(pupil[0], ew) if mirror else pupil[0]
+        points.append((px / ew, pupil[1] / eh))
+
+    if not points:
+        return None
+    return (sum(p[0] for p in points) / len(points),
+            sum(p[1] for p in points) / len(points))
+
+
+def load_calibration(device, path=CALIBRATION_FILE):
+    """Stored calibration for a camera: (mapping 2x3, frame_width, frame_height) or None"""
+    try:
+        with open(path, 'r') as f:
+            entry = json.load(f).get(str(device))
+    except (OSError, ValueError):
+        return None
+    if not entry:
+        return None
+    return np.array(entry["mapping"], dtype=float), entry["width"], entry["height"]
+
+
+def save_calibration(device, mapping, frame_width, frame_height, path=CALIBRATION_FILE):
+    """Remember a camera's calibration so the native hosts can use it"""
+    try:
+        with open(path, 'r') as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        store = {}
+
+    store[str(device)] = {
+        "mapping": np.asarray(mapping).tolist(),
+        "width": frame_width,
+        "height": frame_height,
+    }
+    try:
+        with open(path, 'w') as f:
+            json.dump(store, f, indent=2, sort_keys=True)
+    except OSError as e:
+        print(f"Could not save calibration: {e}")
@@ -0,0 +1,230 @@
+"""
+End-to-End Latency Harness
+Runs a native host as a subprocess the way Chrome does - reading the length-prefixed
+messages on its stdout - with a scripted frame source instead of the webcam
+(face, then nobody, repeated). Measures how long each reaction takes from the
+moment the scene changed and checks it against the expected timing:
+
+    away_start    user left -> away interval reported
+    pause_video   user left -> pause (includes the away threshold)
+    away_end      user back -> away interval closed
+    debug_frame   spacing between frames (debug host)
+
+Runs headless on Linux, no camera needed.
+Usage: python latency_harness.py [--host monitor|debug] [--cycles 3] [--away 7]
+"""
+
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+from native_codec import read_message
+from runtime_config import SETTINGS
+
+HOSTS = {
+    'monitor': 'eye_monitor.py',
+    'debug': 'eye_monitor_debug_view.py',
+}
+SCENE_LINE = re.compile(r"frame source: scene (\w+) at ([\d.]+)")
+
+AWAY_THRESHOLD = SETTINGS['away_threshold'].default  # Hosts run without a config file here
+
+
+class HostProcess:
+    def __init__(self, script, host='monitor', source=None, keep=None, record_dir=None):
+        """Native host subprocess fed by a scripted frame source.
+
+        source:     any other EYE_FOCUS_FRAME_SOURCE value to use instead of the script
+        keep:       message actions to hold on to (default all) - long runs drop the
+                    debug frames so the harness itself doesn't grow
+        record_dir: turn the ring recorder on, dumping into this directory (off
+                    otherwise, whatever the environment says)
+        """
+        env = dict(os.environ)
+        if source is None:
+            source = 'script:' + ','.join(f"{scene}:{seconds}" for scene, seconds in script)
+        env['EYE_FOCUS_FRAME_SOURCE'] = source
+        env.pop('EYE_FOCUS_CAMERAS', None)
+        # Timings are measured at full quality unless a throttle level is asked for
+        env.setdefault('EYE_FOCUS_THROTTLE', 'off')
+        env['EYE_FOCUS_CONFIG'] = ''  # Default thresholds - AWAY_THRESHOLD is checked against them
+        if record_dir is None:
+            env.pop('EYE_FOCUS_RECORD_SECONDS', None)
+        else:
+            env.setdefault('EYE_FOCUS_RECORD_SECONDS', '10')
+            env['EYE_FOCUS_RECORD_DIR'] = record_dir
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), HOSTS[host])
+
+        self.keep = keep
+        self.messages = []  # (receive time, message)
+        self.scenes = []    # (change time, scene)
+        self.log_lines = deque(maxlen=5000)
+        self.process = subprocess.Popen([sys.executable, path], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        self.readers = [threading.Thread(target=self.read_stdout, daemon=True),
+                        threading.Thread(target=self.read_stderr, daemon=True)]
+        for reader in self.readers:
+            reader.start()
+
+    def read_stdout(self):
+        while True:
+            try:
+                message = read_message(self.process.stdout)
+            except ValueError as e:
+                self.log_lines.append(f"HARNESS: bad frame on stdout: {e}")
+                return
+            if message is None:
+                return
+            if self.keep is None or message.get('action') in self.keep:
+                self.messages.append((time.time(), message))
+
+    def read_stderr(self):
+        for raw in self.process.stderr:
+            line = raw.decode('utf-8', 'replace').rstrip()
+            self.log_lines.append(line)
+            match = SCENE_LINE.search(line)
+            if match:
+                self.scenes.append((float(match.group(2)), match.group(1)))
+
+    def stop(self):
+        # Ctrl+C lets the host run its cleanup (lock file, camera release)
+        if sys.platform == 'win32':
+            self.process.terminate()
+        else:
+            self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        for reader in self.readers:
+            reader.join(timeout=2)
+
+    def first(self, action, after, before):
+        """Receive time of the first `action` message in [after, before)"""
+        for t, message in self.messages:
+            if after <= t < before and message.get('action') == action:
+                return t
+        return None
+
+    def count(self, action, after, before):
+        return sum(1 for t, m in self.messages if after <= t < before and m.get('action') == action)
+
+
+def distribution(values):
+    if not values:
+        return "no samples"
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return (f"n={len(values):<3} min {ordered[0] * 1000:7.1f}  median {statistics.median(ordered) * 1000:7.1f}  "
+            f"p95 {p95 * 1000:7.1f}  max {ordered[-1] * 1000:7.1f} ms")
+
+
+def run(host, cycles, face_seconds, away_seconds, tolerance):
+    script = [('face', face_seconds)]
+    for _ in range(cycles):
+        script += [('away', away_seconds), ('face', face_seconds)]
+    duration = sum(seconds for _, seconds in script)
+
+    print(f"Running {HOSTS[host]} for ~{duration:.0f}s ({cycles} away cycles of {away_seconds}s)...")
+    proc = HostProcess(script, host)
+    # Camera init and cascade loading happen before the script starts playing
+    deadline = time.time() + duration + 15
+    while time.time() < deadline:
+        if proc.process.poll() is not None:
+            break
+        if proc.scenes and time.time() > proc.scenes[0][0] + duration + 1.5:
+            break
+        time.sleep(0.2)
+    proc.stop()
+
+    failures = []
+    if not proc.scenes:
+        failures.append("frame source never started - host log below")
+        return proc, {}, failures
+
+    latencies = {'away_start': [], 'pause_video': [], 'away_end': []}
+    changes = proc.scenes + [(float('inf'), None)]
+    for (t, scene), (t_next, _) in zip(changes, changes[1:]):
+        if scene == 'away':
+            away_start = proc.first('away_start', t, t_next)
+            pause = proc.first('pause_video', t, t_next)
+            if away_start is None:
+                failures.append(f"no away_start after leaving at {t:.3f}")
+            else:
+                latencies['away_start'].append(away_start - t)
+            if away_seconds > AWAY_THRESHOLD + tolerance:
+                if pause is None:
+                    failures.append(f"no pause_video after leaving at {t:.3f}")
+                else:
+                    latencies['pause_video'].append(pause - t)
+                    if pause - t > AWAY_THRESHOLD + tolerance:
+                        failures.append(f"pause came {pause - t:.2f}s after leaving (limit {AWAY_THRESHOLD + tolerance:.1f}s)")
+            elif pause is not None:
+                failures.append(f"pause_video after a {away_seconds}s glance (threshold {AWAY_THRESHOLD}s)")
+        elif scene == 'face':
+            if proc.count('pause_video', t, t_next):
+                failures.append(f"pause_video while the face was visible ({t:.3f})")
+            if t != proc.scenes[0][0]:
+                away_end = proc.first('away_end', t, t_next)
+                if away_end is None:
+                    failures.append(f"no away_end after returning at {t:.3f}")
+                else:
+                    latencies['away_end'].append(away_end - t)
+
+    for name, values in latencies.items():
+        if name != 'pause_video' and any(v > tolerance for v in values):
+            failures.append(f"{name} slower than {tolerance}s: {max(values):.2f}s")
+
+    if not any(m.get('action') == 'camera_status' and m.get('state') == 'ok' for _, m in proc.messages):
+        failures.append("no camera_status ok")
+
+    frames = [t for t, m in proc.messages if m.get('action') == 'debug_frame']
+    if host == 'debug':
+        if not frames:
+            failures.append("no debug frames")
+        latencies['debug_frame'] = [b - a for a, b in zip(frames, frames[1:])]
+
+    return proc, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure native host reaction latency with scripted frames")
+    parser.add_argument('--host', choices=sorted(HOSTS), default='monitor')
+    parser.add_argument('--cycles', type=int, default=3, help="away/return cycles")
+    parser.add_argument('--face', type=float, default=3.0, help="seconds facing the screen per cycle")
+    parser.add_argument('--away', type=float, default=7.0, help="seconds away per cycle (below 5 = glances, no pause)")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="allowed reaction time in seconds")
+    parser.add_argument('--verbose', action='store_true', help="print the host log")
+    args = parser.parse_args()
+
+    proc, latencies, failures = run(args.host, args.cycles, args.face, args.away, args.tolerance)
+
+    counts = {}
+    for _, message in proc.messages:
+        counts[message.get('action')] = counts.get(message.get('action'), 0) + 1
+    print(f"Messages: {counts}")
+    for name, values in latencies.items():
+        print(f"  {name:12} {distribution(values)}")
+
+    if args.verbose or failures:
+        print("\n--- host log ---")
+        print("\n".join(list(proc.log_lines)[-60:]))
+
+    if failures:
+        print("\n❌ FAILED")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ All timings within limits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Lighting Normalization
+Optional preprocessing for backlit or dim rooms: the face region is normalized
+before the eye cascade and each eye crop before pupil detection - never the full
+frame. Gamma, CLAHE and contrast-stretch settings are estimated from a region's brightness and only
+re-estimated when that brightness shifts, so a steady scene costs one mean and
+one lookup/CLAHE pass per region. Enabled with EYE_FOCUS_LIGHTING=auto|gamma|clahe
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+MODES = ('auto', 'gamma', 'clahe')
+
+
+def lighting_mode():
+    """Normalization mode from EYE_FOCUS_LIGHTING, or None when off"""
+    mode = os.environ.get('EYE_FOCUS_LIGHTING', '').strip().lower()
+    return mode if mode in MODES else None
+
+
+class RegionAdjustment:
+    def __init__(self, mode, target, shift, low_contrast, clahe):
+        """Settings for one kind of region, re-estimated on brightness shifts.
+
+        mode 'stretch' maps the region's 1st-99th percentile range onto 0-255 -
+        used for eye crops, where pupil detection needs the pupil to stay the
+        darkest thing (gamma would lift it over the threshold in a dim room).
+        """
+        self.mode = mode
+        self.target = target
+        self.shift = shift
+        self.low_contrast = low_contrast
+        self.clahe = clahe
+        self.reference = None  # Mean brightness the current settings were estimated for
+        self.lut = None        # Gamma lookup table, None when no gamma is needed
+        self.use_clahe = False
+        self.estimates = 0
+
+    def apply(self, roi):
+        """Normalized copy of a grayscale region"""
+        mean = cv2.mean(roi)[0]
+        if self.reference is None or abs(mean - self.reference) > self.shift:
+            self._estimate(roi, mean)
+
+        out = cv2.LUT(roi, self.lut) if self.lut is not None else roi
+        if self.use_clahe:
+            out = self.clahe.apply(out)
+        return out if out is not roi else roi.copy()
+
+    def _estimate(self, roi, mean):
+        self.reference = mean
+        self.estimates += 1
+
+        self.lut = None
+        if self.mode == 'stretch':
+            lo, hi = np.percentile(roi, (1, 99))
+            if hi - lo >= 8:
+                self.lut = ((np.arange(256) - lo) * 255.0 / (hi - lo)).clip(0, 255).astype(np.uint8)
+        elif self.mode in ('auto', 'gamma') and abs(mean - self.target) > self.shift:
+            # Gamma that maps the region's mean to the target brightness
+            m = min(max(mean, 1.0), 254.0) / 255.0
+            gamma = np.log(self.target / 255.0) / np.log(m)
+            gamma = min(max(gamma, 0.3), 3.0)
+            self.lut = (255.0 * (np.arange(256) / 255.0) ** gamma).clip(0, 255).astype(np.uint8)
+
+        if self.mode == 'clahe':
+            self.use_clahe = True
+        elif self.mode == 'auto':
+            # Backlight flattens the face: local contrast boost only when it's low
+            self.use_clahe = cv2.meanStdDev(roi)[1][0][0] < self.low_contrast
+        else:
+            self.use_clahe = False
+
+
+class LightingNormalizer:
+    def __init__(self, mode='auto', target=120, shift=15, low_contrast=30, clip_limit=2.0, tiles=4):
+        """
+        mode:         'gamma' (brightness only), 'clahe' (local contrast) or 'auto'
+                      (gamma when a region is too dark/bright, CLAHE when it's flat)
+        target:       mean gray level regions are brought to
+        shift:        brightness change (gray levels) that triggers re-estimation
+        low_contrast: std deviation below which 'auto' adds CLAHE
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown lighting mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tiles, tiles))
+        self.face_adjustment = RegionAdjustment(mode, target, shift, low_contrast, clahe)
+        self.eye_adjustment = RegionAdjustment('stretch', target, shift, low_contrast, clahe)
+        # Backlight can hide the face from the full-frame cascade - the last face
+        # region is normalized and searched again before giving up
+        self.search_adjustment = RegionAdjustment(mode, target, shift, low_contrast, clahe)
+        self.last_face = None
+        self.recovered = 0
+
+    def face(self, roi):
+        """Normalized face region (input to the eye cascade)"""
+        return self.face_adjustment.apply(roi)
+
+    def eye(self, roi):
+        """Contrast-stretched eye crop (input to pupil detection) - same in every mode"""
+        return self.eye_adjustment.apply(roi)
+
+    def search_region(self, frame_shape, grow=0.5):
+        """(x, y, w, h) around the last face found, or None"""
+        if self.last_face is None:
+            return None
+        x, y, w, h = self.last_face
+        fh, fw = frame_shape[:2]
+        x0, y0 = max(0, int(x - w * grow)), max(0, int(y - h * grow))
+        x1, y1 = min(fw, int(x + w * (1 + grow))), min(fh, int(y + h * (1 + grow)))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1 - x0, y1 - y0
+
+    def search(self, roi):
+        """Normalized search region for a second face cascade pass"""
+        return self.search_adjustment.apply(roi)
+
+    @property
+    def estimates(self):
+        return (self.face_adjustment.estimates + self.eye_adjustment.estimates
+                + self.search_adjustment.estimates)
@@ -0,0 +1,149 @@
+"""
+Memory Monitor
+Memory accounting for the long-running native hosts: process RSS on every stats
+report with its growth since warm-up and a least-squares slope over the recent
+history, plus optional tracemalloc snapshots (EYE_FOCUS_TRACEMALLOC=<frames>)
+compared against the first one, so the stats stream names the source lines that
+keep allocating. Tracing slows every allocation, so it is off unless asked for
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+MB = 1024 * 1024
+
+
+def rss_bytes():
+    """Resident set size of this process in bytes, None if it can't be read here.
+
+    macOS only exposes the peak through getrusage - still good enough to spot growth.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        return _windows_working_set()
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Bytes on macOS
+    except (ImportError, OSError):
+        return None
+
+
+def _windows_working_set():
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                'PagefileUsage', 'PeakPagefileUsage')]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters.WorkingSetSize
+
+
+def slope(samples):
+    """Least-squares slope of [(t, value)] in value units per second (0 with under 2 samples)"""
+    n = len(samples)
+    if n < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var
+
+
+class MemoryMonitor:
+    def __init__(self, trace_frames=0, warmup=120.0, history=720, snapshot_interval=60.0, top=3):
+        """
+        trace_frames:      tracemalloc traceback depth, 0 = no tracing (RSS only)
+        warmup:            seconds before growth is measured - caches, cascades and
+                           buffers settle first
+        history:           RSS samples kept for the slope (one per stats report)
+        snapshot_interval: seconds between tracemalloc snapshots
+        top:               growing source lines reported per snapshot
+        """
+        self.warmup = warmup
+        self.snapshot_interval = snapshot_interval
+        self.top = top
+        self.started = time.monotonic()
+        self.samples = deque(maxlen=history)  # (seconds since start, RSS MB) after warm-up
+        self.baseline = None                  # RSS MB at the end of warm-up
+        self.peak = 0.0
+
+        self.tracing = trace_frames > 0
+        self.first_snapshot = None
+        self.last_snapshot = 0.0
+        self.top_growth = []
+        if self.tracing and not tracemalloc.is_tracing():
+            tracemalloc.start(trace_frames)
+
+    def sample(self, now=None):
+        """Take an RSS reading (and a due snapshot); returns the fields for the stats message"""
+        rss = rss_bytes()
+        if rss is None:
+            return {}
+        now = time.monotonic() if now is None else now
+        rss_mb = rss / MB
+        self.peak = max(self.peak, rss_mb)
+        elapsed = now - self.started
+
+        fields = {"rss_mb": round(rss_mb, 1), "rss_peak_mb": round(self.peak, 1)}
+        if elapsed >= self.warmup:
+            if self.baseline is None:
+                self.baseline = rss_mb
+            self.samples.append((elapsed, rss_mb))
+            fields["rss_growth_mb"] = round(rss_mb - self.baseline, 1)
+            fields["rss_slope_mb_h"] = round(self.slope_per_hour, 2)
+
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            fields["traced_mb"] = round(current / MB, 1)
+            fields["traced_peak_mb"] = round(peak / MB, 1)
+            if elapsed >= self.warmup and now - self.last_snapshot >= self.snapshot_interval:
+                self.last_snapshot = now
+                self._snapshot()
+            if self.top_growth:
+                fields["traced_growth"] = self.top_growth
+        return fields
+
+    @property
+    def slope_per_hour(self):
+        return slope(self.samples) * 3600
+
+    def stop(self):
+        if self.tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _snapshot(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self.first_snapshot is None:
+            self.first_snapshot = snapshot
+            return
+        self.top_growth = [
+            f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno} "
+            f"{stat.size_diff / 1024:+.0f} KB"
+            for stat in snapshot.compare_to(self.first_snapshot, 'lineno')[:self.top]
+            if stat.size_diff > 0
+        ]
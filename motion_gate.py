@@ -0,0 +1,76 @@
+"""
+Motion Gate
+Skips the face/eye cascades on static frames: a downsampled difference inside the
+last face region decides whether the previous detection result can be reused
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, threshold=4.0, max_reuse_age=1.0, size=(32, 32), padding=0.25):
+        """
+        threshold:     mean absolute gray-level change (0-255) that counts as motion
+        max_reuse_age: seconds a result may be reused before the cascades must run again
+        size:          thumbnail size the face region is compared at
+        padding:       fraction of the face box added on each side, so a head
+                       starting to turn away shows up as motion
+        """
+        self.threshold = threshold
+        self.max_reuse_age = max_reuse_age
+        self.size = size
+        self.padding = padding
+
+        self._reference = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._current = np.empty_like(self._reference)
+        self._region = None
+        self._detections = None
+        self._detected_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reuse(self, gray, now):
+        """Previous detections if nothing meaningful changed, else None (run the cascades)"""
+        if self._region is None or now - self._detected_at > self.max_reuse_age:
+            self.misses += 1
+            return None
+
+        x0, y0, x1, y1 = self._region
+        cv2.resize(gray[y0:y1, x0:x1], self.size, dst=self._current, interpolation=cv2.INTER_AREA)
+        change = cv2.norm(self._current, self._reference, cv2.NORM_L1) / self._current.size
+        if change >= self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._detections
+
+    def invalidate(self):
+        """Run the cascades on the next frame whatever the motion"""
+        self._region = None
+
+    def store(self, gray, detections, now):
+        """Remember a fresh detection result and the face region it was found in"""
+        self._detections = detections
+        self._detected_at = now
+
+        if not detections:
+            # No face - never reuse "away", so a returning user is seen right away
+            self._region = None
+            return
+
+        x, y, w, h = max((face for face, eyes, pupils in detections), key=lambda f: f[2] * f[3])
+        pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+        frame_h, frame_w = gray.shape[:2]
+        self._region = (max(0, x - pad_x), max(0, y - pad_y),
+                        min(frame_w, x + w + pad_x), min(frame_h, y + h + pad_y))
+
+        x0, y0, x1, y1 = self._region
+        cv2.resize(gray[y0:y1, x0:x1], self.size, dst=self._reference, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,155 @@
+"""
+Multi-Camera Rig
+Runs several capture devices at once for multi-monitor desks. The camera that
+currently sees the face runs at full rate, the rest do low-rate presence checks,
+and focus is fused across all of them using each camera's own calibration
+"""
+
+import os
+import time
+
+from camera_supervisor import CameraSupervisor, STATE_DEGRADED, STATE_OK
+from gaze_mapping import SCREEN_MARGIN, estimate_gaze_position, is_looking_at_screen, load_calibration, normalized_pupil
+
+
+def camera_devices():
+    """Capture device indices from EYE_FOCUS_CAMERAS (e.g. "0,1"), default camera 0"""
+    value = os.environ.get('EYE_FOCUS_CAMERAS', '0')
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+class CameraView:
+    def __init__(self, index, camera, calibration):
+        self.index = index
+        self.camera = camera
+        self.calibration = calibration  # (mapping, frame_width, frame_height) or None
+        self.capture_buffer = None
+        self.next_read = 0.0
+        self.last_result = 0.0   # Timestamp of the latest detection result
+        self.face_seen = False
+        self.focused = False
+
+    @property
+    def mapping(self):
+        return self.calibration[0] if self.calibration is not None else None
+
+
+class CameraRig:
+    def __init__(self, devices, open_camera, log, full_rate=0.1, presence_interval=1.0):
+        """
+        devices:           capture device indices
+        open_camera:       callable(index) -> ready VideoCapture or None
+        full_rate:         seconds between reads of the active camera
+        presence_interval: seconds between presence checks on the other cameras
+        """
+        self.log = log
+        self.full_rate = full_rate
+        self.presence_interval = presence_interval
+        self.screen_margin = SCREEN_MARGIN  # Slack past the calibrated screen edges
+        self.views = {}
+        for index in devices:
+            camera = CameraSupervisor(lambda index=index: open_camera(index), log)
+            calibration = load_calibration(index)
+            if calibration is not None:
+                log(f"Camera {index}: using stored calibration")
+            self.views[index] = CameraView(index, camera, calibration)
+        self.active = devices[0]
+
+    @property
+    def state(self):
+        """Degraded only when no camera is delivering frames"""
+        if any(v.camera.state == STATE_OK for v in self.views.values()):
+            return STATE_OK
+        return STATE_DEGRADED
+
+    @property
+    def reconnect_attempts(self):
+        return sum(v.camera.reconnect_attempts for v in self.views.values())
+
+    @property
+    def needs_pupils(self):
+        """Pupils are only needed to apply a calibration"""
+        return any(v.mapping is not None for v in self.views.values())
+
+    def open(self, attempts=3):
+        """Open every camera; True if at least one is up"""
+        opened = False
+        for index, view in self.views.items():
+            # Secondary cameras get a single try - they keep reconnecting in the background
+            if view.camera.open(attempts=attempts if index == self.active else 1):
+                opened = True
+        return opened
+
+    def read(self):
+        """Read the cameras that are due this tick; returns [(index, frame)]"""
+        now = time.time()
+        frames = []
+        for index, view in self.views.items():
+            if now < view.next_read:
+                continue
+            interval = self.full_rate if index == self.active else self.presence_interval
+            view.next_read = now + interval
+
+            ret, frame = view.camera.read(view.capture_buffer)
+            if ret:
+                view.capture_buffer = frame
+                frames.append((index, frame))
+        return frames
+
+    def next_read_time(self):
+        """time.time() at which the next camera read is due"""
+        return min(view.next_read for view in self.views.values())
+
+    def report(self, index, detections, timestamp):
+        """Record one camera's detection result and re-pick the active camera"""
+        view = self.views[index]
+        view.last_result = timestamp
+        if detections is None:
+            # Detection error - assume focused to avoid false pauses
+            view.focused = True
+            return
+        view.face_seen = len(detections) > 0
+        view.focused = any(self._eyes_on_screen(view, eyes, pupils, self.screen_margin)
+                           for face, eyes, pupils in detections)
+
+        active = self.views[self.active]
+        if view.face_seen and index != self.active and not active.face_seen:
+            self.log(f"Face found on camera {index} - switching to full rate")
+            self.active = index
+            view.next_read = 0.0
+
+    def focused(self, now=None):
+        """Fused focus: any camera with a recent result sees the user looking at its screen.
+
+        None when no camera has a recent result yet (e.g. the detection pool is still
+        starting) - unknown, not looking away.
+        """
+        now = now or time.time()
+        known = False
+        for index, view in self.views.items():
+            interval = self.full_rate if index == self.active else self.presence_interval
+            # Results older than a couple of check intervals no longer count
+            if now - view.last_result > 2 * interval + 0.5:
+                continue
+            if view.focused:
+                return True
+            known = True
+        return False if known else None
+
+    def release(self):
+        for view in self.views.values():
+            view.camera.release()
+
+    @staticmethod
+    def _eyes_on_screen(view, eyes, pupils, margin):
+        if len(eyes) == 0:
+            return False
+        if view.mapping is None:
+            return True  # Uncalibrated camera: visible eyes count as focused
+
+        mapping, frame_width, frame_height = view.calibration
+        pupil = normalized_pupil(eyes, pupils)
+        if pupil is None:
+            return True  # Eyes found but no pupil fix - don't pause on a detection gap
+        gaze = estimate_gaze_position(pupil, [], [], frame_width, frame_height, mapping=mapping)
+        return is_looking_at_screen(gaze, frame_width, frame_height, margin)
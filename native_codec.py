@@ -0,0 +1,124 @@
+"""
+Native Messaging Codec
+Chrome native messaging framing: a 4-byte little-endian length of the UTF-8 body,
+then the JSON body. Messages from the host are capped at 1 MB by Chrome, so
+anything larger is split into "chunk" messages that the extension reassembles
+"""
+
+import itertools
+import json
+import struct
+import threading
+
+HEADER = struct.Struct('<I')
+MAX_MESSAGE = 1024 * 1024  # Chrome drops the connection on bigger host -> extension messages
+
+# Built once - json.dumps() with non-default options constructs a new encoder per call
+_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+# Characters of serialized JSON per chunk. Re-escaping as a JSON string can grow
+# a character to at most 6 bytes (\uXXXX), so 1/8 of the limit always fits
+CHUNK_CHARS = MAX_MESSAGE // 8
+
+
+def dumps(message):
+    """Compact JSON text - no spaces after separators, non-ASCII kept as UTF-8"""
+    return _ENCODER.encode(message)
+
+
+def encode(message):
+    """One framed message as bytes (no size check)"""
+    body = dumps(message).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+def decode(buffer, max_size=MAX_MESSAGE):
+    """(message, bytes_consumed) for the first framed message in buffer, or (None, 0)
+    if it isn't complete yet. Raises ValueError on an oversized or invalid message"""
+    if len(buffer) < HEADER.size:
+        return None, 0
+    (length,) = HEADER.unpack_from(buffer)
+    if length > max_size:
+        raise ValueError(f"message of {length} bytes exceeds {max_size}")
+    end = HEADER.size + length
+    if len(buffer) < end:
+        return None, 0
+    body = bytes(buffer[HEADER.size:end])
+    return json.loads(body.decode('utf-8')), end
+
+
+def read_exactly(stream, size):
+    """size bytes from a binary stream, or None if it ends first"""
+    data = b''
+    while len(data) < size:
+        part = stream.read(size - len(data))
+        if not part:
+            return None
+        data += part
+    return data
+
+
+def read_message(stream, max_size=MAX_MESSAGE):
+    """Next message from a binary stream (e.g. sys.stdin.buffer), None at end of stream.
+    Raises ValueError on an oversized or invalid message"""
+    header = read_exactly(stream, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > max_size:
+        raise ValueError(f"message of {length} bytes exceeds {max_size}")
+    body = read_exactly(stream, length)
+    if body is None:
+        return None
+    return json.loads(body.decode('utf-8'))
+
+
+def chunk_messages(text, chunk_id, chunk_chars=CHUNK_CHARS):
+    """Split serialized JSON text into "chunk" messages - the extension joins the
+    data fields in seq order and parses the result as one message"""
+    total = (len(text) + chunk_chars - 1) // chunk_chars
+    for seq in range(total):
+        yield {"action": "chunk", "id": chunk_id, "seq": seq, "total": total,
+               "data": text[seq * chunk_chars:(seq + 1) * chunk_chars]}
+
+
+class MessageWriter:
+    def __init__(self, stream, max_size=MAX_MESSAGE):
+        """
+        stream:   binary stream to write to (e.g. sys.stdout.buffer)
+        max_size: largest framed body; bigger messages are sent as chunks
+        """
+        self.stream = stream
+        self.max_size = max_size
+        self.lock = threading.Lock()  # Messages come from several threads
+        self.chunk_ids = itertools.count(1)
+        self.messages = 0
+        self.chunked = 0
+        self.bytes_written = 0
+
+    def send(self, message):
+        """Frame and write a message (chunked if too large); returns the bytes written"""
+        text = dumps(message)
+        body = text.encode('utf-8')
+        if len(body) <= self.max_size:
+            with self.lock:
+                return self._write(body)
+
+        # Chunks of one message must not interleave with other messages
+        with self.lock:
+            self.chunked += 1
+            chunk_chars = min(CHUNK_CHARS, self.max_size // 8)
+            written = 0
+            for chunk in chunk_messages(text, next(self.chunk_ids), chunk_chars):
+                written += self._write(dumps(chunk).encode('utf-8'))
+            return written
+
+    def _write(self, body):
+        # Header and body in one write + flush. (Packing into a reused bytearray
+        # was measured slower than this concatenation in CPython.)
+        frame = HEADER.pack(len(body)) + body
+        self.stream.write(frame)
+        self.stream.flush()
+        self.messages += 1
+        self.bytes_written += len(frame)
+        return len(frame)
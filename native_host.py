@@ -0,0 +1,578 @@
+"""
+Native Host Base
+Everything the two Chrome native messaging hosts (eye_monitor.py and
+eye_monitor_debug_view.py) share: camera rig, detection (inline or pooled),
+blinks, focus timer and pause commands, the focus timeline, the command reader,
+stats, profiling, throttling and runtime config. A host adds how it opens a
+camera and, through the hooks at the end of the class, what it shows
+"""
+
+import abc
+import os
+import signal
+import sys
+import threading
+import time
+
+from camera_supervisor import STATE_DEGRADED
+from detection_pool import DetectionPool
+from eye_detection import detect_faces_and_eyes, load_cascades
+from eye_openness import BlinkTracker
+from focus_timeline import FocusTimeline
+from frame_context import FrameContext
+from lighting import LightingNormalizer, lighting_mode
+from memory_monitor import MemoryMonitor
+from motion_gate import MotionGate
+from multi_camera import CameraRig, camera_devices
+from native_codec import MessageWriter, read_message
+from profiler import SamplingProfiler
+from ring_recorder import RECORDING_DIR, RingRecorder
+from runtime_config import RuntimeConfig, config_path
+from throttle_policy import ThrottlePolicy, throttle_setting
+
+# Load Haar Cascade classifiers
+face_cascade, eye_cascade = load_cascades()
+
+
+class NativeHost(abc.ABC):
+    # Log "Away: 2.0s / 5s" every second while away (the debug view shows it on the frame)
+    log_away_progress = True
+
+    def __init__(self, capture_config):
+        self.capture_config = capture_config
+        self.capture_profile = None
+        # Scripted or recorded frames instead of the webcam (EYE_FOCUS_FRAME_SOURCE)
+        self.frame_source = os.environ.get('EYE_FOCUS_FRAME_SOURCE')
+        # One or more cameras (EYE_FOCUS_CAMERAS), each with its own supervisor
+        self.cameras = CameraRig(camera_devices(), self.open_camera, self.log)
+        self.frame_ctx = FrameContext()
+        # Optional multiprocess detection (0 = detect inline on this thread)
+        self.detection_workers = int(os.environ.get('EYE_FOCUS_WORKERS', '0'))
+        self.pool = None
+        # Motion gates (one per camera) - inline detection only, pool workers
+        # never see the previous frame
+        self.motion_gates = {}
+        # Optional face/eye region lighting normalization (EYE_FOCUS_LIGHTING), per camera
+        self.lighting_mode = lighting_mode()
+        self.lighting = {}
+        # Eye openness, blinks and drowsiness per camera, measured on the eye boxes
+        # detection already found
+        self.blink_trackers = {}
+        # Black box of the last few seconds of frames, dumped on every pause - opt-in
+        # (EYE_FOCUS_RECORD_SECONDS, default 0 = off; EYE_FOCUS_RECORD_DIR, default recordings/)
+        record_seconds = float(os.environ.get('EYE_FOCUS_RECORD_SECONDS', '0'))
+        self.recorder = None
+        if record_seconds > 0:
+            self.recorder = RingRecorder(seconds=record_seconds, log=self.log,
+                                         directory=os.environ.get('EYE_FOCUS_RECORD_DIR') or RECORDING_DIR)
+        self.writer = MessageWriter(sys.stdout.buffer)
+        # On-demand CPU profiling (start_profile command or SIGUSR1), idle until requested
+        self.profiler = SamplingProfiler(log=self.log)
+        # RSS in every stats report; tracemalloc only when EYE_FOCUS_TRACEMALLOC sets a depth
+        self.memory = MemoryMonitor(trace_frames=int(os.environ.get('EYE_FOCUS_TRACEMALLOC', '0')))
+        # Steps detection down under CPU load or on battery (EYE_FOCUS_THROTTLE=off|<level>)
+        self.throttle = ThrottlePolicy(throttle_setting(), log=self.log)
+        self.apply_throttle()
+        self.stats_interval = 5  # seconds between stats messages
+        self.last_stats_sent = time.time()
+        self.stats_frames = 0
+        self.camera_state = None
+        self.last_status_sent = 0
+        self.status_interval = 2  # seconds between "degraded" reminders
+        self.looking_away_start = None
+        self.away_started = None  # Monotonic start of the current away interval
+        # Thresholds and pipeline knobs (eye_focus_config.json, set_config), applied on the fly
+        self.config = RuntimeConfig(config_path(), log=self.log)
+        self.apply_config()
+        self.is_focused = True
+        self.last_pause_sent = 0
+        self.running = True
+        # Focus transitions history (None if the database can't be opened)
+        self.timeline = self.open_timeline()
+
+    def log(self, message):
+        """Log to stderr so it doesn't interfere with native messaging"""
+        sys.stderr.write(f"[EyeMonitor] {message}\n")
+        sys.stderr.flush()
+
+    @abc.abstractmethod
+    def open_camera(self, index=0):
+        """Make one attempt to open a camera, returning the capture or None"""
+
+    def init_camera(self):
+        """Initialize camera with retry logic, reconnecting in the background on failure"""
+        return self.cameras.open(attempts=3)
+
+    def detect_eyes(self, frame, index=0):
+        """Detect faces and eyes in frame, reusing the last result on static frames (None on error)"""
+        try:
+            gray = self.frame_ctx.gray(frame)
+            now = time.time()
+            if self.recorder is not None:
+                self.recorder.add_frame(gray, now, index)
+            started = time.perf_counter()
+
+            # Skip the cascades when nothing moved inside the last face region
+            gate = self.motion_gates.setdefault(index, MotionGate())
+            detections = gate.reuse(gray, now)
+            reused = detections is not None
+            if detections is None:
+                detections = detect_faces_and_eyes(gray, face_cascade, eye_cascade,
+                                                   with_pupils=self.detect_pupils,
+                                                   lighting=self.lighting_for(index),
+                                                   face_scale=self.throttle.level.face_scale,
+                                                   face_params=self.face_params, eye_params=self.eye_params)
+                gate.store(gray, detections, now)
+            if self.recorder is not None:
+                self.recorder.add_result(now, index, detections, (time.perf_counter() - started) * 1000, reused)
+            return detections
+
+        except Exception as e:
+            self.log(f"Detection error: {e}")
+            return None  # Treated as focused to avoid false pauses
+
+    @property
+    def detect_pupils(self):
+        """Pupils are only needed to apply a calibration, and are dropped on the lowest throttle level"""
+        return self.cameras.needs_pupils and self.throttle.level.pupils
+
+    def apply_throttle(self):
+        """Carry the throttle level over to the capture rate (detection and debug
+        frames read it as they go)"""
+        self.cameras.full_rate = self.throttle.level.frame_interval
+
+    def apply_config(self, changed=()):
+        """Carry the runtime config into the running pipeline - the camera stays open"""
+        config = self.config
+        self.away_threshold = config.away_threshold
+        self.pause_debounce = config.pause_debounce
+        self.face_params = (config.face_scale_factor, config.face_min_neighbors)
+        self.eye_params = (config.eye_scale_factor, config.eye_min_neighbors)
+        self.cameras.screen_margin = config.screen_margin
+        if any(name.endswith(('_scale_factor', '_min_neighbors')) for name in changed):
+            # Results the motion gates hold came from the old cascade settings
+            for gate in self.motion_gates.values():
+                gate.invalidate()
+
+    def poll_config(self):
+        """Pick up config file edits and set_config values, and tell Chrome what changed"""
+        changed, errors = self.config.poll()
+        if errors:
+            self.send_message({"action": "config_error", "errors": errors})
+        if changed:
+            self.apply_config(changed)
+            self.send_message({"action": "config", "changed": {name: self.config.values[name] for name in changed}})
+
+    def lighting_for(self, index):
+        """Lighting normalizer for a camera, None when normalization is off"""
+        if self.lighting_mode is None:
+            return None
+        normalizer = self.lighting.get(index)
+        if normalizer is None:
+            normalizer = self.lighting[index] = LightingNormalizer(self.lighting_mode)
+            self.log(f"Camera {index}: {self.lighting_mode} lighting normalization")
+        return normalizer
+
+    def blink_tracker(self, index):
+        """Eye openness/blink tracker for a camera"""
+        tracker = self.blink_trackers.get(index)
+        if tracker is None:
+            tracker = self.blink_trackers[index] = BlinkTracker()
+        return tracker
+
+    def observe_eyes(self, index, frame, now):
+        """Measure eye openness on a new frame (on the last eye boxes found) and tell
+        Chrome when drowsiness changes"""
+        tracker = self.blink_tracker(index)
+        was_closed = tracker.closed
+        try:
+            changed = tracker.observe(self.frame_ctx.gray(frame), now)
+        except Exception as e:
+            self.log(f"Eye openness error: {e}")
+            return
+        if tracker.closed != was_closed and index in self.motion_gates:
+            # Lids move too little for the motion gate - a reused result would keep
+            # the old eyes for up to a second
+            self.motion_gates[index].invalidate()
+        if changed and index == self.cameras.active:
+            self.log("😴 User looks drowsy" if tracker.drowsy else "User no longer drowsy")
+            self.send_message({
+                "action": "drowsy",
+                "drowsy": tracker.drowsy,
+                "perclos": round(tracker.perclos, 3),
+                "blink_rate": round(tracker.blink_rate, 1)
+            })
+
+    def eyes_focus(self, focused, now):
+        """Blinks keep the current focus state; eyes closed past a blink (dozing) count as away"""
+        tracker = self.blink_trackers.get(self.cameras.active)
+        if tracker is None or not tracker.closed:
+            return focused
+        if tracker.closure(now) >= tracker.long_closure:
+            return False
+        return self.looking_away_start is None
+
+    def run_detection(self, index, frame):
+        """Detect inline, or through the worker pool when enabled.
+
+        Returns [(timestamp, camera_index, detections)] - the pool may return zero
+        or several results per call, always in capture order.
+        """
+        now = time.time()
+        if self.detection_workers <= 0:
+            return [(now, index, self.detect_eyes(frame, index))]
+
+        gray = self.frame_ctx.gray(frame)
+        if self.pool is None or not self.pool.fits(gray):
+            if self.pool is not None:
+                self.pool.close()
+            self.log(f"Starting detection pool with {self.detection_workers} workers")
+            self.pool = DetectionPool(self.detection_workers, gray.shape,
+                                      with_pupils=self.cameras.needs_pupils,
+                                      lighting_mode=self.lighting_mode)
+
+        if self.recorder is not None:
+            self.recorder.add_frame(gray, now, index)
+        level = self.throttle.level
+        self.pool.submit(gray, now, tag=index, face_scale=level.face_scale, pupils=level.pupils,
+                         face_params=self.face_params, eye_params=self.eye_params)
+        results = self.pool.collect()
+        if self.recorder is not None:
+            # Queue wait included - that's what delays the focus decision
+            collected = time.time()
+            for timestamp, camera_index, detections in results:
+                self.recorder.add_result(timestamp, camera_index, detections, (collected - timestamp) * 1000)
+        return results
+
+    def open_timeline(self):
+        if self.frame_source:
+            return None  # Synthetic frames aren't the user's focus history
+        try:
+            return FocusTimeline(source='monitor')
+        except Exception as e:
+            self.log(f"Focus timeline disabled: {e}")
+            return None
+
+    def record_focus(self, focused, now=None):
+        """Append a focus transition (None = no data) to the timeline"""
+        if self.timeline is None:
+            return
+        try:
+            if focused is None:
+                self.timeline.stop(now)
+            else:
+                self.timeline.record(focused, now)
+        except Exception as e:
+            self.log(f"Timeline write failed: {e}")
+
+    def update_focus(self, eyes_detected, now):
+        """Advance the looking-away timer and send a pause once it passes the threshold;
+        returns the current away duration"""
+        self.record_focus(eyes_detected, now)
+        if self.recorder is not None:
+            self.recorder.mark_focus(eyes_detected)
+        away_duration = 0
+        if not eyes_detected:
+            # User looking away
+            if self.looking_away_start is None:
+                self.looking_away_start = now
+                self.send_away_event(True)
+                self.log("👀 User looking away...")
+            else:
+                away_duration = now - self.looking_away_start
+
+                # Log every second
+                if self.log_away_progress and int(away_duration) > int(away_duration - 0.2):
+                    self.log(f"Away: {away_duration:.1f}s / {self.away_threshold:g}s")
+
+                # Send pause after threshold
+                if away_duration >= self.away_threshold and self.is_focused:
+                    self.log(f"🔴 THRESHOLD! Sending pause command")
+                    self.send_pause_command()
+                    self.is_focused = False
+        else:
+            # User looking at screen
+            if self.looking_away_start is not None:
+                duration = now - self.looking_away_start
+                self.log(f"👁️ User returned (was away {duration:.1f}s)")
+
+            self.looking_away_start = None
+            self.send_away_event(False)
+            self.is_focused = True
+
+        return away_duration
+
+    def send_message(self, message):
+        """Send message to Chrome extension using native messaging protocol"""
+        try:
+            # Length-prefixed UTF-8 JSON, chunked if over Chrome's 1 MB limit
+            self.writer.send(message)
+
+            self.log(f"✓ Sent: {self.describe_message(message)}")
+            return True
+
+        except Exception as e:
+            self.log(f"✗ Send error: {e}")
+            return False
+
+    def send_away_event(self, away):
+        """Report every away interval, including glances shorter than the pause threshold.
+
+        Timestamps are monotonic host seconds - the extension only uses the
+        differences, to work out which part of the video was missed.
+        """
+        now = time.monotonic()
+        if away:
+            if self.away_started is None:
+                self.away_started = now
+                self.send_message({"action": "away_start", "t": round(now, 3)})
+        elif self.away_started is not None:
+            self.send_message({"action": "away_end", "t": round(now, 3),
+                               "d": round(now - self.away_started, 3)})
+            self.away_started = None
+
+    def send_pause_command(self):
+        """Send pause command to Chrome"""
+        current_time = time.time()
+
+        # Prevent spam (minimum pause_debounce seconds between commands)
+        if current_time - self.last_pause_sent < self.pause_debounce:
+            return
+
+        message = {
+            "action": "pause_video",
+            "reason": "eyes_away"
+        }
+
+        if self.send_message(message):
+            self.last_pause_sent = current_time
+            self.dump_recording("pause")
+
+    def dump_recording(self, reason):
+        """Save the ring recorder to a file in the background and tell Chrome where it went"""
+        if self.recorder is None:
+            return
+
+        def saved(path):
+            if path is not None:
+                self.send_message({"action": "recording_saved", "reason": reason, "path": path})
+
+        # What detection ran with, so a replay reproduces it
+        settings = {
+            "face_params": self.face_params,
+            "eye_params": self.eye_params,
+            "face_scale": self.throttle.level.face_scale,
+            "lighting": self.lighting_mode,
+        }
+        self.recorder.dump(reason, done=saved, settings=settings)
+
+    def read_commands(self):
+        """Read messages from Chrome on stdin until the extension disconnects"""
+        # Unbuffered: a daemon thread blocked in a buffered read holds the buffer's
+        # lock, and the interpreter aborts on it at exit
+        stdin = os.fdopen(sys.stdin.fileno(), 'rb', buffering=0, closefd=False)
+        while self.running:
+            try:
+                message = read_message(stdin)
+            except ValueError as e:
+                self.log(f"Bad message from Chrome: {e}")
+                return  # Framing is lost - nothing after this can be trusted
+            except Exception as e:
+                self.log(f"Command reader stopped: {e}")
+                return
+            if message is None:
+                self.log("Chrome closed the connection")
+                return
+            self.handle_command(message)
+
+    def handle_command(self, message):
+        """Run a command sent by the extension"""
+        command = message.get("command")
+        self.log(f"Command from Chrome: {command}")
+        if command == "dump_recording":
+            self.dump_recording("request")
+        elif command == "set_config":
+            self.config.submit(message.get("values"))
+        elif command == "start_profile":
+            self.start_profile(message.get("seconds", 10), message.get("format", "collapsed"))
+        elif command == "set_context":
+            self.set_context(message.get("context"))
+        else:
+            self.log(f"Unknown command: {command}")
+
+    def set_context(self, context):
+        """Tag timeline transitions from now on with what is being watched (a video id, or None)"""
+        if self.timeline is None:
+            return
+        try:
+            self.timeline.set_context(None if context is None else str(context))
+        except Exception as e:
+            self.log(f"Timeline write failed: {e}")
+
+    def start_profile(self, seconds=10, fmt='collapsed'):
+        """Profile the host for `seconds` ('collapsed' stacks or 'pstats'), then report the file"""
+        try:
+            if not self.profiler.request(seconds, fmt, done=self.profile_saved):
+                self.log("Profile already running")
+        except (TypeError, ValueError) as e:
+            self.log(f"Bad profile request: {e}")
+
+    def profile_saved(self, path):
+        if path is not None:
+            self.send_message({"action": "profile_saved", "path": path})
+
+    def send_camera_status(self):
+        """Tell Chrome when the camera drops out or recovers"""
+        state = self.cameras.state
+        current_time = time.time()
+
+        # Send on every change, and keep reminding while degraded
+        if state == self.camera_state:
+            if state != STATE_DEGRADED or current_time - self.last_status_sent < self.status_interval:
+                return
+
+        message = {
+            "action": "camera_status",
+            "state": state,
+            "reconnect_attempts": self.cameras.reconnect_attempts
+        }
+
+        if self.send_message(message):
+            self.camera_state = state
+            self.last_status_sent = current_time
+
+    def send_stats(self):
+        """Send periodic pipeline metrics to Chrome"""
+        current_time = time.time()
+        elapsed = current_time - self.last_stats_sent
+        if elapsed < self.stats_interval:
+            return
+
+        hits = sum(g.hits for g in self.motion_gates.values())
+        checks = hits + sum(g.misses for g in self.motion_gates.values())
+        message = {
+            "action": "stats",
+            "fps": round(self.stats_frames / elapsed, 1),
+            "motion_gate_hit_rate": round(hits / checks, 3) if checks else 0.0
+        }
+        if self.pool is not None:
+            message["pool_dropped"] = self.pool.dropped
+            message["pool_lost"] = self.pool.lost
+            message["pool_restarts"] = self.pool.restarts
+        blinks = self.blink_trackers.get(self.cameras.active)
+        if blinks is not None and blinks.observed_time > 0:
+            message["blink_rate"] = round(blinks.blink_rate, 1)
+            message["perclos"] = round(blinks.perclos, 3)
+            message["drowsy"] = blinks.drowsy
+        if self.lighting:
+            message["lighting_estimates"] = sum(n.estimates for n in self.lighting.values())
+            message["lighting_recovered"] = sum(n.recovered for n in self.lighting.values())
+        message.update(self.throttle.stats())
+        message.update(self.config.stats())
+        message.update(self.memory.sample())
+
+        if self.send_message(message):
+            self.last_stats_sent = current_time
+            self.stats_frames = 0
+
+    def monitor_loop(self):
+        """Main monitoring loop"""
+        self.log("Starting eye tracking loop...")
+        threading.Thread(target=self.read_commands, name="command-reader", daemon=True).start()
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            # Only queues the request - the loop starts it, no I/O in the handler
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiler.request(done=self.profile_saved))
+
+        if not self.init_camera():
+            self.log("✗ Camera initialization failed - waiting for device")
+            self.camera_unavailable()
+
+        try:
+            frame_count = 0
+
+            while self.running:
+                self.profiler.tick()
+                if self.throttle.update():
+                    self.apply_throttle()
+                self.poll_config()
+
+                # Active camera at full rate, the others only for presence checks
+                frames = self.cameras.read()
+                self.send_camera_status()
+
+                if self.cameras.state == STATE_DEGRADED:
+                    # Supervisors reconnect in the background; keep the session alive
+                    # but don't count the outage as looking away
+                    self.looking_away_start = None
+                    self.send_away_event(False)
+                    self.record_focus(None)
+                    time.sleep(0.1)
+                    continue
+
+                # Detect eyes (the pool can lag a frame or two behind capture)
+                for index, frame in frames:
+                    self.observe_eyes(index, frame, time.time())
+                    for timestamp, camera_index, detections in self.run_detection(index, frame):
+                        self.cameras.report(camera_index, detections, timestamp)
+                        self.blink_tracker(camera_index).update_boxes(detections)
+                        self.detection_result(camera_index, detections)
+
+                # Focus is fused across cameras
+                now = time.time()
+                focused = self.cameras.focused(now)
+                if focused is None:
+                    # No detection result yet (pool starting or restarting) - keep
+                    # the current state rather than start the away timer
+                    focused = self.looking_away_start is None
+                eyes_detected = self.eyes_focus(focused, now)
+                away_duration = self.update_focus(eyes_detected, now)
+
+                self.stats_frames += len(frames)
+                self.send_stats()
+                self.show_frame(eyes_detected, away_duration)
+
+                # Log status periodically
+                frame_count += 1
+                if frame_count % 50 == 0:
+                    status = "FOCUSED" if self.looking_away_start is None else "AWAY"
+                    self.log(f"Status: {status}")
+
+                # Sleep out the rest of the throttle level's frame interval, measured
+                # from this frame's read - not a fixed nap on top of the work
+                delay = min(self.cameras.next_read_time() - time.time(), self.throttle.level.frame_interval)
+                if delay > 0:
+                    time.sleep(delay)
+
+        except KeyboardInterrupt:
+            self.log("Stopped by user")
+        except Exception as e:
+            self.log(f"Error in monitor loop: {e}")
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+            self.cameras.release()
+            if self.timeline is not None:
+                self.timeline.close()
+
+    def run(self):
+        """Start the monitor"""
+        try:
+            self.monitor_loop()
+        except Exception as e:
+            self.log(f"Fatal error: {e}")
+            sys.exit(1)
+
+    # Hooks for what a host shows - the base host only talks to Chrome
+
+    def describe_message(self, message):
+        """How a sent message appears in the log"""
+        return message
+
+    def camera_unavailable(self):
+        """Called once when no camera opens at startup (they keep reconnecting)"""
+
+    def detection_result(self, camera_index, detections):
+        """Called with every detection result, in capture order"""
+
+    def show_frame(self, eyes_detected, away_duration):
+        """Called once per loop iteration after the focus decision"""
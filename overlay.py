@@ -0,0 +1,88 @@
+"""
+Overlay Compositor
+Status text and static shapes are rendered once into cached layers (BGR pixels plus
+an alpha mask) and only re-rendered when their content changes; every other frame
+just copies the masked pixels onto the frame
+"""
+
+import cv2
+import numpy as np
+
+
+class OverlayLayer:
+    def __init__(self):
+        self.key = None
+        self.shape = None
+        self.box = None     # (x, y, w, h) of the drawn content within the layer, None if empty
+        self.pixels = None  # BGR content cropped to box
+        self.alpha = None   # uint8 mask cropped to box: nonzero where the layer covers the frame
+
+    def render(self, key, shape, draw):
+        canvas = np.zeros(shape, dtype=np.uint8)
+        draw(canvas)
+        # Keep only the bounding box of what was drawn - text covers a small part of a
+        # layer. The canvas seen as one channel of row bytes gives it exactly (any
+        # nonzero channel counts); the mask is only built inside the box
+        bx, y, bw, h = cv2.boundingRect(canvas.reshape(shape[0], -1))
+        if bw == 0 or h == 0:
+            self.box = self.pixels = self.alpha = None
+        else:
+            x = bx // 3
+            w = (bx + bw + 2) // 3 - x
+            self.box = (x, y, w, h)
+            self.pixels = canvas[y:y+h, x:x+w].copy()
+            # Max over the channels: nonzero wherever any channel was drawn
+            b, g, r = cv2.split(self.pixels)
+            self.alpha = cv2.max(cv2.max(b, g), r)
+        self.key = key
+        self.shape = shape
+
+    def composite(self, target):
+        if self.box is None:
+            return
+        x, y, w, h = self.box
+        # Masked copy straight into the frame view
+        cv2.copyTo(self.pixels, self.alpha, target[y:y+h, x:x+w])
+
+
+class OverlayCompositor:
+    def __init__(self):
+        self.layers = {}
+        self.renders = 0
+        self.reuses = 0
+
+    def draw(self, frame, name, key, draw, region=None):
+        """Composite layer `name` onto the frame in place.
+
+        key:    anything comparable describing the layer's content (e.g. the text
+                shown); draw only runs when it changes
+        draw:   callable(canvas) drawing on a black BGR canvas - black pixels count
+                as transparent
+        region: (x, y, w, h) the layer covers, default the whole frame; draw works
+                in coordinates relative to it
+        """
+        if region is None:
+            x, y, w, h = 0, 0, frame.shape[1], frame.shape[0]
+        else:
+            x, y, w, h = region
+        target = frame[y:y+h, x:x+w]
+        shape = target.shape[:2] + (3,)
+
+        layer = self.layers.get(name)
+        if layer is None:
+            layer = self.layers[name] = OverlayLayer()
+        if layer.key != key or layer.shape != shape:
+            layer.render(key, shape, draw)
+            self.renders += 1
+        else:
+            self.reuses += 1
+
+        layer.composite(target)
+        return frame
+
+    def invalidate(self, name=None):
+        """Force a re-render of one layer, or all of them"""
+        if name is None:
+            self.layers.clear()
+        else:
+            self.layers.pop(name, None)
@@ -0,0 +1,225 @@
+"""
+Sampling Profiler
+On-demand CPU profiling for the native hosts, requested by the extension (the
+start_profile command) or with SIGUSR1. Nothing runs until a profile is requested;
+then, for a set window, either a sampler thread records every thread's Python
+stack a few hundred times a second and writes collapsed stacks (one
+"frame;frame;frame count" line per stack - the input of flamegraph.pl and
+speedscope), or the monitor loop's own thread is traced with cProfile and written
+as pstats. Where threads have their own CPU clocks (Linux, macOS), samples of a
+thread that was sleeping or blocked end in an "(idle)" frame, so waiting on stdin
+or between frames doesn't hide where the CPU goes. Detection pool workers are
+separate processes and aren't included. Summarize a profile with:
+
+    python profiler.py profiles/profile-20250101-120000-1.folded
+"""
+
+import argparse
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+FORMATS = ('collapsed', 'pstats')
+EXTENSIONS = {'collapsed': '.folded', 'pstats': '.prof'}
+IDLE = '(idle)'
+
+
+def thread_cpu_time(ident):
+    """CPU seconds used by a thread (threading ident), None where that can't be read"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+class SamplingProfiler:
+    def __init__(self, directory=PROFILE_DIR, interval=0.005, max_seconds=120, max_files=20, log=None):
+        """
+        directory:   where profiles go - only the newest max_files are kept
+        interval:    seconds between stack samples ('collapsed')
+        max_seconds: longest window a request may ask for
+        """
+        self.directory = directory
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_files = max_files
+        self.log = log
+        self.pending = None  # (seconds, format, done) waiting for the next tick
+        self.running = False
+        self.profiles = 0
+        self._trace = None   # [cProfile.Profile, end time, path, done] while tracing
+
+    def request(self, seconds=10, fmt='collapsed', done=None):
+        """Ask for a profile of the next `seconds`; done(path or None) is called when it's written.
+
+        Only stores the request - safe from a signal handler or another thread. It
+        starts on the next tick() of the monitor loop. Returns False if a profile
+        is already pending or running.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown profile format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        if self.pending is not None or self.running:
+            return False
+        self.pending = (min(max(float(seconds), 0.1), self.max_seconds), fmt, done)
+        return True
+
+    def tick(self):
+        """Call once per monitor loop iteration - a single attribute check while idle"""
+        if self.pending is None and self._trace is None:
+            return
+        if self._trace is not None:
+            self._check_trace()
+            return
+
+        seconds, fmt, done = self.pending
+        self.pending = None
+        self.running = True
+        self.profiles += 1
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"profile-{stamp}-{self.profiles}{EXTENSIONS[fmt]}")
+        self._log(f"Profiling for {seconds:g}s ({fmt})")
+
+        if fmt == 'pstats':
+            # cProfile only sees the thread that enables it - the monitor loop
+            profile = cProfile.Profile()
+            self._trace = [profile, time.monotonic() + seconds, path, done]
+            profile.enable()
+        else:
+            threading.Thread(target=self._sample, args=(seconds, path, done),
+                             name="profiler-sampler", daemon=True).start()
+
+    def _check_trace(self):
+        profile, end, path, done = self._trace
+        if time.monotonic() < end:
+            return
+        profile.disable()
+        self._trace = None
+        written = None
+        try:
+            profile.dump_stats(path)
+            written = path
+        except Exception as e:
+            self._log(f"Profile write failed: {e}")
+        self._finish(written, done)
+
+    def _sample(self, seconds, path, done):
+        counts = Counter()
+        labels = {}  # Code object -> "file:function", so each one is formatted once
+        me = threading.get_ident()
+        samples = 0
+        cpu = {}  # ident -> CPU time at the previous sample
+        last = time.monotonic()
+        end = last + seconds
+        while last < end:
+            now = time.monotonic()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                # Busy if the thread ran for at least half the time since the last sample
+                used = thread_cpu_time(ident)
+                idle = (used is not None and ident in cpu
+                        and used - cpu[ident] < 0.5 * (now - last))
+                cpu[ident] = used
+                stack = [IDLE] if idle else []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[';'.join(reversed(stack))] += 1
+            samples += 1
+            last = now
+            time.sleep(self.interval)
+
+        written = None
+        try:
+            with open(path, 'w') as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            written = path
+            self._log(f"Profile: {samples} samples to {path}")
+        except Exception as e:
+            self._log(f"Profile write failed: {e}")
+        self._finish(written, done)
+
+    def _finish(self, path, done):
+        self._prune()
+        self.running = False
+        if done is not None:
+            done(path)
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, 'profile-*')), key=os.path.getmtime)
+        for old in files[:-self.max_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _log(self, message):
+        if self.log is not None:
+            self.log(message)
+
+
+def read_collapsed(path):
+    """[(stack frames, count)] from a collapsed-stack file"""
+    stacks = []
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks.append((stack.split(';'), int(count)))
+    return stacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a native host profile")
+    parser.add_argument('path', help="profile file (.folded or .prof)")
+    parser.add_argument('--top', type=int, default=25, help="functions to list")
+    args = parser.parse_args()
+
+    if args.path.endswith('.prof'):
+        pstats.Stats(args.path).sort_stats('cumulative').print_stats(args.top)
+        return
+
+    stacks = read_collapsed(args.path)
+    total = sum(count for _, count in stacks)
+    if total == 0:
+        print(f"{args.path}: no samples")
+        return
+    threads, idle = Counter(), Counter()
+    own, inclusive = Counter(), Counter()
+    for frames, count in stacks:
+        threads[frames[0]] += count
+        if frames[-1] == IDLE:
+            idle[frames[0]] += count
+            continue
+        own[frames[-1]] += count
+        for label in set(frames[1:]):
+            inclusive[label] += count
+    busy = total - sum(idle.values())
+
+    print(f"{args.path}: {total} thread samples, {busy} busy")
+    print("\nBy thread (share of samples busy):")
+    for name, count in threads.most_common():
+        print(f"  {100 * (count - idle[name]) / count:5.1f}%  {name} ({count} samples)")
+    if busy == 0:
+        return
+    print(f"\nBusy samples:\n{'self':>6} {'total':>6}  function")
+    for label, count in own.most_common(args.top):
+        print(f"{100 * count / busy:5.1f}% {100 * inclusive[label] / busy:5.1f}%  {label}")
+
+
+if __name__ == '__main__':
+    main()
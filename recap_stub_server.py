@@ -0,0 +1,119 @@
+"""
+Recap Stub Server
+Local stand-in for the Groq/OpenAI chat completions API, for testing the
+extension's recap cache without API keys or network: answers with canned
+recaps after a configurable delay and counts the requests that reach it.
+
+Point the extension at it from the DevTools console of a YouTube tab:
+    chrome.storage.sync.set({ aiProvider: 'groq', groqKey: 'stub',
+                              groqApiBase: 'http://localhost:8765/openai/v1' })
+Then pause the same video twice - the second recap should appear instantly and
+the request count here should not go up. GET /stats shows the counters.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+stats = {"requests": 0, "completions": 0}
+stats_lock = threading.Lock()
+
+
+def canned_reply(prompt, number):
+    """Recap text (or a topic list, when the prompt asks for JSON) tagged with the request number"""
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+    if 'JSON array' in prompt:
+        return json.dumps([{"topic": f"Stub topic {number}", "timestamp": 30},
+                           {"topic": "Another stub topic", "timestamp": 90}])
+    return (f"• Stub recap #{number} (prompt {digest})\n"
+            f"• The prompt was {len(prompt)} characters long\n"
+            f"• Served by recap_stub_server.py")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 2.0
+
+    def send_cors_headers(self):
+        # Content scripts fetch from the YouTube origin, so the stub has to allow
+        # cross-origin (and public -> localhost) requests
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Private-Network', 'true')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors_headers()
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with stats_lock:
+                self.send_json(200, dict(stats))
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        with stats_lock:
+            stats["requests"] += 1
+        if not self.path.endswith('/chat/completions'):
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        except ValueError:
+            self.send_json(400, {"error": "invalid JSON"})
+            return
+
+        with stats_lock:
+            stats["completions"] += 1
+            number = stats["completions"]
+
+        # Simulate model latency so cache hits are easy to tell apart
+        time.sleep(self.latency)
+        print(f"#{number}: {len(prompt)} chars -> replied after {self.latency:.1f}s")
+        self.send_json(200, {
+            "id": f"stub-{number}",
+            "object": "chat.completion",
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": canned_reply(prompt, number)}}],
+        })
+
+    def log_message(self, format, *args):
+        pass  # One line per completion is printed above
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in chat completions server for the recap cache")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=2.0, help="seconds before each reply")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    print(f"Recap stub server on http://localhost:{args.port}/openai/v1 (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"\n{stats['completions']} completions served")
+
+
+if __name__ == '__main__':
+    main()
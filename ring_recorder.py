@@ -0,0 +1,300 @@
+"""
+Ring Recorder
+Black box for the native hosts: keeps the last few seconds of downscaled gray
+frames with each frame's detection result and timing in preallocated memory, and
+dumps them to a compressed file when a pause is sent (or on request). Off unless
+EYE_FOCUS_RECORD_SECONDS is set. A dump also holds the cascade parameters and
+lighting mode in use when it was written, and can be replayed through the
+detection pipeline with them to reproduce a false pause offline:
+
+    python ring_recorder.py recordings/pause-20250101-120000.npz
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from eye_detection import EYE_PARAMS, FACE_PARAMS, detect_faces_and_eyes, load_cascades
+from lighting import LightingNormalizer
+
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+# One entry per recorded frame
+RECORD_DTYPE = np.dtype([
+    ('t', 'f8'),            # capture time (unix seconds)
+    ('camera', 'i2'),
+    ('height', 'i2'),       # capture size - stored frames are scaled from it
+    ('width', 'i2'),
+    ('detect_ms', 'f4'),    # cascade time, or queue + detection time with the worker pool; -1 if no result
+    ('faces', 'i1'),        # -1 until the detection result arrives (or on detection error)
+    ('eyes', 'i1'),         # eyes found across all faces
+    ('face', 'i2', (4,)),   # first face box (x, y, w, h) in full-resolution pixels
+    ('reused', '?'),        # result reused by the motion gate instead of running the cascades
+    ('focused', 'i1'),      # fused focus decision after this frame: 1, 0, -1 unknown
+])
+
+
+# Detection settings of dumps written without them (and of older dumps)
+DEFAULT_SETTINGS = {
+    "face_params": FACE_PARAMS,
+    "eye_params": EYE_PARAMS,
+    "face_scale": 1.0,
+    "lighting": None,
+}
+
+
+class RingRecorder:
+    def __init__(self, seconds=10, fps=10, scale=0.5, directory=RECORDING_DIR, max_files=20, log=None):
+        """
+        seconds, fps: how much history to keep (capacity = seconds * fps frames)
+        scale:        frames are stored downscaled by this factor
+        directory:    where dumps go - only the newest max_files are kept
+        """
+        self.capacity = max(1, int(seconds * fps))
+        self.scale = scale
+        self.directory = directory
+        self.max_files = max_files
+        self.log = log
+        self.lock = threading.Lock()
+
+        self.records = np.zeros(self.capacity, dtype=RECORD_DTYPE)
+        self.frames = None  # (capacity, h, w) uint8, sized from the first frame
+        self.next = 0       # Slot the next frame goes into
+        self.count = 0
+        self.dumps = 0
+        self.writing = False  # One dump at a time - each holds a copy of the whole buffer
+        self.writing_lock = threading.Lock()  # Dumps come from the monitor loop and the command thread
+
+    def add_frame(self, gray, timestamp, camera=0):
+        """Store a frame (downscaled into its preallocated slot)"""
+        with self.lock:
+            if self.frames is None:
+                self._allocate(gray.shape)
+            slot = self.next
+            h, w = self.frames.shape[1:]
+            cv2.resize(gray, (w, h), dst=self.frames[slot], interpolation=cv2.INTER_AREA)
+            record = self.records[slot]
+            record['t'] = timestamp
+            record['camera'] = camera
+            record['height'], record['width'] = gray.shape[:2]
+            record['detect_ms'] = -1
+            record['faces'] = -1
+            record['eyes'] = 0
+            record['face'] = 0
+            record['reused'] = False
+            record['focused'] = -1
+            self.next = (slot + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def add_result(self, timestamp, camera, detections, detect_ms, reused=False):
+        """Attach a detection result to the frame captured at `timestamp` (if still held)"""
+        with self.lock:
+            slot = self._find(timestamp, camera)
+            if slot is None:
+                return
+            record = self.records[slot]
+            record['detect_ms'] = detect_ms
+            record['reused'] = reused
+            if detections is None:
+                return  # Detection error - faces stays -1
+            record['faces'] = min(len(detections), 127)
+            record['eyes'] = min(sum(len(eyes) for face, eyes, pupils in detections), 127)
+            if detections:
+                record['face'] = detections[0][0]
+
+    def mark_focus(self, focused):
+        """Record the fused focus decision on the newest frame"""
+        with self.lock:
+            if self.count:
+                self.records[(self.next - 1) % self.capacity]['focused'] = 1 if focused else 0
+
+    def snapshot(self):
+        """(records, frames) copies in capture order"""
+        with self.lock:
+            if self.count == 0:
+                return self.records[:0].copy(), np.zeros((0, 0, 0), dtype=np.uint8)
+            order = (np.arange(self.count) + self.next - self.count) % self.capacity
+            return self.records[order], self.frames[order]
+
+    def dump(self, reason, done=None, settings=None):
+        """Write the buffer to a file on a background thread; done(path or None) is called when finished.
+
+        settings: detection settings to replay with - face_params, eye_params,
+        face_scale and lighting (mode or None), see load_recording.
+        Skipped (done(None)) while the previous dump is still being written.
+        """
+        with self.writing_lock:
+            busy = self.writing
+            self.writing = True
+        if busy:
+            if self.log is not None:
+                self.log("Recording dump skipped - previous dump still writing")
+            if done is not None:
+                done(None)
+            return None
+        records, frames = self.snapshot()
+        if len(records) == 0:
+            with self.writing_lock:
+                self.writing = False
+            if done is not None:
+                done(None)
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.dumps += 1
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{reason}-{stamp}-{self.dumps}.npz")
+
+        settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        metadata = {
+            "face_params": np.array(settings["face_params"], dtype='f8'),
+            "eye_params": np.array(settings["eye_params"], dtype='f8'),
+            "face_scale": settings["face_scale"],
+            "lighting": settings["lighting"] or '',
+        }
+
+        def write():
+            written = None
+            try:
+                np.savez_compressed(path, records=records, frames=frames, reason=reason, **metadata)
+                self._prune()
+                written = path
+                if self.log is not None:
+                    self.log(f"Recorded {len(records)} frames to {path}")
+            except Exception as e:
+                if self.log is not None:
+                    self.log(f"Recording dump failed: {e}")
+            with self.writing_lock:
+                self.writing = False
+            if done is not None:
+                done(written)
+
+        # Compression takes a few hundred ms - keep it off the capture loop
+        threading.Thread(target=write, name="ring-recorder-dump", daemon=True).start()
+        return path
+
+    def _allocate(self, shape):
+        # Every camera is stored at this size, whatever its own resolution
+        h, w = shape[:2]
+        size = (max(1, int(h * self.scale)), max(1, int(w * self.scale)))
+        self.frames = np.zeros((self.capacity,) + size, dtype=np.uint8)
+
+    def _find(self, timestamp, camera):
+        # Results come back in capture order, so the match is near the newest frame
+        for back in range(1, self.count + 1):
+            slot = (self.next - back) % self.capacity
+            record = self.records[slot]
+            if record['t'] == timestamp and record['camera'] == camera:
+                return slot
+            if record['t'] < timestamp:
+                return None
+        return None
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, '*.npz')), key=os.path.getmtime)
+        for old in files[:-self.max_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def load_recording(path):
+    """Dict with records, frames, reason and the detection settings from a dump"""
+    with np.load(path) as data:
+        settings = dict(DEFAULT_SETTINGS)
+        if "face_params" in data:
+            settings["face_params"] = _cascade_params(data["face_params"])
+            settings["eye_params"] = _cascade_params(data["eye_params"])
+            settings["face_scale"] = float(data["face_scale"])
+            settings["lighting"] = str(data["lighting"]) or None
+        return {
+            "records": data["records"],
+            "frames": data["frames"],
+            "reason": str(data["reason"]),
+            "settings": settings,
+        }
+
+
+def _cascade_params(values):
+    # (scaleFactor, minNeighbors) - detectMultiScale wants an int for the second
+    scale, neighbors = values
+    return (float(scale), int(neighbors))
+
+
+def replay(recording, face_cascade, eye_cascade):
+    """Yield (record, frame, detections) with each frame re-run through the detection pipeline.
+
+    Detection uses the cascade parameters, face search scale and lighting mode
+    saved with the recording. Frames are upscaled back to their capture size
+    first, so the cascades see the same geometry as live - detail lost to
+    downscaling can still change results.
+    """
+    settings = recording.get("settings", DEFAULT_SETTINGS)
+    lighting = {}  # One normalizer per camera, as live
+    for record, small in zip(recording["records"], recording["frames"]):
+        frame = cv2.resize(small, (int(record['width']), int(record['height'])), interpolation=cv2.INTER_LINEAR)
+        normalizer = None
+        if settings["lighting"] is not None:
+            camera = int(record['camera'])
+            normalizer = lighting.get(camera)
+            if normalizer is None:
+                normalizer = lighting[camera] = LightingNormalizer(settings["lighting"])
+        yield record, frame, detect_faces_and_eyes(frame, face_cascade, eye_cascade, lighting=normalizer,
+                                                   face_scale=settings["face_scale"],
+                                                   face_params=settings["face_params"],
+                                                   eye_params=settings["eye_params"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a ring recorder dump through face/eye detection")
+    parser.add_argument('path', help="recording .npz file")
+    parser.add_argument('--show', action='store_true', help="show the frames while replaying")
+    args = parser.parse_args()
+
+    recording = load_recording(args.path)
+    records = recording["records"]
+    if len(records) == 0:
+        print(f"{args.path}: empty recording")
+        return
+    settings = recording["settings"]
+    print(f"{args.path}: {len(records)} frames ({recording['reason']}), "
+          f"{records['t'][-1] - records['t'][0]:.1f}s")
+    print(f"face {settings['face_params']} at scale {settings['face_scale']}, eyes {settings['eye_params']}, "
+          f"lighting {settings['lighting'] or 'off'}")
+
+    face_cascade, eye_cascade = load_cascades()
+    start = records['t'][0]
+    mismatches = 0
+    print(f"{'time':>7} {'cam':>3} {'live faces/eyes':>16} {'replay':>8} {'ms':>6}  focus")
+    for record, frame, detections in replay(recording, face_cascade, eye_cascade):
+        faces = len(detections)
+        eyes = sum(len(e) for f, e, p in detections)
+        live = "error" if record['faces'] < 0 else f"{record['faces']}/{record['eyes']}"
+        differs = record['faces'] >= 0 and (faces, eyes) != (record['faces'], record['eyes'])
+        mismatches += differs
+        focus = {1: "focused", 0: "AWAY", -1: ""}[int(record['focused'])]
+        print(f"{record['t'] - start:7.2f} {record['camera']:3d} {live:>16} {faces}/{eyes:<6} "
+              f"{record['detect_ms']:6.1f}  {focus}{'  (reused)' if record['reused'] else ''}"
+              f"{'  <- differs' if differs else ''}")
+
+        if args.show:
+            view = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            for (x, y, w, h), eyes_found, _ in detections:
+                cv2.rectangle(view, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.imshow('Ring recorder replay', view)
+            if cv2.waitKey(100) & 0xFF == ord('q'):
+                break
+
+    print(f"\n{mismatches} frame(s) where the replay differs from the live result")
+    if args.show:
+        cv2.destroyAllWindows()
+
+
+if __name__ == '__main__':
+    main()
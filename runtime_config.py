@@ -0,0 +1,189 @@
+"""
+Runtime Configuration
+Thresholds and pipeline knobs of the native hosts, typed and range-checked, on
+top of the built-in defaults: first a JSON file (eye_focus_config.json next to
+the scripts, or the path in EYE_FOCUS_CONFIG), then values the extension sends
+with the set_config command. The file is re-read whenever it changes, and every
+change is applied to the running pipeline - no restart, the camera stays open.
+An invalid file or command is rejected as a whole; the values before it stay in
+effect. Example file:
+
+    {"away_threshold": 8, "jpeg_quality": 50, "face_min_neighbors": 6}
+
+List the settings with: python runtime_config.py
+"""
+
+import json
+import math
+import os
+import time
+from collections import deque
+
+from eye_detection import EYE_PARAMS, FACE_PARAMS
+from gaze_mapping import SCREEN_MARGIN
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eye_focus_config.json')
+
+
+class Setting:
+    def __init__(self, kind, default, low, high, description):
+        self.kind = kind  # int or float
+        self.default = default
+        self.low = low
+        self.high = high
+        self.description = description
+
+
+SETTINGS = {
+    'away_threshold': Setting(float, 5.0, 0.5, 600.0, "seconds looking away before the video is paused"),
+    'pause_debounce': Setting(float, 2.0, 0.0, 60.0, "minimum seconds between two pause commands"),
+    'frame_send_interval': Setting(float, 0.5, 0.05, 10.0, "seconds between debug view frames"),
+    'jpeg_quality': Setting(int, 70, 10, 100, "JPEG quality of debug view frames"),
+    'screen_margin': Setting(float, SCREEN_MARGIN, 0.0, 0.5,
+                             "slack past the calibrated screen edges (share of width/height) still counted as on screen"),
+    'face_scale_factor': Setting(float, FACE_PARAMS[0], 1.01, 2.0, "face cascade scale step"),
+    'face_min_neighbors': Setting(int, FACE_PARAMS[1], 1, 20, "face cascade minNeighbors"),
+    'eye_scale_factor': Setting(float, EYE_PARAMS[0], 1.01, 2.0, "eye cascade scale step"),
+    'eye_min_neighbors': Setting(int, EYE_PARAMS[1], 1, 20, "eye cascade minNeighbors"),
+}
+
+
+def config_path():
+    """Config file from EYE_FOCUS_CONFIG (empty = no file), default eye_focus_config.json"""
+    path = os.environ.get('EYE_FOCUS_CONFIG')
+    if path is None:
+        return CONFIG_FILE
+    return path or None
+
+
+def validate(values):
+    """(checked values, errors) for a {name: value} mapping - None values are kept as is"""
+    if not isinstance(values, dict):
+        return {}, [f"expected an object of settings, got {type(values).__name__}"]
+    checked, errors = {}, []
+    for name, value in values.items():
+        setting = SETTINGS.get(name)
+        if setting is None:
+            errors.append(f"unknown setting '{name}'")
+            continue
+        if value is None:
+            checked[name] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            errors.append(f"{name} must be a number, got {value!r}")
+            continue
+        if setting.kind is int:
+            if value != int(value):
+                errors.append(f"{name} must be a whole number, got {value!r}")
+                continue
+            value = int(value)
+        else:
+            value = float(value)
+        if not setting.low <= value <= setting.high:
+            errors.append(f"{name} must be between {setting.low} and {setting.high}, got {value}")
+            continue
+        checked[name] = value
+    return checked, errors
+
+
+class RuntimeConfig:
+    def __init__(self, path=CONFIG_FILE, check_interval=1.0, log=None):
+        """
+        path:           JSON config file, None = defaults and set_config only
+        check_interval: seconds between checks of the file's modification time
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.log = log
+        self.file_values = {}
+        self.overrides = {}      # From set_config, kept across file reloads
+        self.pending = deque()   # set_config values waiting for the monitor loop
+        self.mtime = None
+        self.next_check = 0.0
+        self.values = {name: setting.default for name, setting in SETTINGS.items()}
+        self.reloads = 0
+        self.poll()
+
+    def __getattr__(self, name):
+        # Settings read as attributes: config.away_threshold
+        values = self.__dict__.get('values')
+        if values is not None and name in values:
+            return values[name]
+        raise AttributeError(name)
+
+    def submit(self, values):
+        """Queue settings from the extension (None resets one to the file/default value).
+
+        Only queues them - safe from the command reader thread; poll() applies them.
+        """
+        self.pending.append(values)
+
+    def poll(self, now=None):
+        """Apply queued settings and a changed file; returns (changed names, errors)"""
+        now = time.monotonic() if now is None else now
+        errors = []
+        while self.pending:
+            checked, problems = validate(self.pending.popleft())
+            if problems:
+                errors.extend(problems)
+                continue
+            for name, value in checked.items():
+                if value is None:
+                    self.overrides.pop(name, None)
+                else:
+                    self.overrides[name] = value
+        if self.path is not None and now >= self.next_check:
+            self.next_check = now + self.check_interval
+            errors.extend(self._check_file())
+
+        values = {name: setting.default for name, setting in SETTINGS.items()}
+        values.update(self.file_values)
+        values.update(self.overrides)
+        changed = [name for name in values if values[name] != self.values[name]]
+        self.values = values
+        for error in errors:
+            self._log(f"Config rejected: {error}")
+        if changed:
+            self._log("Config: " + ", ".join(f"{name}={values[name]}" for name in changed))
+        return changed, errors
+
+    def stats(self):
+        """Effective settings for the host stats message"""
+        return {"config": dict(self.values)}
+
+    def _check_file(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return []
+        self.mtime = mtime
+        if mtime is None:
+            self.file_values = {}  # File removed - back to the defaults
+            return []
+
+        try:
+            with open(self.path, 'r') as f:
+                values = json.load(f)
+        except (OSError, ValueError) as e:
+            return [f"{os.path.basename(self.path)}: {e}"]
+        checked, errors = validate(values)
+        if errors:
+            return [f"{os.path.basename(self.path)}: {error}" for error in errors]
+        self.file_values = {name: value for name, value in checked.items() if value is not None}
+        self.reloads += 1
+        return []
+
+    def _log(self, message):
+        if self.log is not None:
+            self.log(message)
+
+
+if __name__ == '__main__':
+    config = RuntimeConfig(config_path(), log=print)
+    print(f"Config file: {config.path or '(none)'}")
+    for name, setting in SETTINGS.items():
+        source = "file" if name in config.file_values else "default"
+        print(f"  {name:20} {config.values[name]!s:>6}  ({source}; {setting.kind.__name__} "
+              f"{setting.low}-{setting.high}) {setting.description}")
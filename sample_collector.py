@@ -0,0 +1,100 @@
+"""
+Calibration Sample Collector
+Robust per-point estimate for calibration: median with MAD outlier rejection,
+stopping early once the estimate has converged and extending on noisy points
+instead of failing
+"""
+
+import numpy as np
+
+# Scale factor turning a MAD into a standard deviation for normal data
+MAD_TO_SIGMA = 1.4826
+# Standard error of the median relative to that of the mean
+MEDIAN_SE_FACTOR = 1.2533
+
+COLLECTING = "collecting"
+DONE = "done"
+FAILED = "failed"
+
+
+class SampleCollector:
+    def __init__(self, min_samples=8, min_duration=0.4, max_duration=4.0, tolerance=0.01,
+                 mad_cutoff=3.0, min_inliers=4):
+        """
+        min_samples:  inliers needed before the point can converge
+        min_duration: seconds to collect before stopping early (lets the eyes settle)
+        max_duration: hard limit for noisy points
+        tolerance:    standard error (normalized pupil units) that counts as converged
+        mad_cutoff:   samples further than this many robust sigmas from the median are outliers
+        min_inliers:  fewest inliers accepted when a point runs to max_duration
+        """
+        self.min_samples = min_samples
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.tolerance = tolerance
+        self.mad_cutoff = mad_cutoff
+        self.min_inliers = min_inliers
+        self.start(0.0)
+
+    def start(self, now):
+        self.started_at = now
+        self.samples = []
+
+    def add(self, sample):
+        self.samples.append((float(sample[0]), float(sample[1])))
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    def _inliers(self):
+        """Samples within mad_cutoff robust sigmas of the median on both axes"""
+        data = np.array(self.samples)
+        median = np.median(data, axis=0)
+        sigma = MAD_TO_SIGMA * np.median(np.abs(data - median), axis=0)
+        # Guard against a zero MAD (identical samples) rejecting everything else
+        sigma = np.maximum(sigma, 1e-6)
+        mask = np.all(np.abs(data - median) <= self.mad_cutoff * sigma, axis=1)
+        return data[mask]
+
+    def estimate(self):
+        """Robust (x, y) estimate for the point, or None without samples"""
+        if not self.samples:
+            return None
+        median = np.median(self._inliers(), axis=0)
+        return (float(median[0]), float(median[1]))
+
+    def standard_error(self):
+        """Approximate standard error of the estimate (worst axis)"""
+        if len(self.samples) < 2:
+            return float('inf')
+        inliers = self._inliers()
+        if len(inliers) < 2:
+            return float('inf')
+        sigma = MAD_TO_SIGMA * np.median(np.abs(inliers - np.median(inliers, axis=0)), axis=0)
+        return float(MEDIAN_SE_FACTOR * sigma.max() / np.sqrt(len(inliers)))
+
+    def converged(self):
+        return len(self.samples) >= self.min_samples and \
+            len(self._inliers()) >= self.min_samples and self.standard_error() <= self.tolerance
+
+    def status(self, now):
+        """COLLECTING, DONE (estimate ready) or FAILED (too few usable samples)"""
+        elapsed = now - self.started_at
+        if elapsed < self.min_duration:
+            return COLLECTING
+        if self.converged():
+            return DONE
+        if elapsed < self.max_duration:
+            return COLLECTING  # Noisy point - keep going instead of failing
+        if self.samples and len(self._inliers()) >= self.min_inliers:
+            return DONE  # Best effort at the time limit
+        return FAILED
+
+    def progress(self, now):
+        """Rough 0-1 progress for the UI"""
+        if not self.samples:
+            return min(0.99, (now - self.started_at) / self.max_duration)
+        sample_part = min(1.0, len(self.samples) / self.min_samples)
+        precision_part = min(1.0, self.tolerance / max(self.standard_error(), 1e-9))
+        return min(0.99, max(sample_part * precision_part, (now - self.started_at) / self.max_duration))
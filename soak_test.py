@@ -0,0 +1,125 @@
+"""
+Memory Soak Test
+Runs a native host for hours on recorded or scripted frames (no camera) and
+watches the RSS it reports in its stats messages. Fails if memory keeps growing
+once warm-up is over, or if the host dies:
+
+    python soak_test.py --hours 4
+    python soak_test.py --minutes 20 --host debug --source recordings/pause-20250101-120000-1.npz
+
+The default source loops face / glance away / long away / eyes closed, so pauses,
+recorder dumps (written to a temporary directory) and blink tracking are all
+exercised. The first couple of dumps
+raise RSS a step each (the allocator keeps the writer thread's arena), so keep
+the warm-up past them - about two loops of the script. Detection pool workers
+(EYE_FOCUS_WORKERS) are separate processes - their memory isn't in the host's RSS.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from latency_harness import HOSTS, HostProcess
+from memory_monitor import slope
+
+DEFAULT_SOURCE = 'script:face:20,away:2,face:10,away:8,face:10,closed:3,face:10,loop'
+
+
+def rss_samples(proc):
+    """[(receive time, RSS MB)] from the host's stats messages"""
+    return [(t, m['rss_mb']) for t, m in proc.messages
+            if m.get('action') == 'stats' and m.get('rss_mb') is not None]
+
+
+def evaluate(samples, started, warmup, max_growth, max_slope):
+    """(summary lines, failures) for RSS samples after warm-up"""
+    settled = [(t - started, rss) for t, rss in samples if t - started >= warmup]
+    if len(settled) < 4:
+        return [], [f"only {len(settled)} stats reports after warm-up - run longer"]
+
+    # Medians of the first and last tenth, so single spikes (a dump, a GC) don't decide
+    tenth = max(2, len(settled) // 10)
+    first = statistics.median(rss for _, rss in settled[:tenth])
+    last = statistics.median(rss for _, rss in settled[-tenth:])
+    growth = last - first
+    per_hour = slope(settled) * 3600
+    peak = max(rss for _, rss in settled)
+
+    summary = [f"RSS after warm-up: {first:.1f} MB -> {last:.1f} MB (peak {peak:.1f} MB)",
+               f"growth {growth:+.1f} MB, trend {per_hour:+.2f} MB/h over {len(settled)} reports"]
+    failures = []
+    if growth > max_growth:
+        failures.append(f"RSS grew {growth:.1f} MB (limit {max_growth} MB)")
+    if per_hour > max_slope and growth > max_growth / 2:
+        failures.append(f"RSS trending up {per_hour:.2f} MB/h (limit {max_slope} MB/h)")
+    return summary, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a native host for a long time and check its memory stays flat")
+    parser.add_argument('--host', choices=sorted(HOSTS), default='monitor')
+    parser.add_argument('--hours', type=float, default=0.0)
+    parser.add_argument('--minutes', type=float, default=0.0)
+    parser.add_argument('--source', default=DEFAULT_SOURCE,
+                        help="EYE_FOCUS_FRAME_SOURCE value - a looping script, a video file or a ring recorder .npz")
+    parser.add_argument('--warmup', type=float, default=120.0, help="seconds before memory is measured")
+    parser.add_argument('--max-growth', type=float, default=16.0, help="allowed RSS growth in MB")
+    parser.add_argument('--max-slope', type=float, default=4.0, help="allowed RSS trend in MB/hour")
+    parser.add_argument('--tracemalloc', type=int, default=0,
+                        help="traceback depth for the host's tracemalloc (names growing lines)")
+    args = parser.parse_args()
+
+    duration = args.hours * 3600 + args.minutes * 60 or 3600.0
+    if args.tracemalloc:
+        os.environ['EYE_FOCUS_TRACEMALLOC'] = str(args.tracemalloc)
+
+    print(f"Soaking {HOSTS[args.host]} for {duration / 60:.0f} min on {args.source}")
+    recordings = tempfile.TemporaryDirectory(prefix='soak-recordings-')
+    proc = HostProcess(None, args.host, source=args.source, keep={'stats', 'pause_video', 'camera_status'},
+                       record_dir=recordings.name)
+    started = time.time()
+    next_report = started + 60
+    died = False
+    try:
+        while time.time() < started + duration:
+            if proc.process.poll() is not None:
+                died = True
+                break
+            if time.time() >= next_report:
+                next_report += 60
+                stats = [m for _, m in proc.messages if m.get('action') == 'stats']
+                if stats:
+                    m = stats[-1]
+                    growth = f", growth {m['rss_growth_mb']:+.1f} MB" if 'rss_growth_mb' in m else ""
+                    traced = f", traced {m['traced_mb']} MB {m.get('traced_growth', '')}" if 'traced_mb' in m else ""
+                    print(f"  {(time.time() - started) / 60:5.0f} min  {m.get('fps')} fps  "
+                          f"RSS {m.get('rss_mb')} MB{growth}{traced}", flush=True)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Interrupted - checking what was collected")
+    proc.stop()
+    recordings.cleanup()
+
+    pauses = sum(1 for _, m in proc.messages if m.get('action') == 'pause_video')
+    summary, failures = evaluate(rss_samples(proc), started, args.warmup, args.max_growth, args.max_slope)
+    if died:
+        failures.insert(0, f"host exited early with code {proc.process.returncode}")
+    print(f"\n{pauses} pauses sent")
+    for line in summary:
+        print(line)
+
+    if failures:
+        print("\n--- host log ---")
+        print("\n".join(list(proc.log_lines)[-40:]))
+        print("\n❌ FAILED")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Memory stayed flat")
+
+
+if __name__ == '__main__':
+    main()
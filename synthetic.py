@@ -0,0 +1,132 @@
+"""
+Synthetic Eye Data
+Parametric eye crops and full-frame face scenes with known ground truth (face and
+eye boxes, pupil centers), so pupil localization, detection and gaze mapping can
+be measured deterministically without a camera
+"""
+
+import cv2
+import numpy as np
+
+SCENES = ('face', 'away', 'dark', 'closed')
+
+
+def add_noise(image, sigma, rng):
+    """Gaussian sensor noise, in place"""
+    if sigma <= 0:
+        return image
+    noise = rng.normal(0, sigma, image.shape)
+    np.clip(image + noise, 0, 255, out=noise)
+    image[...] = noise.astype(np.uint8)
+    return image
+
+
+def close_lids(image, center, axes, openness, skin, lash, thickness):
+    """Cover an eye (ellipse at center/axes) down to a lid aperture of `openness`, in place"""
+    if openness >= 1.0:
+        return
+    x, y = center
+    ax, ay = axes
+    aperture = (ax, int(round(ay * max(openness, 0.0))))
+    # Lid skin over everything outside the aperture, up to the eye's own outline
+    x0, y0 = max(0, x - ax - thickness), max(0, y - ay - thickness)
+    region = image[y0:y + ay + thickness + 1, x0:x + ax + thickness + 1]
+    inside = np.zeros(region.shape[:2], dtype=np.uint8)
+    cv2.ellipse(inside, (x - x0, y - y0), (ax + thickness, ay + thickness), 0, 0, 360, 255, -1)
+    if aperture[1] > 0:
+        cv2.ellipse(inside, (x - x0, y - y0), aperture, 0, 0, 360, 0, -1)
+    region[inside > 0] = skin
+    # Lash line along the upper lid
+    cv2.ellipse(image, center, (ax, max(aperture[1], 1)), 0, 180, 360, lash, thickness)
+
+
+def eye_crop(width=60, height=40, pupil=(0.5, 0.5), pupil_radius=0.1, contrast=1.0,
+             noise=0.0, glints=0, blur=True, openness=1.0, seed=0):
+    """Grayscale eye crop like the ones cut from eye cascade boxes.
+
+    pupil:        pupil center as a fraction of the crop (x, y)
+    pupil_radius: fraction of the crop width
+    contrast:     1.0 = pupil near black; lower values lift it towards the iris
+                  (below ~0.75 the pupil is brighter than detect_pupil's threshold)
+    noise:        sensor noise sigma in gray levels
+    glints:       number of corneal reflections (small bright spots) on the pupil
+    openness:     lid aperture, 1.0 = wide open, 0.0 = closed (skin and a lash line)
+
+    Returns (crop, (x, y)) - the true pupil center in crop pixels.
+    """
+    rng = np.random.default_rng(seed)
+    crop = np.full((height, width), 150, dtype=np.uint8)  # Skin
+    cx, cy = pupil[0] * width, pupil[1] * height
+    center = (int(round(cx)), int(round(cy)))
+    radius = max(1, int(round(pupil_radius * width)))
+
+    cv2.ellipse(crop, (width // 2, height // 2), (int(width * 0.42), int(height * 0.3)),
+                0, 0, 360, 215, -1)                                    # Sclera
+    cv2.circle(crop, center, int(radius * 2.2), 95, -1)                # Iris
+    cv2.circle(crop, center, radius, int(round(95 - 85 * contrast)), -1)  # Pupil
+    for i in range(glints):
+        angle = 2 * np.pi * i / max(glints, 1) + 0.6
+        gx = int(round(cx + 0.45 * radius * np.cos(angle)))
+        gy = int(round(cy - 0.45 * radius * np.sin(angle)))
+        cv2.circle(crop, (gx, gy), max(1, radius // 4), 250, -1)
+    close_lids(crop, (width // 2, height // 2), (int(width * 0.42), int(height * 0.3)), openness, 150, 50, 2)
+
+    if blur:
+        cv2.GaussianBlur(crop, (3, 3), 0, dst=crop)
+    add_noise(crop, noise, rng)
+    return crop, (cx, cy)
+
+
+def draw_face(canvas, scale=1.0, center=None, gaze=(0.0, 0.0), openness=1.0):
+    """Draw a plain frontal face the Haar face and eye cascades both pick up.
+
+    gaze:     (-1..1, -1..1) moves irises and pupils towards the eye corners / lids
+    openness: lid aperture of both eyes, 1.0 = wide open, 0.0 = closed
+
+    Returns the ground truth in canvas pixels: {"face": (x, y, w, h),
+    "eyes": [(x, y, w, h)], "pupils": [(x, y)]} - left eye (in the image) first.
+    """
+    h, w = canvas.shape[:2]
+    cx, cy = center if center is not None else (w // 2, h // 2)
+
+    def s(v):
+        return int(v * scale)
+
+    truth = {"face": (cx - s(90), cy - s(120), 2 * s(90), 2 * s(120)), "eyes": [], "pupils": []}
+    cv2.ellipse(canvas, (cx, cy), (s(90), s(120)), 0, 0, 360, (150, 170, 200), -1)
+    for side in (-1, 1):
+        ex, ey = cx + side * s(38), cy - s(25)
+        px, py = ex + int(round(gaze[0] * 10 * scale)), ey + int(round(gaze[1] * 3 * scale))
+        cv2.ellipse(canvas, (ex, ey), (s(22), s(11)), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(canvas, (px, py), s(9), (40, 30, 30), -1)
+        cv2.circle(canvas, (px, py), s(4), (5, 5, 5), -1)
+        close_lids(canvas, (ex, ey), (s(22), s(11)), openness, (150, 170, 200), (45, 45, 60), max(1, s(3)))
+        cv2.ellipse(canvas, (ex, ey - s(22)), (s(26), s(7)), 0, 180, 360, (45, 45, 60), s(5))
+        truth["eyes"].append((ex - s(22), ey - s(11), 2 * s(22), 2 * s(11)))
+        truth["pupils"].append((px, py))
+    cv2.ellipse(canvas, (cx, cy + s(25)), (s(10), s(25)), 0, 0, 360, (180, 195, 225), -1)
+    cv2.ellipse(canvas, (cx, cy + s(65)), (s(32), s(9)), 0, 0, 360, (60, 60, 110), -1)
+    # Soften the edges like a real (slightly out of focus) webcam image
+    cv2.GaussianBlur(canvas, (15, 15), 0, dst=canvas)
+    return truth
+
+
+def face_scene(width=640, height=480, scale=None, center=None, gaze=(0.0, 0.0),
+               background=90, noise=0.0, openness=1.0, seed=0):
+    """BGR frame of one face on a plain background; returns (frame, truth) as draw_face"""
+    frame = np.full((height, width, 3), background, dtype=np.uint8)
+    truth = draw_face(frame, height / 480 if scale is None else scale, center, gaze, openness)
+    add_noise(frame, noise, np.random.default_rng(seed))
+    return frame, truth
+
+
+def render_scene(scene, width, height):
+    """One BGR frame of a named scene: 'face', 'away' (empty room), 'dark' (covered
+    lens) or 'closed' (face with the eyes shut)"""
+    if scene == 'dark':
+        return np.zeros((height, width, 3), dtype=np.uint8)
+    if scene == 'face':
+        return face_scene(width, height)[0]
+    if scene == 'closed':
+        return face_scene(width, height, openness=0.0)[0]
+    return np.full((height, width, 3), 90, dtype=np.uint8)
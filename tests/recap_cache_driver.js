@@ -0,0 +1,100 @@
+// Runs extension/content/recap-cache.js under Node against recap_stub_server.py,
+// with an in-memory chrome.storage.local whose calls complete in a shuffled order.
+// Usage: node recap_cache_driver.js <api base url> <scenario>; prints a JSON result
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const [base, scenario] = process.argv.slice(2);
+
+// Seeded delays, so interleavings are reproducible
+let seed = 42;
+function delay() {
+  seed = (seed * 1103515245 + 12345) % 2147483648;
+  return new Promise(resolve => setTimeout(resolve, seed % 7));
+}
+
+const storage = new Map();
+const clone = value => JSON.parse(JSON.stringify(value));
+globalThis.chrome = {
+  storage: {
+    local: {
+      async get(keys) {
+        await delay();
+        const result = {};
+        for (const key of [].concat(keys)) {
+          if (storage.has(key)) result[key] = clone(storage.get(key));
+        }
+        return result;
+      },
+      async set(items) {
+        await delay();
+        for (const [key, value] of Object.entries(items)) storage.set(key, clone(value));
+      },
+      async remove(keys) {
+        await delay();
+        for (const key of [].concat(keys)) storage.delete(key);
+      }
+    }
+  }
+};
+
+if (scenario === 'tabs') {
+  // Web Locks stand-in: requests for one name run one after another
+  const chains = new Map();
+  globalThis.navigator = {
+    locks: {
+      request(name, callback) {
+        const run = (chains.get(name) || Promise.resolve()).then(() => callback());
+        chains.set(name, run.catch(() => {}));
+        return run;
+      }
+    }
+  };
+}
+
+const source = fs.readFileSync(path.join(__dirname, '..', 'extension', 'content', 'recap-cache.js'), 'utf8');
+vm.runInThisContext(source + '\nglobalThis.RecapCache = RecapCache;');
+console.log = () => {}; // Cache hit/miss chatter - stdout carries the result
+
+async function completion(prompt) {
+  const response = await fetch(`${base}/chat/completions`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ model: 'stub', messages: [{ role: 'user', content: prompt }] })
+  });
+  const data = await response.json();
+  return data.choices[0].message.content;
+}
+
+function recap(cache, video, start) {
+  return cache.get({ video, type: 'recap', start, end: start + 30 },
+                   () => completion(`Summarize ${video} from ${start}s`));
+}
+
+async function main() {
+  const maxEntries = 5;
+  const caches = scenario === 'tabs' ? [new RecapCache(maxEntries), new RecapCache(maxEntries)]
+                                     : [new RecapCache(maxEntries)];
+
+  // Many recaps finishing close together, from every tab
+  const first = await Promise.all(
+    Array.from({ length: 12 }, (_, i) => recap(caches[i % caches.length], 'vid', i * 30)));
+
+  // A stored recap is served from the cache; identical requests in flight share one fetch
+  const stored = await recap(caches[0], 'vid', 999);
+  const again = await recap(caches[caches.length - 1], 'vid', 999);
+  const shared = await Promise.all([recap(caches[0], 'other', 0), recap(caches[0], 'other', 0)]);
+
+  const index = storage.get('recapCacheIndex') || {};
+  const entries = [...storage.keys()].filter(key => key.startsWith('recap:'));
+  process.stdout.write(JSON.stringify({
+    first, stored, again, shared, entries: entries.sort(), indexed: Object.keys(index).sort(),
+    hits: caches.reduce((n, c) => n + c.hits, 0)
+  }));
+}
+
+main().catch(error => {
+  process.stderr.write(String(error.stack || error));
+  process.exit(1);
+});
@@ -0,0 +1,85 @@
+"""
+CameraSupervisor against fake captures: background reconnects, including a
+device that fails again right after it was reattached
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import camera_supervisor
+from camera_supervisor import STATE_DEGRADED, STATE_OK, CameraSupervisor
+
+
+class FakeCapture:
+    def __init__(self, reads=1000):
+        self.reads = reads  # Successful reads before the device "unplugs"
+        self.released = False
+
+    def read(self, image=None):
+        if self.reads <= 0:
+            return False, None
+        self.reads -= 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture(autouse=True)
+def no_device_nodes(monkeypatch):
+    # No /dev/video* enumeration - otherwise an empty container waits for hot-plug
+    monkeypatch.setattr(camera_supervisor, 'list_video_devices', lambda: None)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reconnects_after_read_failure():
+    caps = [FakeCapture(reads=0), FakeCapture()]
+    supervisor = CameraSupervisor(lambda: caps.pop(0), lambda message: None, initial_backoff=0.01)
+    assert supervisor.open(attempts=1)
+
+    assert supervisor.read() == (False, None)
+    assert supervisor.state == STATE_DEGRADED
+    assert wait_for(lambda: supervisor.state == STATE_OK)
+    assert supervisor.read()[0]
+    assert supervisor.reconnects == 1
+    assert caps == []
+    supervisor.release()
+
+
+def test_failure_right_after_reattach_starts_a_new_reconnect():
+    caps = [FakeCapture(reads=0), FakeCapture(reads=0), FakeCapture()]
+    supervisor = None
+
+    def log(message):
+        # The reconnect thread is still running here, between attaching the
+        # camera and returning - exactly when a frame read can fail again
+        if message == "✓ Camera reconnected" and supervisor.reconnects == 1:
+            supervisor.read()
+
+    supervisor = CameraSupervisor(lambda: caps.pop(0), log, initial_backoff=0.01)
+    assert supervisor.open(attempts=1)
+    supervisor.read()
+
+    assert wait_for(lambda: supervisor.reconnects == 2 and supervisor.state == STATE_OK)
+    assert supervisor.read()[0]
+    supervisor.release()
+
+
+def test_retries_with_backoff_until_the_device_opens():
+    results = [None, None, FakeCapture()]
+    supervisor = CameraSupervisor(lambda: results.pop(0), lambda message: None,
+                                  initial_backoff=0.01, hotplug_poll=0.01)
+    supervisor._begin_reconnect()
+    assert wait_for(lambda: supervisor.state == STATE_OK)
+    assert supervisor.reconnects == 1
+    supervisor.release()
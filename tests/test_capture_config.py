@@ -0,0 +1,76 @@
+"""
+Capture format negotiation against fake captures: the profile cached by the
+first start must work on the next one
+"""
+
+import cv2
+import numpy as np
+
+from capture_config import CaptureConfig, negotiate
+
+
+class FakeCapture:
+    """VideoCapture stand-in; supported lists the FOURCCs it accepts (none = ignores requests)"""
+
+    def __init__(self, supported=(), fourcc=0):
+        self.supported = supported
+        self.props = {cv2.CAP_PROP_FOURCC: fourcc, cv2.CAP_PROP_FPS: 30.0,
+                      cv2.CAP_PROP_FRAME_WIDTH: 640, cv2.CAP_PROP_FRAME_HEIGHT: 480,
+                      cv2.CAP_PROP_BUFFERSIZE: 1}
+        self.fourcc_sets = []
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FOURCC:
+            self.fourcc_sets.append(value)
+            codes = [cv2.VideoWriter_fourcc(*code) for code in self.supported]
+            if value not in codes:
+                return False
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            return False
+        self.props[prop] = value
+        return True
+
+    def get(self, prop):
+        return self.props.get(prop, 0)
+
+    def read(self, image=None):
+        return True, np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_device_ignoring_fourcc_negotiates_twice(tmp_path):
+    path = str(tmp_path / 'profiles.json')
+    config = CaptureConfig()
+    logs = []
+
+    first = negotiate(FakeCapture(), config, '0:fake', logs.append, profiles_path=path)
+    assert first["fourcc"] is None  # Nothing readable to remember
+
+    # Second start takes the cached path - it used to crash on a stored "default"
+    cap = FakeCapture()
+    second = negotiate(cap, config, '0:fake', logs.append, profiles_path=path)
+    assert second["fourcc"] is None
+    assert cap.fourcc_sets == []
+    assert "(cached)" in logs[-1]
+
+
+def test_odd_fourcc_readback_is_not_cached(tmp_path):
+    path = str(tmp_path / 'profiles.json')
+    # Reads back as a 2-character code once the NUL bytes are stripped
+    cap = FakeCapture(fourcc=ord('H') | ord('2') << 8)
+    profile = negotiate(cap, CaptureConfig(), '0:fake', lambda message: None, profiles_path=path)
+    assert profile["fourcc"] is None
+    negotiate(FakeCapture(), CaptureConfig(), '0:fake', lambda message: None, profiles_path=path)
+
+
+def test_supported_fourcc_is_cached_and_reapplied(tmp_path):
+    path = str(tmp_path / 'profiles.json')
+    config = CaptureConfig()
+
+    first = negotiate(FakeCapture(supported=['MJPG']), config, '0:fake', lambda message: None,
+                      profiles_path=path)
+    assert first["fourcc"] == 'MJPG'
+
+    cap = FakeCapture(supported=['MJPG'])
+    second = negotiate(cap, config, '0:fake', lambda message: None, profiles_path=path)
+    assert second["fourcc"] == 'MJPG'
+    assert cap.fourcc_sets == [cv2.VideoWriter_fourcc(*'MJPG')]
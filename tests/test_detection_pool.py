@@ -0,0 +1,102 @@
+"""
+Detection pool ordering and recovery, with a stub detection function whose
+behavior is picked by the first pixel of each frame
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from detection_pool import DetectionPool
+
+SLOW, FAIL, HANG, CRASH = 1, 2, 3, 4
+SHAPE = (24, 32)
+
+
+def stub_detect(gray, face_cascade, eye_cascade, **kwargs):
+    """Sleeps, raises, hangs or kills its worker; otherwise returns the frame id as a face"""
+    behavior = int(gray[0, 0])
+    if behavior == SLOW:
+        time.sleep(0.5)
+    elif behavior == FAIL:
+        raise RuntimeError("stub detection failed")
+    elif behavior == HANG:
+        time.sleep(60)
+    elif behavior == CRASH:
+        os._exit(1)
+    return [((int(gray[0, 1]), 0, 1, 1), [], [])]
+
+
+def frame(ident, behavior=0):
+    gray = np.zeros(SHAPE, dtype=np.uint8)
+    gray[0, 0] = behavior
+    gray[0, 1] = ident
+    return gray
+
+
+def collect(pool, count, timeout=20):
+    """[(timestamp, tag, frame id or None)] until count results arrive"""
+    results = []
+    deadline = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < deadline:
+        for timestamp, tag, detections in pool.collect(timeout=0.05):
+            results.append((timestamp, tag, None if detections is None else detections[0][0][0]))
+    return results
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(workers=2, **kwargs):
+        pool = DetectionPool(workers, SHAPE, detect=stub_detect, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_results_come_back_in_capture_order(make_pool):
+    pool = make_pool()
+    # The slow first frame finishes after the ones behind it
+    assert pool.submit(frame(0, SLOW), 0.0, tag='a')
+    for i in range(1, 3):
+        assert pool.submit(frame(i), float(i), tag='b')
+    assert collect(pool, 3) == [(0.0, 'a', 0), (1.0, 'b', 1), (2.0, 'b', 2)]
+    assert pool.lost == 0
+
+
+def test_failed_frame_keeps_its_place(make_pool):
+    pool = make_pool()
+    pool.submit(frame(0), 0.0)
+    pool.submit(frame(1, FAIL), 1.0)
+    pool.submit(frame(2), 2.0)
+    assert collect(pool, 3) == [(0.0, None, 0), (1.0, None, None), (2.0, None, 2)]
+
+
+def test_stuck_frame_is_skipped_after_timeout(make_pool):
+    pool = make_pool(task_timeout=1.0)
+    pool.submit(frame(0, HANG), 0.0)
+    pool.submit(frame(1), 1.0)
+    started = time.monotonic()
+    assert collect(pool, 1) == [(1.0, None, 1)]
+    assert time.monotonic() - started >= 0.5  # Held back until the hung frame timed out
+    assert pool.lost == 1
+    assert len(pool.free_slots) == pool.slots  # The skipped frame's slot came back
+
+
+def test_dead_worker_is_restarted_and_its_frame_skipped(make_pool):
+    # Long timeout: the lost frame must be skipped because its worker died, not timed out
+    pool = make_pool(workers=1, task_timeout=60)
+    pool.submit(frame(0, CRASH), 0.0)
+    pool.submit(frame(1), 1.0)
+    assert collect(pool, 1) == [(1.0, None, 1)]
+    assert pool.restarts == 1 and pool.lost == 1
+
+    # The restarted worker keeps detecting
+    pool.submit(frame(2), 2.0)
+    assert collect(pool, 1) == [(2.0, None, 2)]
@@ -0,0 +1,91 @@
+"""
+RLS drift correction: convergence to a shifted mapping, bad-target rejection
+and bounded covariance
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from drift_correction import RLSMapping
+
+# Pupil (normalized) -> screen pixels, as from a full calibration
+CALIBRATED = np.array([[4000.0, 0.0, -1000.0],
+                       [0.0, 3000.0, -800.0]])
+# The user has shifted in the chair since: gain and offset drifted
+DRIFTED = np.array([[4080.0, 0.0, -1060.0],
+                    [0.0, 2940.0, -770.0]])
+
+GRID = [(x, y) for y in (0.42, 0.5, 0.58) for x in (0.38, 0.5, 0.62)]
+
+
+def screen(mapping, pupil):
+    return mapping @ np.array([pupil[0], pupil[1], 1.0])
+
+
+def error_px(mapping, truth):
+    return max(np.hypot(*(screen(mapping, p) - screen(truth, p))) for p in GRID)
+
+
+def test_starts_from_the_calibration():
+    rls = RLSMapping(CALIBRATED)
+    assert np.array_equal(rls.matrix, CALIBRATED)
+    assert rls.matrix.shape == (2, 3)
+
+
+def follow(rls, updates):
+    """Error after each update on exact targets from the drifted mapping"""
+    errors = []
+    for pupil in itertools.islice(itertools.cycle(GRID), updates):
+        assert rls.update(pupil, screen(DRIFTED, pupil))
+        errors.append(error_px(rls.matrix, DRIFTED))
+    return errors
+
+
+def test_converges_to_drifted_mapping():
+    rls = RLSMapping(CALIBRATED)
+    start = error_px(rls.matrix, DRIFTED)
+    errors = follow(rls, 900)  # 100 rounds of the grid
+    assert start > 25
+    assert errors[89] < start / 2
+    assert errors[-1] < 0.5
+    assert rls.updates == 900 and rls.rejected == 0
+
+
+def test_initial_uncertainty_sets_how_fast_targets_are_followed():
+    trusting = follow(RLSMapping(CALIBRATED, initial_uncertainty=0.5), 27)
+    following = follow(RLSMapping(CALIBRATED, initial_uncertainty=50), 27)
+    assert following[-1] < 2.0 < trusting[-1]
+
+
+def test_noisy_targets_still_converge():
+    rng = np.random.default_rng(0)
+    rls = RLSMapping(CALIBRATED)
+    for pupil in itertools.islice(itertools.cycle(GRID), 900):
+        rls.update(pupil, screen(DRIFTED, pupil) + rng.normal(0, 15, 2))
+    assert error_px(rls.matrix, DRIFTED) < 20
+
+
+def test_far_target_is_rejected_without_moving_the_mapping():
+    rls = RLSMapping(CALIBRATED, max_residual=150)
+    pupil = (0.5, 0.5)
+    assert not rls.update(pupil, screen(CALIBRATED, pupil) + (400, 0))  # Clicked without looking
+    assert np.array_equal(rls.matrix, CALIBRATED)
+    assert rls.rejected == 1 and rls.updates == 0
+
+    assert rls.update(pupil, screen(CALIBRATED, pupil) + (100, 0))
+    assert rls.updates == 1
+
+
+@pytest.mark.parametrize('forgetting', [0.95, 0.995])
+def test_covariance_stays_bounded_on_repeated_point(forgetting):
+    # One target over and over excites a single direction - forgetting alone would
+    # inflate the covariance in the others without limit
+    rls = RLSMapping(CALIBRATED, forgetting=forgetting, max_uncertainty=10.0)
+    pupil = (0.5, 0.5)
+    for _ in range(5000):
+        rls.update(pupil, screen(CALIBRATED, pupil))
+    assert np.trace(rls.P) <= 10.0 / forgetting
+    assert np.allclose(rls.P, rls.P.T)
+    assert np.all(np.linalg.eigvalsh(rls.P) > -1e-9)
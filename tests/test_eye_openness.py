@@ -0,0 +1,140 @@
+"""
+BlinkTracker on synthetic openness sequences: blink counting, long closures,
+PERCLOS with its drowsy hysteresis, and eviction from the sliding window
+"""
+
+import pytest
+
+from eye_openness import BlinkTracker, eye_openness
+from synthetic import eye_crop
+
+OPEN, CLOSED = 1.0, 0.15
+FPS = 10
+
+
+def make_tracker(**kwargs):
+    tracker = BlinkTracker(**kwargs)
+    # Feed openness values directly: observe(gray) measures whatever it is handed
+    tracker._measure = lambda values: values
+    return tracker
+
+
+def feed(tracker, t, seconds, closed=lambda frame: False):
+    """Observe `seconds` of frames at FPS from time t; returns (end time, drowsy changes)"""
+    changes = []
+    for frame in range(int(round(seconds * FPS))):
+        value = CLOSED if closed(frame) else OPEN
+        if tracker.observe([value, value], t):
+            changes.append((t, tracker.drowsy))
+        t += 1.0 / FPS
+    return t, changes
+
+
+def cycle(length, closed_frames):
+    """Every `length` frames, the first `closed_frames` are closed"""
+    return lambda frame: frame % length < closed_frames
+
+
+def test_openness_of_synthetic_crops():
+    wide = eye_openness(eye_crop()[0])
+    shut = eye_openness(eye_crop(openness=0.0)[0])
+    assert wide > 0.8
+    assert shut < 0.5 * wide
+
+
+def test_short_closures_count_as_blinks():
+    tracker = make_tracker()
+    t, _ = feed(tracker, 0.0, 2)
+    # Three 0.3 s closures, 2 s apart
+    t, changes = feed(tracker, t, 6, cycle(20, 3))
+    assert tracker.blinks == 3
+    assert not tracker.drowsy and changes == []
+    assert tracker.blink_rate > 0
+
+
+def test_closure_longer_than_blink_max_is_not_a_blink():
+    tracker = make_tracker()
+    t, _ = feed(tracker, 0.0, 2)
+    t, _ = feed(tracker, t, 0.8, lambda frame: True)
+    t, _ = feed(tracker, t, 1)
+    assert tracker.blinks == 0
+
+
+def test_long_closure_is_drowsy_straight_away():
+    tracker = make_tracker(long_closure=1.0)
+    t, _ = feed(tracker, 0.0, 2)
+    t, changes = feed(tracker, t, 1.5, lambda frame: True)
+    assert tracker.closed
+    assert tracker.drowsy
+    # Drowsy as soon as the closure reached long_closure, not at the end of the window
+    assert len(changes) == 1
+    assert changes[0][0] - 2.0 == pytest.approx(1.0, abs=1.5 / FPS)
+
+    # Opening the eyes clears it - PERCLOS has too little history to keep it
+    t, changes = feed(tracker, t, 1)
+    assert not tracker.closed and not tracker.drowsy
+
+
+def test_perclos_drowsy_needs_half_a_window():
+    tracker = make_tracker(window=20.0, drowsy_perclos=0.15)
+    # 20% of the time closed, in blinks
+    t, changes = feed(tracker, 0.0, 4, cycle(10, 2))
+    assert not tracker.drowsy
+    t, changes = feed(tracker, t, 10, cycle(10, 2))
+    assert tracker.drowsy
+    assert tracker.perclos == pytest.approx(0.2, abs=0.02)
+    # First frame at or past half the window (observed time starts after frame 0)
+    assert changes[0][0] == pytest.approx(10.0, abs=2.0 / FPS)
+
+
+def test_drowsy_hysteresis():
+    # ~14% closed: under the 15% limit, above the 12% needed to stay drowsy
+    hovering = cycle(50, 7)
+
+    fresh = make_tracker(window=20.0, drowsy_perclos=0.15)
+    feed(fresh, 0.0, 40, hovering)
+    assert not fresh.drowsy
+
+    tracker = make_tracker(window=20.0, drowsy_perclos=0.15)
+    t, _ = feed(tracker, 0.0, 20, cycle(10, 2))
+    assert tracker.drowsy
+    t, changes = feed(tracker, t, 40, hovering)
+    assert tracker.drowsy and changes == []
+    assert 0.12 < tracker.perclos < 0.15
+
+    t, changes = feed(tracker, t, 40)
+    assert not tracker.drowsy
+    assert changes[-1][1] is False
+
+
+def test_window_evicts_old_samples():
+    tracker = make_tracker(window=10.0)
+    t, _ = feed(tracker, 0.0, 1)
+    t, _ = feed(tracker, t, 10, cycle(10, 3))
+    assert tracker.perclos > 0.25
+    assert tracker.blinks == 10
+
+    t, _ = feed(tracker, t, 10.5)
+    # Everything closed is now older than the window
+    assert tracker.perclos == pytest.approx(0.0, abs=1e-9)
+    assert tracker.blink_rate == 0.0
+    assert tracker.observed_time <= 10.0 + 1e-9
+    assert all(sample_t >= t - 10.0 - 1.0 / FPS for sample_t, _, _ in tracker.samples)
+    assert tracker.blinks == 10  # The total count is kept
+
+
+def test_samples_capped_at_max_samples():
+    tracker = make_tracker(window=60.0, max_samples=50)
+    feed(tracker, 0.0, 20, cycle(10, 2))
+    assert len(tracker.samples) == 50
+    assert len(tracker.blink_times) <= 50
+
+
+def test_lost_eyes_end_a_closure():
+    tracker = make_tracker()
+    t, _ = feed(tracker, 0.0, 2)
+    feed(tracker, t, 0.5, lambda frame: True)
+    assert tracker.closed
+    tracker.observe([], t + 0.6)  # Face out of view
+    assert not tracker.closed
+    assert tracker.closure(t + 2.0) == 0.0
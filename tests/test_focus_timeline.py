@@ -0,0 +1,158 @@
+"""
+Focus timeline transitions, context tagging and range queries on a database in
+tmp_path
+"""
+
+import threading
+import time
+
+import pytest
+
+from focus_timeline import DAY, HOUR, FocusTimeline, day_start
+
+# Queries stop at the current time - keep the test history in the past
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture
+def timeline(tmp_path):
+    timeline = FocusTimeline(str(tmp_path / 'timeline.db'))
+    yield timeline
+    timeline.close()
+
+
+def rows(timeline):
+    return timeline.db.execute("SELECT ts, focused, source, context FROM transitions ORDER BY rowid").fetchall()
+
+
+def test_only_changes_are_recorded(timeline):
+    assert timeline.record(True, T0)
+    assert not timeline.record(True, T0 + 1)
+    assert timeline.record(False, T0 + 2)
+    assert timeline.record(None, T0 + 3)
+    assert rows(timeline) == [(T0, 1, 'monitor', None), (T0 + 2, 0, 'monitor', None), (T0 + 3, None, 'monitor', None)]
+
+
+def test_context_tags_transitions(timeline):
+    timeline.set_context('video-a', T0 - 5)  # Before any state - held for the first record
+    timeline.record(True, T0)
+    timeline.record(False, T0 + 30)
+    timeline.set_context('video-b', T0 + 40)  # Same state, new context: a transition of its own
+    timeline.set_context('video-b', T0 + 41)
+    timeline.record(True, T0 + 50)
+    timeline.set_context(None, T0 + 100)
+    timeline.stop(T0 + 120)
+
+    assert [(ts, focused, context) for ts, focused, source, context in rows(timeline)] == [
+        (T0, 1, 'video-a'),
+        (T0 + 30, 0, 'video-a'),
+        (T0 + 40, 0, 'video-b'),
+        (T0 + 50, 1, 'video-b'),
+        (T0 + 100, 1, None),
+        (T0 + 120, None, None),
+    ]
+    assert timeline.by_context(T0 - 60, T0 + 600) == {
+        'video-a': (30.0, 10.0),
+        'video-b': (50.0, 10.0),
+        None: (20.0, 0.0),
+    }
+
+
+def test_intervals_start_from_the_state_before_the_range(timeline):
+    timeline.record(True, T0)
+    timeline.record(False, T0 + 100)
+    timeline.stop(T0 + 200)
+    assert list(timeline.intervals(T0 + 50, T0 + 300)) == [
+        (T0 + 50, T0 + 100, True, None),
+        (T0 + 100, T0 + 200, False, None),
+        (T0 + 200, T0 + 300, None, None),
+    ]
+
+
+def test_aggregate_splits_spans_over_buckets(timeline):
+    timeline.record(True, T0 + 30)
+    timeline.record(False, T0 + 90)
+    timeline.record(True, T0 + 150)
+    timeline.stop(T0 + 200)
+
+    assert timeline.aggregate(T0, T0 + 240, bucket=60) == [
+        (T0, 30.0, 0.0),
+        (T0 + 60, 30.0, 30.0),
+        (T0 + 120, 30.0, 30.0),
+        (T0 + 180, 20.0, 0.0),
+    ]
+    assert timeline.focus_ratio(T0, T0 + 240, bucket=120) == [(T0, pytest.approx(60 / 90)),
+                                                               (T0 + 120, pytest.approx(50 / 80))]
+    # Nothing tracked: no ratio rather than 0
+    assert timeline.focus_ratio(T0 - 600, T0) == [(T0 - 600, None)]
+
+
+def test_sources_share_a_file(tmp_path, timeline):
+    tracker = FocusTimeline(timeline.path, source='tracker')
+    try:
+        timeline.record(True, T0)
+        tracker.record(False, T0)
+        timeline.stop(T0 + 60)
+        tracker.stop(T0 + 60)
+        assert timeline.aggregate(T0, T0 + 60) == [(T0, 60.0, 0.0)]
+        assert timeline.aggregate(T0, T0 + 60, source='tracker') == [(T0, 0.0, 60.0)]
+    finally:
+        tracker.close()
+
+
+def test_per_day_uses_local_days(timeline):
+    yesterday = day_start(day_start(time.time()) - DAY + HOUR)
+    timeline.record(True, yesterday + HOUR)
+    timeline.record(False, yesterday + 2 * HOUR)
+    timeline.stop(yesterday + 3 * HOUR)
+    assert timeline.per_day(days=2) == [(yesterday, 0.5), (day_start(time.time()), None)]
+
+
+class CheckedInserts:
+    """Connection wrapper that checks every insert starts from the previous row's state,
+    and yields to other threads mid-insert so an unlocked interleaving shows up"""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self.db = timeline.db
+        self.previous = None
+        self.inserts = 0
+        self.stale = 0
+
+    def execute(self, sql, *args):
+        if sql.startswith("INSERT"):
+            ts, focused, source, context = args[0]
+            if self.previous is not None:
+                state = self.timeline.state
+                if (None if state is None else int(state), self.timeline.context) != self.previous:
+                    self.stale += 1
+            self.previous = (focused, context)
+            self.inserts += 1
+            time.sleep(0.0002)
+        return self.db.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def test_record_and_set_context_from_two_threads(timeline):
+    # The hosts record from the monitor loop and switch context from the command reader
+    checked = timeline.db = CheckedInserts(timeline)
+
+    def toggle_focus():
+        for i in range(300):
+            timeline.record(i % 2 == 0, T0 + i)
+
+    def switch_context():
+        for i in range(300):
+            timeline.set_context(f"video-{i % 3}", T0 + i)
+
+    threads = [threading.Thread(target=toggle_focus), threading.Thread(target=switch_context)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert checked.inserts > 300
+    assert checked.stale == 0
+    assert checked.previous == (int(timeline.state), timeline.context)
@@ -0,0 +1,72 @@
+"""
+Motion gate on synthetic frames: a static face reuses the last detection, motion
+or the forced interval runs the cascades again
+"""
+
+import cv2
+import pytest
+
+from eye_detection import detect_faces_and_eyes, load_cascades
+from motion_gate import MotionGate
+from synthetic import face_scene, render_scene
+
+
+def gray_face(seed=0, **kwargs):
+    # Sensor noise differs frame to frame even when nothing moves
+    frame, truth = face_scene(noise=3.0, seed=seed, **kwargs)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+@pytest.fixture(scope='module')
+def detections():
+    detections = detect_faces_and_eyes(gray_face(), *load_cascades())
+    assert len(detections) == 1
+    return detections
+
+
+@pytest.fixture
+def gate(detections):
+    gate = MotionGate(max_reuse_age=1.0)
+    assert gate.reuse(gray_face(), 0.0) is None  # Nothing to reuse yet
+    gate.store(gray_face(), detections, 0.0)
+    return gate
+
+
+def test_static_frame_reuses_detections(gate, detections):
+    for i in range(1, 6):
+        assert gate.reuse(gray_face(seed=i), i * 0.1) is detections
+    assert gate.hits == 5 and gate.misses == 1
+
+
+@pytest.mark.parametrize('moved', [
+    {'center': (350, 240)},       # Head shifted sideways
+    {'center': (320, 270)},       # Leaning back
+    {'scale': 0.85},              # Moving away from the screen
+])
+def test_motion_runs_detection(gate, moved):
+    assert gate.reuse(gray_face(seed=1, **moved), 0.1) is None
+
+
+def test_face_leaving_runs_detection(gate):
+    away = cv2.cvtColor(render_scene('away', 640, 480), cv2.COLOR_BGR2GRAY)
+    assert gate.reuse(away, 0.1) is None
+
+
+def test_forced_detection_after_max_reuse_age(gate, detections):
+    assert gate.reuse(gray_face(seed=1), 0.9) is detections
+    assert gate.reuse(gray_face(seed=2), 1.1) is None
+
+    gate.store(gray_face(seed=2), detections, 1.1)
+    assert gate.reuse(gray_face(seed=3), 1.2) is detections
+
+
+def test_no_face_is_never_reused(gate):
+    away = cv2.cvtColor(render_scene('away', 640, 480), cv2.COLOR_BGR2GRAY)
+    gate.store(away, [], 0.1)
+    assert gate.reuse(away, 0.2) is None
+
+
+def test_invalidate_runs_detection_on_next_frame(gate, detections):
+    gate.invalidate()
+    assert gate.reuse(gray_face(seed=1), 0.1) is None
+    assert gate.hit_rate == 0.0
@@ -0,0 +1,203 @@
+"""
+Native messaging framing: round trips, the 1 MB limit, chunking of oversized
+messages, truncated streams, invalid bodies and a seeded fuzz run
+"""
+
+import io
+import json
+import random
+import struct
+
+import pytest
+
+from native_codec import (HEADER, MAX_MESSAGE, MessageWriter, chunk_messages, decode, dumps, encode,
+                          read_message)
+
+SAMPLE_MESSAGES = [
+    {"action": "pause_video", "reason": "eyes_away"},
+    {"action": "away_start", "t": 12345.678},
+    {"action": "camera_status", "state": "degraded", "reconnect_attempts": 3},
+    {"action": "stats", "fps": 29.7, "motion_gate_hit_rate": 0.82, "note": "Señor 👁️ 注意"},
+]
+
+
+def random_text(rng, length):
+    # Mix of ASCII, Latin-1, CJK, emoji and characters JSON has to escape
+    pools = ['abc xyz', '"\\/\b\f\n\r\t', 'éñüß', '中文字', '👁️🎬⏸️', '\x00\x01\x1f']
+    return ''.join(rng.choice(rng.choice(pools)) for _ in range(length))
+
+
+def random_message(rng, depth=0):
+    message = {}
+    for _ in range(rng.randint(1, 5)):
+        kind = rng.random()
+        if kind < 0.4:
+            value = random_text(rng, rng.randint(0, 40))
+        elif kind < 0.6:
+            value = rng.uniform(-1e6, 1e6)
+        elif kind < 0.7:
+            value = rng.choice([True, False, None])
+        elif kind < 0.85 and depth < 2:
+            value = random_message(rng, depth + 1)
+        else:
+            value = [rng.randint(-1000, 1000) for _ in range(rng.randint(0, 5))]
+        message[random_text(rng, rng.randint(1, 8))] = value
+    return message
+
+
+def unchunk(messages):
+    """Mirror of joinChunk() in extension/background.js"""
+    pending = {}
+    for message in messages:
+        if message.get("action") != "chunk":
+            yield message
+            continue
+        parts = pending.setdefault(message["id"], {})
+        parts[message["seq"]] = message["data"]
+        if len(parts) == message["total"]:
+            del pending[message["id"]]
+            yield json.loads(''.join(parts[i] for i in range(message["total"])))
+
+
+def read_all(data):
+    stream = io.BytesIO(data)
+    messages = []
+    while True:
+        message = read_message(stream)
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def frame(body):
+    return HEADER.pack(len(body)) + body
+
+
+@pytest.mark.parametrize('message', SAMPLE_MESSAGES)
+def test_round_trip(message):
+    framed = encode(message)
+    (length,) = struct.unpack('<I', framed[:4])
+    assert length == len(framed) - HEADER.size  # UTF-8 bytes, not characters
+    assert decode(framed) == (message, len(framed))
+    assert read_all(framed) == [message]
+
+
+def test_compact_utf8_body():
+    assert dumps({"a": [1, 2], "b": "é"}) == '{"a":[1,2],"b":"é"}'
+
+
+def test_limit_is_inclusive():
+    body = b'"' + b'x' * (MAX_MESSAGE - 2) + b'"'
+    assert len(body) == MAX_MESSAGE
+    message, used = decode(frame(body))
+    assert len(message) == MAX_MESSAGE - 2 and used == len(body) + HEADER.size
+    assert len(read_message(io.BytesIO(frame(body)))) == MAX_MESSAGE - 2
+
+
+def test_oversized_length_rejected_before_reading_body():
+    header = HEADER.pack(MAX_MESSAGE + 1)
+    with pytest.raises(ValueError):
+        decode(header)
+    with pytest.raises(ValueError):
+        read_message(io.BytesIO(header + b'{}'))
+
+
+@pytest.mark.parametrize('cut', [0, 1, 2, 3])
+def test_truncated_length_prefix(cut):
+    data = encode({"action": "pause_video"})[:cut]
+    assert decode(data) == (None, 0)
+    assert read_message(io.BytesIO(data)) is None
+
+
+def test_truncated_body():
+    data = encode({"action": "pause_video"})
+    assert decode(data[:-1]) == (None, 0)
+    assert read_message(io.BytesIO(data[:-1])) is None
+
+
+@pytest.mark.parametrize('body', [b'\xff\xfe{}', b'{"a": "\xc3"}', b'\xed\xa0\x80'])
+def test_invalid_utf8(body):
+    with pytest.raises(ValueError):
+        decode(frame(body))
+    with pytest.raises(ValueError):
+        read_message(io.BytesIO(frame(body)))
+
+
+@pytest.mark.parametrize('body', [b'{', b'{"a":}', b'', b'nope', b'{"a":1}x'])
+def test_invalid_json(body):
+    with pytest.raises(ValueError):
+        decode(frame(body))
+    with pytest.raises(ValueError):
+        read_message(io.BytesIO(frame(body)))
+
+
+def test_chunk_messages_split_and_join():
+    text = dumps({"action": "debug_frame", "frame": "ab中" * 1000})
+    chunks = list(chunk_messages(text, 7, chunk_chars=500))
+    assert len(chunks) == (len(text) + 499) // 500
+    assert [c["seq"] for c in chunks] == list(range(len(chunks)))
+    assert all(c["id"] == 7 and c["total"] == len(chunks) for c in chunks)
+    assert all(len(c["data"]) <= 500 for c in chunks)
+    # Arrival order doesn't matter
+    assert list(unchunk(reversed(chunks))) == [json.loads(text)]
+
+
+def test_writer_sends_at_limit_unchunked_and_over_limit_chunked():
+    out = io.BytesIO()
+    writer = MessageWriter(out, max_size=1000)
+    fits = {"a": "x" * (1000 - len(dumps({"a": ""})))}
+    assert len(dumps(fits).encode('utf-8')) == 1000
+    writer.send(fits)
+    assert writer.chunked == 0
+
+    too_big = {"a": "x" * 1000}
+    writer.send(too_big)
+    assert writer.chunked == 1
+    framed = read_all(out.getvalue())
+    assert framed[0] == fits
+    assert all(m["action"] == "chunk" for m in framed[1:])
+    assert list(unchunk(framed)) == [fits, too_big]
+
+
+def test_chunks_stay_under_the_limit_and_in_order():
+    rng = random.Random(99)
+    big = {"action": "debug_frame", "frame": random_text(rng, 700 * 1024), "focused": True}
+    out = io.BytesIO()
+    writer = MessageWriter(out)
+    writer.send({"action": "pause_video", "reason": "eyes_away"})
+    writer.send(big)
+    writer.send({"action": "away_end", "t": 1.5, "d": 0.25})
+    framed = read_all(out.getvalue())
+
+    assert all(len(dumps(m).encode('utf-8')) <= MAX_MESSAGE for m in framed)
+    assert sum(m.get("action") == "chunk" for m in framed) > 1
+    assert list(unchunk(framed)) == [{"action": "pause_video", "reason": "eyes_away"}, big,
+                                     {"action": "away_end", "t": 1.5, "d": 0.25}]
+
+
+def test_fuzz_round_trip_in_random_pieces():
+    rng = random.Random(1234)
+    messages = [random_message(rng) for _ in range(2000)]
+    out = io.BytesIO()
+    writer = MessageWriter(out)
+    for message in messages:
+        writer.send(message)
+    data = out.getvalue()
+    assert writer.bytes_written == len(data)
+    assert read_all(data) == messages
+
+    # Feed the stream back in random pieces, as a pipe would deliver it
+    buffer = bytearray()
+    decoded = []
+    position = 0
+    while position < len(data):
+        step = rng.randint(1, 300)
+        buffer += data[position:position + step]
+        position += step
+        while True:
+            message, used = decode(buffer)
+            if message is None:
+                break
+            decoded.append(message)
+            del buffer[:used]
+    assert decoded == messages and not buffer
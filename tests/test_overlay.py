@@ -0,0 +1,86 @@
+"""
+Cached overlay layers composite exactly what drawing straight onto the frame
+gives - dark colors included - on first render and on reuse
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from overlay import OverlayCompositor
+
+COLORS = [
+    (255, 0, 0),    # Pure blue: low luma
+    (0, 0, 255),    # Pure red
+    (0, 255, 0),
+    (255, 255, 255),
+    (1, 0, 0),      # Darkest nonzero colors - gray rounds these to 0
+    (0, 0, 2),
+    (40, 0, 40),
+]
+
+
+def background(seed=0):
+    return np.random.default_rng(seed).integers(30, 220, (240, 320, 3), dtype=np.uint8)
+
+
+def banner(color):
+    def draw(canvas):
+        cv2.putText(canvas, "Status: FOCUSED", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        cv2.circle(canvas, (200, 60), 12, color, -1)
+        cv2.rectangle(canvas, (5, 5), (8, 8), color, -1)
+    return draw
+
+
+@pytest.mark.parametrize('color', COLORS)
+def test_cached_layer_matches_direct_drawing(color):
+    draw = banner(color)
+    direct = background()
+    draw(direct)
+
+    overlay = OverlayCompositor()
+    for _ in range(2):  # Rendered, then reused
+        cached = background()
+        overlay.draw(cached, 'banner', color, draw)
+        assert np.array_equal(cached, direct)
+    assert overlay.renders == 1 and overlay.reuses == 1
+
+
+@pytest.mark.parametrize('color', COLORS)
+def test_region_layer_matches_direct_drawing(color):
+    draw = banner(color)
+    direct = background()
+    draw(direct[100:180, 50:300])
+
+    cached = background()
+    OverlayCompositor().draw(cached, 'banner', color, draw, region=(50, 100, 250, 80))
+    assert np.array_equal(cached, direct)
+
+
+def test_box_edges_in_every_channel():
+    # Content whose leftmost / rightmost pixel has only its first or last channel set
+    def draw(canvas):
+        canvas[10, 7] = (0, 0, 9)
+        canvas[30, 100] = (9, 0, 0)
+        canvas[20, 50] = (0, 9, 0)
+
+    direct = np.zeros((60, 120, 3), dtype=np.uint8)
+    draw(direct)
+    overlay = OverlayCompositor()
+    cached = np.zeros((60, 120, 3), dtype=np.uint8)
+    overlay.draw(cached, 'dots', None, draw)
+    assert np.array_equal(cached, direct)
+    assert overlay.layers['dots'].box == (7, 10, 94, 21)
+
+
+def test_changed_key_rerenders_and_empty_layer_draws_nothing():
+    overlay = OverlayCompositor()
+    frame = background()
+    overlay.draw(frame, 'status', 'a', banner((0, 255, 0)))
+    overlay.draw(frame, 'status', 'b', banner((0, 0, 255)))
+    assert overlay.renders == 2
+
+    before = background()
+    after = before.copy()
+    overlay.draw(after, 'empty', None, lambda canvas: None)
+    assert np.array_equal(after, before)
@@ -0,0 +1,62 @@
+"""
+The extension's recap cache (extension/content/recap-cache.js) run under Node
+against recap_stub_server.py: concurrent stores keep the LRU index and the
+stored entries in step, hits skip the API and identical requests share a fetch
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import recap_stub_server
+
+DRIVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recap_cache_driver.js')
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason="needs Node.js")
+
+
+class FastStub(recap_stub_server.StubHandler):
+    latency = 0.05
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FastStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/openai/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def completions():
+    with recap_stub_server.stats_lock:
+        return recap_stub_server.stats["completions"]
+
+
+def run_driver(base, scenario):
+    result = subprocess.run(['node', DRIVER, base, scenario], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize('scenario', ['tab', 'tabs'])
+def test_concurrent_stores_leave_no_orphans(stub_api, scenario):
+    before = completions()
+    result = run_driver(stub_api, scenario)
+
+    # Every stored entry is in the index (so it can be evicted), and the limit holds
+    assert result["entries"] == result["indexed"]
+    assert len(result["entries"]) == 5
+
+    assert len(set(result["first"])) == 12
+    assert result["again"] == result["stored"]   # Served from the cache
+    assert result["shared"][0] == result["shared"][1]
+    assert result["hits"] == 1
+    # 13 distinct recaps + one shared fetch - the cache hit never reached the API
+    assert completions() - before == 14
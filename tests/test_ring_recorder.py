@@ -0,0 +1,91 @@
+"""
+Ring recorder dumps keep the detection settings they were recorded with, and
+replay runs detection with them
+"""
+
+import threading
+
+import numpy as np
+
+import ring_recorder
+from ring_recorder import DEFAULT_SETTINGS, RingRecorder, load_recording, replay
+
+
+def record(recorder, frames=5, camera=0):
+    for i in range(frames):
+        recorder.add_frame(np.full((120, 160), i * 10, dtype=np.uint8), 1000.0 + i * 0.1, camera)
+
+
+def dump(recorder, settings=None):
+    finished = threading.Event()
+    written = []
+
+    def done(path):
+        written.append(path)
+        finished.set()
+
+    recorder.dump('pause', done=done, settings=settings)
+    assert finished.wait(10)
+    assert written[0] is not None
+    return written[0]
+
+
+def capture_detection(monkeypatch):
+    calls = []
+
+    def detect(frame, face_cascade, eye_cascade, **kwargs):
+        calls.append((frame.shape, kwargs))
+        return []
+
+    monkeypatch.setattr(ring_recorder, 'detect_faces_and_eyes', detect)
+    return calls
+
+
+def test_dump_saves_settings_and_replay_uses_them(tmp_path, monkeypatch):
+    recorder = RingRecorder(seconds=1, directory=str(tmp_path))
+    record(recorder, camera=0)
+    record(recorder, frames=2, camera=1)
+    settings = {"face_params": (1.2, 6), "eye_params": (1.05, 3), "face_scale": 0.5, "lighting": 'clahe'}
+    recording = load_recording(dump(recorder, settings))
+
+    assert recording["settings"] == settings
+    assert isinstance(recording["settings"]["face_params"][1], int)
+    assert len(recording["records"]) == 7
+
+    calls = capture_detection(monkeypatch)
+    list(replay(recording, None, None))
+    assert len(calls) == 7
+    for shape, kwargs in calls:
+        assert shape == (120, 160)  # Scaled back to the capture size
+        assert kwargs["face_params"] == (1.2, 6)
+        assert kwargs["eye_params"] == (1.05, 3)
+        assert kwargs["face_scale"] == 0.5
+        assert kwargs["lighting"].mode == 'clahe'
+    # One normalizer per camera, kept across that camera's frames
+    normalizers = [kwargs["lighting"] for _, kwargs in calls]
+    assert normalizers[0] is normalizers[4]
+    assert normalizers[5] is normalizers[6] and normalizers[5] is not normalizers[0]
+
+
+def test_lighting_off_replays_without_normalizer(tmp_path, monkeypatch):
+    recorder = RingRecorder(seconds=1, directory=str(tmp_path))
+    record(recorder)
+    recording = load_recording(dump(recorder))
+    assert recording["settings"] == DEFAULT_SETTINGS
+
+    calls = capture_detection(monkeypatch)
+    list(replay(recording, None, None))
+    assert all(kwargs["lighting"] is None for _, kwargs in calls)
+
+
+def test_dump_without_settings_metadata_loads_defaults(tmp_path):
+    # Dumps written before the settings were saved
+    recorder = RingRecorder(seconds=1, directory=str(tmp_path))
+    record(recorder)
+    records, frames = recorder.snapshot()
+    path = tmp_path / 'old.npz'
+    np.savez_compressed(path, records=records, frames=frames, reason='pause')
+
+    recording = load_recording(str(path))
+    assert recording["settings"] == DEFAULT_SETTINGS
+    assert len(recording["frames"]) == 5
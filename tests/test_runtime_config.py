@@ -0,0 +1,139 @@
+"""
+Runtime config validation, all-or-nothing rejection, overrides and file reloads
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from runtime_config import SETTINGS, RuntimeConfig, validate
+
+
+def write(path, values, mtime):
+    path.write_text(json.dumps(values) if isinstance(values, dict) else values)
+    # Explicit mtimes - filesystem timestamp resolution can't hide a rewrite
+    os.utime(path, (mtime, mtime))
+
+
+def later(seconds):
+    # poll() times are on the monotonic clock the constructor's first check used
+    return time.monotonic() + seconds
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    return tmp_path / 'eye_focus_config.json'
+
+
+@pytest.mark.parametrize('values, fragment', [
+    ({'away_threshold': 0.1}, "between"),
+    ({'jpeg_quality': 101}, "between"),
+    ({'jpeg_quality': 70.5}, "whole number"),
+    ({'away_threshold': "5"}, "must be a number"),
+    ({'away_threshold': True}, "must be a number"),
+    ({'away_threshold': float('nan')}, "must be a number"),
+    ({'no_such_setting': 1}, "unknown setting"),
+    ([1, 2], "expected an object"),
+])
+def test_validate_rejects_bad_values(values, fragment):
+    checked, errors = validate(values)
+    assert checked == {}
+    assert len(errors) == 1 and fragment in errors[0]
+
+
+def test_validate_converts_kinds():
+    checked, errors = validate({'jpeg_quality': 50.0, 'away_threshold': 8, 'face_min_neighbors': None})
+    assert errors == []
+    assert checked == {'jpeg_quality': 50, 'away_threshold': 8.0, 'face_min_neighbors': None}
+    assert type(checked['jpeg_quality']) is int and type(checked['away_threshold']) is float
+
+
+def test_defaults_without_file():
+    config = RuntimeConfig(None)
+    assert config.values == {name: setting.default for name, setting in SETTINGS.items()}
+    assert config.away_threshold == SETTINGS['away_threshold'].default
+    with pytest.raises(AttributeError):
+        config.no_such_setting
+
+
+def test_bad_command_is_rejected_as_a_whole():
+    config = RuntimeConfig(None)
+    config.submit({'away_threshold': 9, 'jpeg_quality': 500})
+    changed, errors = config.poll()
+    assert changed == [] and len(errors) == 1
+    assert config.away_threshold == SETTINGS['away_threshold'].default
+
+    config.submit({'away_threshold': 9, 'jpeg_quality': 50})
+    changed, errors = config.poll()
+    assert sorted(changed) == ['away_threshold', 'jpeg_quality'] and errors == []
+    assert (config.away_threshold, config.jpeg_quality) == (9.0, 50)
+
+
+def test_none_resets_override_to_file_value(config_file):
+    write(config_file, {'away_threshold': 8}, 1000)
+    config = RuntimeConfig(str(config_file))
+    assert config.away_threshold == 8.0
+
+    config.submit({'away_threshold': 20, 'jpeg_quality': 40})
+    config.poll()
+    assert config.away_threshold == 20.0
+
+    config.submit({'away_threshold': None, 'jpeg_quality': None})
+    changed, errors = config.poll()
+    assert sorted(changed) == ['away_threshold', 'jpeg_quality'] and errors == []
+    assert config.away_threshold == 8.0  # The file's value, not the default
+    assert config.jpeg_quality == SETTINGS['jpeg_quality'].default
+
+
+def test_file_reloads_on_mtime_change(config_file):
+    write(config_file, {'away_threshold': 8}, 1000)
+    config = RuntimeConfig(str(config_file), check_interval=1.0)
+    assert config.reloads == 1
+
+    write(config_file, {'away_threshold': 12}, 2000)
+    assert config.poll(now=time.monotonic()) == ([], [])  # Within the check interval - not looked at yet
+    changed, errors = config.poll(now=later(10.0))
+    assert changed == ['away_threshold'] and errors == []
+    assert config.away_threshold == 12.0 and config.reloads == 2
+
+    # Same mtime - the file isn't read again
+    assert config.poll(now=later(20.0)) == ([], [])
+    assert config.reloads == 2
+
+
+def test_overrides_survive_file_reload(config_file):
+    write(config_file, {'away_threshold': 8}, 1000)
+    config = RuntimeConfig(str(config_file))
+    config.submit({'away_threshold': 30})
+    config.poll(now=later(10.0))
+
+    write(config_file, {'away_threshold': 12, 'jpeg_quality': 40}, 2000)
+    changed, errors = config.poll(now=later(20.0))
+    assert changed == ['jpeg_quality']
+    assert config.away_threshold == 30.0
+
+
+@pytest.mark.parametrize('contents', [
+    {'away_threshold': 12, 'jpeg_quality': 5},  # One value out of range
+    '{"away_threshold": 12,',                   # Not JSON
+])
+def test_bad_file_is_rejected_as_a_whole(config_file, contents):
+    write(config_file, {'away_threshold': 8, 'eye_min_neighbors': 3}, 1000)
+    config = RuntimeConfig(str(config_file))
+
+    write(config_file, contents, 2000)
+    changed, errors = config.poll(now=later(10.0))
+    assert changed == [] and len(errors) == 1
+    assert errors[0].startswith('eye_focus_config.json: ')
+    assert (config.away_threshold, config.eye_min_neighbors) == (8.0, 3)
+
+
+def test_removed_file_falls_back_to_defaults(config_file):
+    write(config_file, {'away_threshold': 8}, 1000)
+    config = RuntimeConfig(str(config_file))
+    config_file.unlink()
+    changed, errors = config.poll(now=later(10.0))
+    assert changed == ['away_threshold'] and errors == []
+    assert config.away_threshold == SETTINGS['away_threshold'].default
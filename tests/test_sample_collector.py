@@ -0,0 +1,80 @@
+"""
+Calibration sample collection: median/MAD outlier rejection and when a point
+stops
+"""
+
+import numpy as np
+import pytest
+
+from sample_collector import COLLECTING, DONE, FAILED, SampleCollector
+
+CENTER = (0.45, 0.55)
+
+
+def steady(count, spread=0.002, seed=0):
+    """Samples scattered tightly around CENTER"""
+    rng = np.random.default_rng(seed)
+    return [tuple(v) for v in np.array(CENTER) + rng.normal(0, spread, (count, 2))]
+
+
+def collector_with(samples, **kwargs):
+    collector = SampleCollector(**kwargs)
+    collector.start(0.0)
+    for sample in samples:
+        collector.add(sample)
+    return collector
+
+
+def test_outliers_are_rejected():
+    blinks = [(0.9, 0.1), (0.05, 0.95), (0.45, 0.9), (0.8, 0.55)]  # One axis off is enough
+    collector = collector_with(steady(20) + blinks)
+    assert len(collector._inliers()) == 20
+    assert collector.estimate() == pytest.approx(CENTER, abs=0.002)
+    # The plain mean is pulled well away by them
+    assert not np.allclose(np.mean(collector.samples, axis=0), CENTER, atol=0.01)
+
+
+def test_identical_samples_keep_their_value():
+    # Zero MAD must not reject every sample that isn't bit-identical
+    collector = collector_with([CENTER] * 10 + [(0.7, 0.2)])
+    assert collector.estimate() == pytest.approx(CENTER)
+    assert collector.standard_error() == pytest.approx(0.0)
+
+
+def test_no_estimate_without_samples():
+    collector = SampleCollector()
+    assert collector.estimate() is None
+    assert collector.standard_error() == float('inf')
+
+
+def test_steady_point_stops_after_min_duration():
+    collector = collector_with(steady(10))
+    assert collector.converged()
+    assert collector.status(0.2) == COLLECTING  # Eyes still settling
+    assert collector.status(0.5) == DONE
+
+
+def test_too_few_samples_do_not_converge():
+    collector = collector_with(steady(5))
+    assert not collector.converged()
+    assert collector.status(1.0) == COLLECTING
+
+
+def test_noisy_point_extends_then_accepts_best_effort():
+    collector = collector_with(steady(12, spread=0.05))
+    assert not collector.converged()
+    assert collector.status(1.0) == COLLECTING
+    assert collector.status(3.9) == COLLECTING
+    assert collector.status(4.0) == DONE
+    assert collector.estimate() == pytest.approx(CENTER, abs=0.05)
+
+
+def test_point_without_usable_samples_fails_at_the_limit():
+    assert collector_with([]).status(4.0) == FAILED
+    assert collector_with(steady(3, spread=0.05)).status(4.0) == FAILED  # Fewer than min_inliers
+
+
+def test_more_samples_lower_the_standard_error():
+    few = collector_with(steady(10, spread=0.01, seed=1)).standard_error()
+    many = collector_with(steady(160, spread=0.01, seed=1)).standard_error()
+    assert many < few / 2
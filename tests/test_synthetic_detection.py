@@ -0,0 +1,120 @@
+"""
+Detection on synthetic frames: the face, away and closed-eye scenes give the
+right result, and each pipeline stage stays inside its time budget
+"""
+
+import cv2
+import pytest
+
+from bench_synthetic import bench_detection, bench_openness, bench_pupil, timed
+from eye_detection import detect_faces_and_eyes, load_cascades, locate_pupil
+from eye_openness import BlinkTracker, eye_openness
+from gaze_mapping import compute_linear_mapping, estimate_gaze_position
+from synthetic import eye_crop, face_scene, render_scene
+
+# Microseconds per call - several times the typical desktop figure, so only a
+# real regression (an extra full-frame pass, a lost fast path) trips them
+DETECT_BUDGET_US = 250000   # Face + eyes + pupils on a 640x480 frame, ~50 ms
+PUPIL_BUDGET_US = 1000      # One eye crop, ~40 us
+OPENNESS_BUDGET_US = 1000   # One eye crop, ~30 us
+GAZE_BUDGET_US = 100        # One mapped gaze point, ~2 us
+
+
+@pytest.fixture(scope='module')
+def cascades():
+    return load_cascades()
+
+
+def gray_scene(scene, width=640, height=480):
+    return cv2.cvtColor(render_scene(scene, width, height), cv2.COLOR_BGR2GRAY)
+
+
+def test_face_scene_finds_face_eyes_and_pupils(cascades):
+    frame, truth = face_scene(seed=1)
+    detections = detect_faces_and_eyes(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), *cascades, True)
+
+    assert len(detections) == 1
+    (fx, fy, fw, fh), eyes, pupils = detections[0]
+    tx, ty, tw, th = truth["face"]
+    # Face box centered on the drawn face
+    assert abs((fx + fw / 2) - (tx + tw / 2)) < tw * 0.2
+    assert abs((fy + fh / 2) - (ty + th / 2)) < th * 0.2
+    assert len(eyes) == 2
+    for (ex, ey, ew, eh), (px, py) in zip(eyes, pupils):
+        found = (fx + ex + px, fy + ey + py)
+        error = min(abs(found[0] - x) + abs(found[1] - y) for x, y in truth["pupils"])
+        assert error <= 3
+
+
+@pytest.mark.parametrize('scene', ['away', 'dark'])
+def test_empty_scenes_find_no_face(cascades, scene):
+    assert detect_faces_and_eyes(gray_scene(scene), *cascades, True) == []
+
+
+def test_closed_scene_finds_face_but_no_eyes(cascades):
+    detections = detect_faces_and_eyes(gray_scene('closed'), *cascades, True)
+    assert len(detections) == 1
+    assert len(detections[0][1]) == 0
+
+
+def test_closed_scene_reads_as_closed_eyes(cascades):
+    open_gray, closed_gray = gray_scene('face'), gray_scene('closed')
+    tracker = BlinkTracker()
+    t = 0.0
+    for _ in range(10):
+        tracker.update_boxes(detect_faces_and_eyes(open_gray, *cascades))
+        tracker.observe(open_gray, t)
+        t += 0.1
+    assert not tracker.closed
+
+    # The eye cascade misses closed eyes - the tracker measures on the last boxes
+    for _ in range(15):
+        tracker.update_boxes(detect_faces_and_eyes(closed_gray, *cascades))
+        tracker.observe(closed_gray, t)
+        t += 0.1
+    assert tracker.closed
+    assert tracker.closure(t) >= tracker.long_closure
+
+
+def test_accuracy_on_synthetic_benchmark(cascades):
+    pupil = bench_pupil()
+    assert pupil["pupil/clean"]["error_px"] < 0.5
+    assert pupil["pupil/noise 8"]["error_px"] < 1.0
+
+    for name, result in bench_openness().items():
+        assert result["accuracy_rate"] >= 0.95, name
+
+    detection = bench_detection(*cascades)
+    for name, result in detection.items():
+        assert result["face_rate"] == 1.0, name
+    assert detection["detect/640x480"]["eye_rate"] == 1.0
+    assert detection["detect/640x480"]["error_px"] < 2.0
+
+
+def test_detection_time_budget(cascades):
+    gray = cv2.cvtColor(face_scene()[0], cv2.COLOR_BGR2GRAY)
+    detections, us = timed(detect_faces_and_eyes, gray, *cascades, True)
+    assert detections
+    assert us < DETECT_BUDGET_US
+
+
+def test_pupil_time_budget():
+    crop, _ = eye_crop(noise=8)
+    _, us = timed(locate_pupil, crop, repeat=20)
+    assert us < PUPIL_BUDGET_US
+
+
+def test_openness_time_budget():
+    crop, _ = eye_crop()
+    value, us = timed(eye_openness, crop, repeat=20)
+    assert value is not None
+    assert us < OPENNESS_BUDGET_US
+
+
+def test_gaze_time_budget():
+    pupils = [(0.3, 0.3), (0.7, 0.3), (0.5, 0.5), (0.3, 0.7), (0.7, 0.7)]
+    screen = [(x * 1920, y * 1080) for x, y in pupils]
+    mapping = compute_linear_mapping(pupils, screen)
+    gaze, us = timed(estimate_gaze_position, (0.5, 0.5), [], [], 1920, 1080, mapping, repeat=50)
+    assert abs(gaze[0] - 960) < 1 and abs(gaze[1] - 540) < 1
+    assert us < GAZE_BUDGET_US
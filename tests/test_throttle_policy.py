@@ -0,0 +1,160 @@
+"""
+ThrottlePolicy on injected load and power readings: load steps with
+hysteresis, the battery floors and a pinned level
+"""
+
+import pytest
+
+from throttle_policy import LADDER, ThrottlePolicy
+
+LAST = len(LADDER) - 1
+
+
+class FakeMachine:
+    """Readings the test can change between updates"""
+
+    def __init__(self, load=0.2, on_battery=False, charge=None):
+        self.load = load
+        self.on_battery = on_battery
+        self.charge = charge
+        self.readings = 0
+
+    def read_load(self):
+        self.readings += 1
+        return self.load
+
+    def read_power(self):
+        return self.on_battery, self.charge
+
+
+def make_policy(machine, **kwargs):
+    return ThrottlePolicy(read_load=machine.read_load, read_power=machine.read_power, **kwargs)
+
+
+def run(policy, start, end):
+    """Update at every reading interval in [start, end]; returns the times the level changed"""
+    changes = []
+    t = start
+    while t <= end:
+        if policy.update(t):
+            changes.append(t)
+        t += policy.interval
+    return changes
+
+
+def test_sustained_load_steps_down_one_level_per_period():
+    machine = FakeMachine(load=1.2)
+    policy = make_policy(machine)
+
+    # High load from t=0: one step after step_down_after, the next needs its own period
+    assert run(policy, 0, 10) == []
+    assert policy.index == 0
+    assert run(policy, 15, 15) == [15]
+    assert policy.level is LADDER[1]
+    assert run(policy, 20, 25) == []
+    assert run(policy, 30, 30) == [30]
+    assert policy.index == 2
+
+
+def test_load_steps_stop_at_last_level():
+    policy = make_policy(FakeMachine(load=2.0))
+    run(policy, 0, 600)
+    assert policy.index == LAST
+    assert policy.changes == LAST
+
+
+def test_short_load_spike_does_not_step_down():
+    machine = FakeMachine(load=1.2)
+    policy = make_policy(machine)
+    run(policy, 0, 10)
+    machine.load = 0.6  # Between low_load and high_load - resets the pressure timer
+    run(policy, 15, 15)
+    machine.load = 1.2
+    assert run(policy, 20, 30) == []
+    assert policy.index == 0
+
+
+def test_relief_steps_back_up_after_step_up_after():
+    machine = FakeMachine(load=1.2)
+    policy = make_policy(machine)
+    run(policy, 0, 30)
+    assert policy.index == 2
+
+    machine.load = 0.2
+    # Relief starts at the first low reading (t=35); steps up 60 s later, then again
+    assert run(policy, 35, 90) == []
+    assert run(policy, 95, 95) == [95]
+    assert policy.index == 1
+    assert run(policy, 100, 150) == []
+    assert run(policy, 155, 155) == [155]
+    assert policy.index == 0
+
+
+def test_unknown_load_counts_as_relief():
+    machine = FakeMachine(load=1.2)
+    policy = make_policy(machine)
+    run(policy, 0, 15)
+    assert policy.index == 1
+    machine.load = None  # No load average (Windows)
+    run(policy, 20, 80)
+    assert policy.index == 0
+
+
+@pytest.mark.parametrize('charge, index', [
+    (None, 1),   # On battery, charge unknown: 'reduced'
+    (80, 1),
+    (21, 1),
+    (20, 2),     # At low_battery: 'low'
+    (11, 2),
+    (10, 3),     # At or below half of low_battery: the last level
+    (3, 3),
+])
+def test_battery_floor(charge, index):
+    policy = make_policy(FakeMachine(on_battery=True, charge=charge))
+    assert policy.update(0) == (index != 0)
+    assert policy.index == index
+
+
+def test_battery_floor_applies_and_lifts_immediately():
+    machine = FakeMachine(on_battery=True, charge=5)
+    policy = make_policy(machine)
+    policy.update(0)
+    assert policy.index == LAST
+
+    machine.on_battery = False  # Plugged in - back to full at the next reading
+    assert policy.update(5)
+    assert policy.index == 0
+
+
+def test_load_steps_below_battery_floor_still_count():
+    machine = FakeMachine(load=1.2, on_battery=True, charge=50)
+    policy = make_policy(machine)
+    run(policy, 0, 30)
+    # Two load steps beat the battery's one
+    assert policy.index == 2
+    machine.on_battery = False
+    assert run(policy, 35, 35) == []
+    assert policy.index == 2
+
+
+def test_pinned_level_ignores_readings():
+    machine = FakeMachine(load=2.0, on_battery=True, charge=5)
+    policy = make_policy(machine, pinned=1)
+    assert policy.level is LADDER[1]
+    assert run(policy, 0, 600) == []
+    assert policy.index == 1
+    assert machine.readings == 0
+
+
+def test_pinned_full_quality():
+    policy = make_policy(FakeMachine(load=2.0), pinned=0)
+    run(policy, 0, 600)
+    assert policy.index == 0
+
+
+def test_readings_only_taken_every_interval():
+    machine = FakeMachine()
+    policy = make_policy(machine, interval=5.0)
+    for t in (0, 1, 2, 4.9, 5, 6, 9.9, 10):
+        policy.update(t)
+    assert machine.readings == 3
@@ -0,0 +1,254 @@
+"""
+Throttle Policy
+Steps the native hosts' detection down a fixed ladder when the machine is busy
+(builds, video calls) or on battery, and back up when it recovers: first the
+frame rate and debug frames, then the face search resolution, then pupil
+detection. Load is the 1-minute load average per CPU (/proc/loadavg); power
+comes from /sys/class/power_supply on Linux and GetSystemPowerStatus on Windows.
+Both readers are plain callables, so the policy runs on injected readings too:
+
+    python throttle_policy.py                       # readings and level on this machine
+    python throttle_policy.py --load 1.4 --minutes 3 --battery 15
+
+EYE_FOCUS_THROTTLE=off keeps full quality, a level number (0-3) pins that level
+"""
+
+import argparse
+import os
+import sys
+import time
+
+POWER_SUPPLY_DIR = '/sys/class/power_supply'
+
+
+class ThrottleLevel:
+    def __init__(self, name, frame_interval, face_scale, debug_frames, pupils):
+        """
+        frame_interval: seconds between reads of the active camera (CameraRig.full_rate)
+        face_scale:     resolution factor for the full-frame face search
+        debug_frames:   multiple of the debug view's frame interval, 0 = no debug frames
+        pupils:         pupil detection for calibrated cameras (off = visible eyes count as focused)
+        """
+        self.name = name
+        self.frame_interval = frame_interval
+        self.face_scale = face_scale
+        self.debug_frames = debug_frames
+        self.pupils = pupils
+
+    def __repr__(self):
+        return f"ThrottleLevel({self.name})"
+
+
+# Cheapest losses first: a 5 s pause threshold doesn't need 10 FPS
+LADDER = (
+    ThrottleLevel('full', 0.1, 1.0, 1, True),
+    ThrottleLevel('reduced', 0.2, 1.0, 2, True),
+    ThrottleLevel('low', 0.25, 0.5, 4, True),
+    ThrottleLevel('minimal', 0.5, 0.5, 0, False),
+)
+
+
+def read_load(path='/proc/loadavg'):
+    """1-minute load average per CPU, None where there is none (Windows)"""
+    try:
+        with open(path) as f:
+            load = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        try:
+            load = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            return None
+    return load / (os.cpu_count() or 1)
+
+
+def read_power(root=POWER_SUPPLY_DIR):
+    """(on_battery, charge percent or None); (False, None) when there's no battery"""
+    if sys.platform == 'win32':
+        return _windows_power()
+    try:
+        supplies = os.listdir(root)
+    except OSError:
+        return False, None
+
+    def attr(supply, name):
+        try:
+            with open(os.path.join(root, supply, name)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    mains = discharging = False
+    charge = None
+    for supply in supplies:
+        kind = attr(supply, 'type')
+        if kind in ('Mains', 'USB') and attr(supply, 'online') == '1':
+            mains = True
+        elif kind == 'Battery' and attr(supply, 'scope') != 'Device':  # Not a mouse or headset
+            discharging = discharging or attr(supply, 'status') == 'Discharging'
+            capacity = attr(supply, 'capacity')
+            if capacity is not None and capacity.isdigit():
+                charge = int(capacity) if charge is None else min(charge, int(capacity))
+    return discharging and not mains, charge
+
+
+def _windows_power():
+    import ctypes
+
+    class SystemPowerStatus(ctypes.Structure):
+        _fields_ = [('ACLineStatus', ctypes.c_ubyte), ('BatteryFlag', ctypes.c_ubyte),
+                    ('BatteryLifePercent', ctypes.c_ubyte), ('SystemStatusFlag', ctypes.c_ubyte),
+                    ('BatteryLifeTime', ctypes.c_ulong), ('BatteryFullLifeTime', ctypes.c_ulong)]
+
+    status = SystemPowerStatus()
+    try:
+        if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+            return False, None
+    except (AttributeError, OSError):
+        return False, None
+    charge = status.BatteryLifePercent if status.BatteryLifePercent <= 100 else None  # 255 = unknown
+    return status.ACLineStatus == 0, charge
+
+
+def throttle_setting():
+    """EYE_FOCUS_THROTTLE: None = automatic, otherwise the pinned ladder level ('off' = 0)"""
+    value = os.environ.get('EYE_FOCUS_THROTTLE', 'auto').strip().lower()
+    if value == 'off':
+        return 0
+    if value.isdigit():
+        return min(int(value), len(LADDER) - 1)
+    return None
+
+
+class ThrottlePolicy:
+    def __init__(self, pinned=None, read_load=read_load, read_power=read_power, ladder=LADDER,
+                 interval=5.0, high_load=0.85, low_load=0.5, step_down_after=15.0, step_up_after=60.0,
+                 low_battery=20, log=None):
+        """
+        pinned:          fixed ladder level, None = follow load and power
+        read_load:       callable() -> load per CPU or None
+        read_power:      callable() -> (on_battery, charge percent or None)
+        interval:        seconds between readings - update() is free in between
+        high_load:       load per CPU that steps down one level once it lasts step_down_after seconds
+        low_load:        load per CPU that steps back up once it lasts step_up_after seconds
+        low_battery:     charge (%) at which battery power drops to the 'low' level
+                         instead of 'reduced' (half of it: the last level)
+        """
+        self.ladder = ladder
+        self.pinned = pinned
+        self.read_load = read_load
+        self.read_power = read_power
+        self.interval = interval
+        self.high_load = high_load
+        self.low_load = low_load
+        self.step_down_after = step_down_after
+        self.step_up_after = step_up_after
+        self.low_battery = low_battery
+        self.log = log
+
+        self.index = pinned or 0
+        self.load_steps = 0      # Levels down because of load, kept apart from the power floor
+        self.pressure_since = None
+        self.relief_since = None
+        self.next_reading = 0.0
+        self.load = None
+        self.on_battery = False
+        self.charge = None
+        self.changes = 0
+
+    @property
+    def level(self):
+        return self.ladder[self.index]
+
+    def update(self, now=None):
+        """Take a reading when one is due; returns True when the level changed"""
+        now = time.monotonic() if now is None else now
+        if self.pinned is not None or now < self.next_reading:
+            return False
+        self.next_reading = now + self.interval
+        self.load = self.read_load()
+        self.on_battery, self.charge = self.read_power()
+
+        last = len(self.ladder) - 1
+        if self.load is not None and self.load >= self.high_load:
+            self.relief_since = None
+            if self.pressure_since is None:
+                self.pressure_since = now
+            elif now - self.pressure_since >= self.step_down_after and self.load_steps < last:
+                self.load_steps += 1
+                self.pressure_since = now  # The next step needs its own sustained load
+        elif self.load is None or self.load <= self.low_load:
+            self.pressure_since = None
+            if self.relief_since is None:
+                self.relief_since = now
+            elif now - self.relief_since >= self.step_up_after and self.load_steps > 0:
+                self.load_steps -= 1
+                self.relief_since = now
+        else:
+            self.pressure_since = self.relief_since = None
+
+        # Power applies straight away, in both directions
+        floor = 0
+        if self.on_battery:
+            floor = 1
+            if self.charge is not None and self.charge <= self.low_battery:
+                floor = 2 if self.charge > self.low_battery / 2 else last
+        index = min(max(self.load_steps, floor), last)
+        if index == self.index:
+            return False
+
+        self.index = index
+        self.changes += 1
+        self._log(f"Throttle: {self.level.name} ({self.describe()})")
+        return True
+
+    def describe(self):
+        load = f"load {self.load:.2f}/CPU" if self.load is not None else "load unknown"
+        power = "on battery" if self.on_battery else "on mains"
+        if self.charge is not None:
+            power += f" {self.charge}%"
+        return f"{load}, {power}"
+
+    def stats(self):
+        """Fields for the host stats message"""
+        fields = {"throttle": self.level.name}
+        if self.load is not None:
+            fields["load_per_cpu"] = round(self.load, 2)
+        if self.on_battery:
+            fields["battery"] = self.charge
+        return fields
+
+    def _log(self, message):
+        if self.log is not None:
+            self.log(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the throttle level for this machine or for given readings")
+    parser.add_argument('--load', type=float, help="load per CPU to simulate instead of reading it")
+    parser.add_argument('--battery', type=int, help="simulate running on battery at this charge (%%)")
+    parser.add_argument('--minutes', type=float, default=0.0, help="simulated time to run the readings for")
+    args = parser.parse_args()
+
+    read_load_fn, read_power_fn = read_load, read_power
+    if args.load is not None:
+        read_load_fn = lambda: args.load
+    if args.battery is not None:
+        read_power_fn = lambda: (True, args.battery)
+
+    t = 0.0
+    policy = ThrottlePolicy(read_load=read_load_fn, read_power=read_power_fn,
+                            log=lambda message: print(f"{t:6.0f}s  {message}"))
+    while True:
+        policy.update(t)
+        if t >= args.minutes * 60:
+            break
+        t += policy.interval
+    level = policy.level
+    print(f"{policy.describe()} -> level {policy.index} '{level.name}': "
+          f"camera every {level.frame_interval}s, face search at {level.face_scale:g}x, "
+          f"debug frames {'x' + str(level.debug_frames) if level.debug_frames else 'off'}, "
+          f"pupils {'on' if level.pupils else 'off'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+Tracker Engine
+The eye focus tracker without its window: eye-detection check, calibration
+sampling, gaze tracking and drift correction run on a tracking thread at their own
+rate. A UI (or nothing, in headless mode) reads snapshots of the latest state and
+sends commands, so drawing never slows gaze sampling
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from drift_correction import RLSMapping
+from eye_cache import EyeGeometryCache
+from eye_detection import load_cascades, locate_pupil
+from frame_context import FrameContext, mirror_x
+from gaze_mapping import (SCREEN_MARGIN, compute_linear_mapping, estimate_gaze_position, is_looking_at_screen,
+                          save_calibration, smooth_pupil)
+from sample_collector import DONE, FAILED, SampleCollector
+
+MODE_CHECK = "check"          # Pre-calibration: confirm face and eyes are visible
+MODE_CALIBRATE = "calibrate"  # Collecting the calibration points
+MODE_TRACK = "track"          # Gaze tracking with a mapping
+
+
+def calibration_grid(frame_width, frame_height):
+    """Calibration points: 9 points in a 3x3 grid, center first"""
+    return [
+        (frame_width // 2, frame_height // 2),  # Center
+        (int(frame_width * 0.15), int(frame_height * 0.15)),  # Top-left
+        (int(frame_width * 0.5), int(frame_height * 0.15)),  # Top-center
+        (int(frame_width * 0.85), int(frame_height * 0.15)),  # Top-right
+        (int(frame_width * 0.15), int(frame_height * 0.5)),  # Mid-left
+        (int(frame_width * 0.85), int(frame_height * 0.5)),  # Mid-right
+        (int(frame_width * 0.15), int(frame_height * 0.85)),  # Bottom-left
+        (int(frame_width * 0.5), int(frame_height * 0.85)),  # Bottom-center
+        (int(frame_width * 0.85), int(frame_height * 0.85)),  # Bottom-right
+    ]
+
+
+class TrackerEngine:
+    def __init__(self, camera_index=0, rate=30, keep_frames=True, on_focus_change=None, log=print):
+        """
+        camera_index:    capture device, also the key its calibration is stored under
+        rate:            tracking samples per second, independent of any display
+        keep_frames:     publish each frame and the detection boxes for a UI (off when headless)
+        on_focus_change: callable(focused, timestamp) run on the tracking thread
+        """
+        self.camera_index = camera_index
+        self.interval = 1.0 / rate
+        self.keep_frames = keep_frames
+        self.on_focus_change = on_focus_change
+        self.log = log
+
+        self.face_cascade, self.eye_cascade = load_cascades()
+        # Eye boxes relative to the tracked face, reused between eye cascade runs
+        self.eye_cache = EyeGeometryCache()
+        # Each point stops as soon as its estimate converges, and keeps going (up to
+        # max_duration) on noisy points instead of failing
+        self.sample_collector = SampleCollector(min_samples=8, min_duration=0.4, max_duration=4.0)
+        self.frame_ctx = FrameContext()
+
+        self.cap = None
+        self.capture_buffer = None
+        self.frame_width = 0
+        self.frame_height = 0
+        self.calibration_targets = []
+
+        # Commands from the UI thread, applied by the tracking thread between samples
+        self.commands = queue.Queue()
+        self.frame_lock = threading.Lock()
+        self.display_frame = None
+        self.snapshot = {}
+        self.thread = None
+        self.running = False
+        self.samples = 0
+
+        self.margin = SCREEN_MARGIN
+        self.total_focus_time = 0
+        self.last_focus_check = time.time()
+        self.reset()
+
+    def reset(self):
+        """Back to the eye-detection check with no calibration"""
+        self.mode = MODE_CHECK
+        self.eye_detection_confirmed = False
+        self.detection = (0, 0, None, [], [])  # faces, eyes, face box, eye boxes, pupils
+        self.current_calibration_point = 0
+        self.calibration_pupil_positions = []   # List of (pupil_x, pupil_y)
+        self.calibration_screen_positions = []  # List of (screen_x, screen_y)
+        self.sampling = False
+        self.failed_samples = None
+        self.calibrated_at = None
+
+        # Mapping learned from calibration: 2x3 affine ([pupil_x, pupil_y, 1] -> [screen_x, screen_y])
+        self.mapping = None
+        self.screen_size = (self.frame_width, self.frame_height)
+        self.drift_corrector = None
+        self.pending_target = None
+
+        self.prev_pupil = None
+        self.pupil = None
+        self.gaze = None
+        self.looking_at_screen = False
+        self.focus_start_time = None
+        self.eye_cache.invalidate()
+
+    # --- Camera ---
+
+    def open(self):
+        """Open the camera and size the calibration grid to it; False if no frame arrives"""
+        self.cap = cv2.VideoCapture(self.camera_index)
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.release()
+            self.cap = None
+            return False
+        self.frame_height, self.frame_width = frame.shape[:2]
+        self.screen_size = (self.frame_width, self.frame_height)
+        self.calibration_targets = calibration_grid(self.frame_width, self.frame_height)
+        return True
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    # --- Commands (safe to call from any thread) ---
+
+    def begin_calibration(self):
+        self.commands.put(self._begin_calibration)
+
+    def start_sample(self):
+        self.commands.put(self._start_sample)
+
+    def recalibrate(self):
+        self.commands.put(self.reset)
+
+    def correct_drift(self, target):
+        """The user is known to be looking at this screen point"""
+        self.commands.put(lambda: setattr(self, 'pending_target', target))
+
+    def set_margin(self, margin):
+        self.commands.put(lambda: setattr(self, 'margin', margin))
+
+    def use_calibration(self, mapping, frame_width, frame_height):
+        """Track with a stored calibration instead of running one"""
+        self.commands.put(lambda: self._use_mapping(mapping, (frame_width, frame_height)))
+
+    # --- Tracking thread ---
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def run(self):
+        """Sample at the tracking rate until stopped or the camera goes away"""
+        self.running = True
+        next_sample = time.monotonic()
+        while self.running:
+            if not self.step():
+                self.log("Camera disconnected or frame not captured.")
+                self.running = False
+                break
+
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.monotonic()  # Running behind - don't try to catch up
+
+    def step(self):
+        """One tracking sample; False if the camera returned no frame"""
+        ret, raw_frame = self.cap.read(self.capture_buffer)
+        if not ret:
+            return False
+        self.capture_buffer = raw_frame
+        now = time.time()
+
+        while not self.commands.empty():
+            self.commands.get_nowait()()
+
+        gray = self.frame_ctx.gray(raw_frame)
+        if self.mode == MODE_CHECK:
+            self._check(gray)
+        elif self.mode == MODE_CALIBRATE:
+            self._calibrate(gray, now)
+        else:
+            self._track(gray, now)
+
+        if self.keep_frames:
+            with self.frame_lock:
+                if self.display_frame is None or self.display_frame.shape != raw_frame.shape:
+                    self.display_frame = np.empty_like(raw_frame)
+                np.copyto(self.display_frame, raw_frame)
+
+        self.samples += 1
+        self._publish(now)
+        return True
+
+    def mirrored_frame(self, frame_ctx):
+        """The latest frame flipped for display into the caller's buffer, or None"""
+        with self.frame_lock:
+            if self.display_frame is None:
+                return None
+            return frame_ctx.flip(self.display_frame)
+
+    def _publish(self, now):
+        # A fresh dict each sample - readers never see a half-updated state
+        self.snapshot = {
+            "mode": self.mode,
+            "timestamp": now,
+            "samples": self.samples,
+            "detection": self.detection,
+            "eye_detection_confirmed": self.eye_detection_confirmed,
+            "calibration_point": self.current_calibration_point,
+            "calibration_total": len(self.calibration_targets),
+            "calibration_target": (self.calibration_targets[self.current_calibration_point]
+                                   if self.current_calibration_point < len(self.calibration_targets) else None),
+            "sampling": self.sampling,
+            "sample_count": self.sample_collector.count,
+            "progress": self.sample_collector.progress(now) if self.sampling else 0.0,
+            "failed_samples": self.failed_samples,
+            "calibrated_at": self.calibrated_at,
+            "pupil": self.pupil,
+            "gaze": self.gaze,
+            "looking": self.looking_at_screen,
+            "focus_start_time": self.focus_start_time,
+            "total_focus_time": self.total_focus_time,
+            "margin": self.margin,
+            "drift_updates": self.drift_corrector.updates if self.drift_corrector else 0,
+            "drift_rejected": self.drift_corrector.rejected if self.drift_corrector else 0,
+        }
+
+    # --- Detection ---
+
+    def get_pupil_positions(self, gray):
+        """Get current pupil positions from both eyes.
+
+        Works on the unmirrored camera frame; normalized x is mirrored so positions
+        match what the user sees in the flipped display.
+        """
+        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        if len(faces) == 0:
+            return None
+
+        face = max(faces, key=lambda f: f[2] * f[3])
+        x, y, w, h = face
+
+        roi_gray = gray[y:y + int(h/2), x:x + w]
+        if roi_gray.size == 0:
+            return None
+
+        # Eye boxes are cached relative to the face; the cascade only re-runs
+        # periodically or after a low-confidence pupil fit
+        roi_box = (x, y, w, int(h/2))
+        now = time.time()
+        eyes = self.eye_cache.lookup(roi_box, now)
+        if eyes is None:
+            eyes = self.eye_cascade.detectMultiScale(roi_gray, 1.1, 5, minSize=(30, 30))
+            self.eye_cache.update(roi_box, eyes, now)
+        pupil_data = []
+
+        for (ex, ey, ew, eh) in eyes:
+            eye_frame = roi_gray[ey:ey + eh, ex:ex + ew]
+            pupil, confidence = locate_pupil(eye_frame)
+            self.eye_cache.report_confidence(confidence)
+            if pupil:
+                norm_x = mirror_x(pupil[0], ew) / ew
+                norm_y = pupil[1] / eh
+                pupil_data.append((norm_x, norm_y))
+
+        if len(pupil_data) >= 1:
+            avg_x = sum(p[0] for p in pupil_data) / len(pupil_data)
+            avg_y = sum(p[1] for p in pupil_data) / len(pupil_data)
+            return (avg_x, avg_y)
+        return None
+
+    def check_eye_detection(self, gray):
+        """Check if face and eyes are detected (boxes are in unmirrored camera coordinates)"""
+        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        if len(faces) == 0:
+            return 0, 0, None, []
+
+        face = max(faces, key=lambda f: f[2] * f[3])
+        x, y, w, h = face
+        roi_gray = gray[y:y + int(h/2), x:x + w]
+        if roi_gray.size == 0:
+            return 0, 0, None, []
+
+        eyes = self.eye_cascade.detectMultiScale(roi_gray, 1.1, 5, minSize=(30, 30))
+        return len(faces), len(eyes), (x, y, w, h), eyes
+
+    # --- Modes ---
+
+    def _check(self, gray):
+        num_faces, num_eyes, face_rect, eyes = self.check_eye_detection(gray)
+        pupils = []
+        if face_rect is not None and self.keep_frames:
+            x, y = face_rect[:2]
+            for (ex, ey, ew, eh) in eyes:
+                pupils.append(locate_pupil(gray[y + ey:y + ey + eh, x + ex:x + ex + ew])[0])
+        self.detection = (num_faces, num_eyes, face_rect, eyes, pupils)
+        self.eye_detection_confirmed = num_eyes >= 1
+
+    def _begin_calibration(self):
+        if self.mode != MODE_CHECK or not self.eye_detection_confirmed:
+            return
+        self.mode = MODE_CALIBRATE
+        self.current_calibration_point = 0
+        self.calibration_pupil_positions = []
+        self.calibration_screen_positions = []
+        self.sampling = False
+        self.failed_samples = None
+
+    def _start_sample(self):
+        if self.mode != MODE_CALIBRATE or self.sampling:
+            return
+        self.sampling = True
+        self.failed_samples = None
+        self.sample_collector.start(time.time())
+
+    def _calibrate(self, gray, now):
+        if not self.sampling:
+            return
+
+        pupil = self.get_pupil_positions(gray)
+        if pupil:
+            self.sample_collector.add(pupil)
+        status = self.sample_collector.status(now)
+
+        if status == DONE:
+            # Robust median of the inlier samples for this point
+            avg_x, avg_y = self.sample_collector.estimate()
+            target = self.calibration_targets[self.current_calibration_point]
+            self.calibration_pupil_positions.append((avg_x, avg_y))
+            self.calibration_screen_positions.append(target)
+
+            self.log(f"Point {self.current_calibration_point + 1}: pupil=({avg_x:.3f}, {avg_y:.3f}), "
+                     f"screen={target} [{self.sample_collector.count} samples in "
+                     f"{now - self.sample_collector.started_at:.1f}s]")
+
+            self.current_calibration_point += 1
+            self.sampling = False
+            if self.current_calibration_point >= len(self.calibration_targets):
+                self._finish_calibration(now)
+        elif status == FAILED:
+            self.failed_samples = self.sample_collector.count
+            self.sampling = False
+
+    def _finish_calibration(self, now):
+        # Compute linear mapping after calibration for better gaze estimation
+        mapping = compute_linear_mapping(self.calibration_pupil_positions, self.calibration_screen_positions)
+        if mapping is not None:
+            self.log("Calibration complete — linear mapping computed")
+            save_calibration(self.camera_index, mapping, self.frame_width, self.frame_height)
+            self._use_mapping(mapping, (self.frame_width, self.frame_height))
+        else:
+            self.log(f"Calibration complete with {len(self.calibration_pupil_positions)} points (no linear mapping)")
+            self.mode = MODE_TRACK
+        self.calibrated_at = now
+
+    def _use_mapping(self, mapping, screen_size):
+        self.mode = MODE_TRACK
+        self.mapping = mapping
+        self.screen_size = screen_size
+        # Targets more than a quarter screen off are treated as not looking
+        self.drift_corrector = RLSMapping(mapping, max_residual=0.25 * max(screen_size))
+
+    def _track(self, gray, now):
+        pupil = self.get_pupil_positions(gray)
+        if pupil:
+            pupil = smooth_pupil(pupil, self.prev_pupil, alpha=0.7)
+            self.prev_pupil = pupil
+
+        screen_width, screen_height = self.screen_size
+        gaze = estimate_gaze_position(pupil, self.calibration_pupil_positions, self.calibration_screen_positions,
+                                      screen_width, screen_height, mapping=self.mapping)
+        current_looking = is_looking_at_screen(gaze, screen_width, screen_height, margin=self.margin)
+
+        # Drift correction: only from a fresh pupil fix while focused
+        if self.pending_target is not None:
+            if self.drift_corrector is not None and pupil and current_looking:
+                if self.drift_corrector.update(pupil, self.pending_target):
+                    self.mapping = self.drift_corrector.matrix
+                    save_calibration(self.camera_index, self.mapping, screen_width, screen_height)
+                    self.log(f"Drift correction at {self.pending_target} ({self.drift_corrector.updates} updates)")
+                else:
+                    self.log(f"Drift correction target {self.pending_target} rejected - too far from gaze")
+            self.pending_target = None
+
+        if current_looking:
+            if not self.looking_at_screen:
+                self.focus_start_time = now
+                self.looking_at_screen = True
+                if self.on_focus_change:
+                    self.on_focus_change(True, now)
+            elif now - self.last_focus_check >= 1.0:
+                self.total_focus_time += 1
+                self.last_focus_check = now
+        elif self.looking_at_screen:
+            self.looking_at_screen = False
+            self.focus_start_time = None
+            if self.on_focus_change:
+                self.on_focus_change(False, now)
+
+        self.pupil = pupil
+        self.gaze = gaze